@@ -82,6 +82,7 @@ INSTALLED_APPS = [
     'accounts',
     'prison_core',
     'visitor_management',
+    'api',
 
 ]
 
@@ -91,6 +92,7 @@ MIDDLEWARE = [
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "accounts.middleware.PrincipalMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -99,6 +101,24 @@ ROOT_URLCONF = "E_Prison.urls"
 
 AUTH_USER_MODEL = 'accounts.User'
 
+# Loads the user with jail and blacklist preloaded in a single query.
+# ModelBackend stays listed so sessions created before the switch (which
+# record it as their backend) remain logged in; new logins use the first.
+AUTHENTICATION_BACKENDS = [
+    'accounts.backends.PreloadedUserBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+
+# Cached request principal (see accounts.principal). Point 'default' at a
+# shared backend such as Redis or Memcached when running several workers.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'e-prison',
+    }
+}
+PRINCIPAL_CACHE_TIMEOUT = 300
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
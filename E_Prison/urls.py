@@ -34,6 +34,9 @@ urlpatterns = [
     path('accounts/', include('accounts.urls')),
     path('prison-core/', include('prison_core.urls')),
     path('visitor-management/', include('visitor_management.urls')),
+
+    # Read-only JSON API for mobile and kiosk clients
+    path('api/v1/', include('api.urls')),
 ]
 
 # Serve media files during development
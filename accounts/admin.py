@@ -1,6 +1,9 @@
 from django.contrib import admin
-from .models import User,Blacklist
+from .models import User,Blacklist,FamilyGroup,FamilyMembership,ImageFingerprint
 # Register your models here.
 admin.site.register(User)
 
 admin.site.register(Blacklist)
+admin.site.register(FamilyGroup)
+admin.site.register(FamilyMembership)
+admin.site.register(ImageFingerprint)
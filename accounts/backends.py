@@ -0,0 +1,41 @@
+# accounts/backends.py
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.exceptions import PermissionDenied
+
+UserModel = get_user_model()
+
+class PreloadedUserBackend(ModelBackend):
+    """
+    ModelBackend that loads the user, their jail and their blacklist entry
+    in one joined query, both at login and when restoring the session user.
+    """
+
+    def get_queryset(self):
+        return UserModel._default_manager.select_related('jail', 'blacklist')
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = self.get_queryset().get(**{UserModel.USERNAME_FIELD: username})
+        except UserModel.DoesNotExist:
+            # Run the default password hasher once to reduce the timing
+            # difference between an existing and a nonexistent user.
+            UserModel().set_password(password)
+            raise PermissionDenied
+        if user.check_password(password) and self.user_can_authenticate(user):
+            return user
+        # The ModelBackend listed after this one (kept for older sessions)
+        # would only hash the same password again
+        raise PermissionDenied
+
+    def get_user(self, user_id):
+        try:
+            user = self.get_queryset().get(pk=user_id)
+        except UserModel.DoesNotExist:
+            return None
+        return user if self.user_can_authenticate(user) else None
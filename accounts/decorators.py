@@ -4,9 +4,14 @@ from django.core.exceptions import PermissionDenied
 from django.shortcuts import redirect
 from django.contrib import messages
 
+def _principal(request):
+    """Cached principal from PrincipalMiddleware, falling back to request.user"""
+    return getattr(request, 'principal', request.user)
+
 def admin_required(function):
     def wrap(request, *args, **kwargs):
-        if request.user.is_authenticated and request.user.role == 'admin':
+        principal = _principal(request)
+        if principal.is_authenticated and principal.role == 'admin':
             return function(request, *args, **kwargs)
         else:
             messages.error(request, "You do not have permission to access this page.")
@@ -15,7 +20,8 @@ def admin_required(function):
 
 def security_required(function):
     def wrap(request, *args, **kwargs):
-        if request.user.is_authenticated and request.user.role == 'security':
+        principal = _principal(request)
+        if principal.is_authenticated and principal.role == 'security':
             return function(request, *args, **kwargs)
         else:
             messages.error(request, "You do not have permission to access this page.")
@@ -24,7 +30,8 @@ def security_required(function):
 
 def visitor_required(function):
     def wrap(request, *args, **kwargs):
-        if request.user.is_authenticated and request.user.role in ['visitor', 'family']:
+        principal = _principal(request)
+        if principal.is_authenticated and principal.role in ['visitor', 'family']:
             return function(request, *args, **kwargs)
         else:
             messages.error(request, "You must be logged in as a visitor to access this page.")
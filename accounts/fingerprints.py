@@ -0,0 +1,229 @@
+# accounts/fingerprints.py
+
+import logging
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import connection, transaction
+from django.db.models import Q
+from PIL import Image, ImageOps
+
+from .models import IdentityMatch, ImageFingerprint, User
+
+logger = logging.getLogger(__name__)
+
+FINGERPRINT_FIELDS = ['id_proof', 'profile_photo']
+BANDS = 4
+BAND_BITS = 16
+# Band lookup is exact for any distance below BANDS (pigeonhole)
+MAX_DISTANCE = BANDS - 1
+# Bands this crowded are blank or placeholder images, not identities
+MAX_BUCKET = 2000
+
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='fingerprints')
+
+def dhash(image):
+    """
+    64-bit difference hash: grayscale, shrink to 9x8 and record whether each
+    pixel is brighter than its right neighbour. Survives re-encoding, resizing
+    and mild brightness changes of the same photo.
+    """
+    image.draft('L', (64, 64))  # fast JPEG downscale on decode
+    image = ImageOps.exif_transpose(image).convert('L')
+    pixels = list(image.resize((9, 8), Image.LANCZOS).getdata())
+    value = 0
+    for row in range(8):
+        for column in range(8):
+            left = pixels[row * 9 + column]
+            value = (value << 1) | (left > pixels[row * 9 + column + 1])
+    return value
+
+def split_bands(value):
+    return [(value >> (BAND_BITS * band)) & 0xFFFF for band in range(BANDS)]
+
+def to_signed(value):
+    """Unsigned 64-bit hash -> BigIntegerField value"""
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+def to_unsigned(value):
+    return value & 0xFFFFFFFFFFFFFFFF
+
+def hamming(a, b):
+    return (to_unsigned(a) ^ to_unsigned(b)).bit_count()
+
+def fingerprint_file(field_file):
+    with field_file.storage.open(field_file.name, 'rb') as source:
+        with Image.open(source) as image:
+            return dhash(image)
+
+def save_fingerprint(user, field_name, value):
+    """Store an unsigned 64-bit hash for one of the user's image fields"""
+    bands = split_bands(value)
+    fingerprint, _ = ImageFingerprint.objects.update_or_create(
+        user=user, field=field_name,
+        defaults={
+            'image_name': getattr(user, field_name).name,
+            'dhash': to_signed(value),
+            **{f'band{band}': bands[band] for band in range(BANDS)},
+        },
+    )
+    return fingerprint
+
+def update_fingerprint(user, field_name, force=False):
+    """Store the fingerprint of one image field, dropping it if the field is empty"""
+    field_file = getattr(user, field_name)
+    if not field_file:
+        ImageFingerprint.objects.filter(user=user, field=field_name).delete()
+        return None
+    if not force and ImageFingerprint.objects.filter(
+        user=user, field=field_name, image_name=field_file.name
+    ).exists():
+        return None  # content-addressed name: same name, same bytes
+    return save_fingerprint(user, field_name, fingerprint_file(field_file))
+
+def _fingerprint_user(pk, field_names):
+    try:
+        user = User.objects.only('pk', *field_names).get(pk=pk)
+        for field_name in field_names:
+            try:
+                fingerprint = update_fingerprint(user, field_name)
+                if fingerprint is not None:
+                    record_matches(fingerprint)
+            except Exception as e:
+                logger.error(f"Fingerprint failed for user #{pk} {field_name}: {e}")
+    except User.DoesNotExist:
+        pass
+    finally:
+        connection.close()
+
+def queue_fingerprints(user, *field_names):
+    """Fingerprint the user's identity images in the background after commit"""
+    field_names = list(field_names or FINGERPRINT_FIELDS)
+    pk = user.pk
+    transaction.on_commit(lambda: _executor.submit(_fingerprint_user, pk, field_names))
+
+def find_similar(value, max_distance=MAX_DISTANCE, exclude_user=None):
+    """
+    Fingerprints within max_distance of an unsigned 64-bit hash, nearest first,
+    as (distance, fingerprint) pairs.
+    """
+    if max_distance > MAX_DISTANCE:
+        raise ValueError(f"Band index only guarantees distances up to {MAX_DISTANCE}")
+    bands = split_bands(value)
+    query = Q()
+    for band in range(BANDS):
+        query |= Q(**{f'band{band}': bands[band]})
+    candidates = ImageFingerprint.objects.filter(query).select_related('user')
+    if exclude_user is not None:
+        candidates = candidates.exclude(user=exclude_user)
+    matches = [
+        (hamming(candidate.dhash, value), candidate)
+        for candidate in candidates
+    ]
+    return sorted(
+        [(distance, candidate) for distance, candidate in matches if distance <= max_distance],
+        key=lambda match: match[0]
+    )
+
+def record_matches(fingerprint):
+    """
+    Replace the stored matches of one fingerprint with its current near
+    duplicates. Returns the number of matches stored.
+    """
+    value = to_unsigned(fingerprint.dhash)
+    matches = find_similar(value, exclude_user=fingerprint.user_id)
+    if len(matches) > MAX_BUCKET:
+        logger.warning(f"Fingerprint #{fingerprint.pk} matches {len(matches)} images, treating it as a placeholder")
+        matches = []
+    with transaction.atomic():
+        IdentityMatch.objects.filter(Q(first=fingerprint) | Q(second=fingerprint)).delete()
+        IdentityMatch.objects.bulk_create([
+            IdentityMatch(
+                first_id=min(fingerprint.pk, other.pk),
+                second_id=max(fingerprint.pk, other.pk),
+                distance=distance,
+            )
+            for distance, other in matches
+        ])
+    if matches:
+        logger.warning(
+            f"User #{fingerprint.user_id} {fingerprint.field} is a near duplicate of "
+            + ', '.join(f"user #{other.user_id} {other.field}" for _, other in matches)
+        )
+    return len(matches)
+
+def find_duplicate_pairs(max_distance=MAX_DISTANCE):
+    """
+    Every pair of different users whose identity images are near duplicates.
+    One pass over the table: rows are bucketed by each band and only rows
+    sharing a bucket are compared. Returns (pairs, skipped_buckets) where pairs
+    are (distance, fingerprint_id_a, fingerprint_id_b).
+    """
+    if max_distance > MAX_DISTANCE:
+        raise ValueError(f"Band index only guarantees distances up to {MAX_DISTANCE}")
+    rows = list(ImageFingerprint.objects.values_list('id', 'user_id', 'dhash', 'band0', 'band1', 'band2', 'band3'))
+    pairs = {}
+    skipped = 0
+    for band in range(BANDS):
+        buckets = defaultdict(list)
+        for row in rows:
+            buckets[row[3 + band]].append(row)
+        for bucket in buckets.values():
+            if len(bucket) < 2:
+                continue
+            if len(bucket) > MAX_BUCKET:
+                skipped += 1
+                continue
+            for index, (id_a, user_a, hash_a, *_) in enumerate(bucket):
+                for id_b, user_b, hash_b, *_ in bucket[index + 1:]:
+                    if user_a == user_b or (id_a, id_b) in pairs:
+                        continue
+                    distance = hamming(hash_a, hash_b)
+                    if distance <= max_distance:
+                        pairs[(id_a, id_b)] = distance
+    return [(distance, a, b) for (a, b), distance in pairs.items()], skipped
+
+def store_duplicate_pairs(pairs):
+    """Replace every stored match with the pairs from find_duplicate_pairs"""
+    with transaction.atomic():
+        IdentityMatch.objects.all().delete()
+        IdentityMatch.objects.bulk_create([
+            IdentityMatch(first_id=min(a, b), second_id=max(a, b), distance=distance)
+            for distance, a, b in pairs
+        ], batch_size=1000)
+
+def screening_report(max_distance=MAX_DISTANCE):
+    """
+    Group users linked by stored near-duplicate matches into clusters
+    (union-find over the pairs). Only matched fingerprints are loaded.
+    Each cluster is {'users': [...], 'matches': [(distance, fp_a, fp_b), ...]}.
+    """
+    stored = IdentityMatch.objects.filter(distance__lte=max_distance).values_list('distance', 'first_id', 'second_id')
+    pairs = list(stored)
+    fingerprint_ids = {fp_id for _, a, b in pairs for fp_id in (a, b)}
+    fingerprints = ImageFingerprint.objects.select_related('user').in_bulk(fingerprint_ids)
+
+    parent = {}
+    def find(user_id):
+        parent.setdefault(user_id, user_id)
+        while parent[user_id] != user_id:
+            parent[user_id] = parent[parent[user_id]]
+            user_id = parent[user_id]
+        return user_id
+
+    for _, a, b in pairs:
+        parent[find(fingerprints[a].user_id)] = find(fingerprints[b].user_id)
+
+    clusters = defaultdict(lambda: {'users': {}, 'matches': []})
+    for distance, a, b in sorted(pairs):
+        cluster = clusters[find(fingerprints[a].user_id)]
+        for fingerprint in (fingerprints[a], fingerprints[b]):
+            cluster['users'][fingerprint.user_id] = fingerprint.user
+        cluster['matches'].append((distance, fingerprints[a], fingerprints[b]))
+
+    report = [
+        {'users': sorted(cluster['users'].values(), key=lambda user: user.date_joined), 'matches': cluster['matches']}
+        for cluster in clusters.values()
+    ]
+    report.sort(key=lambda cluster: (-len(cluster['users']), cluster['matches'][0][0]))
+    return report
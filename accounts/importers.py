@@ -0,0 +1,338 @@
+# accounts/importers.py
+
+import csv
+import io
+import os
+import re
+import zipfile
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.db import transaction
+from PIL import Image
+
+from prison_core.images import queue_renditions
+from prison_core.models import Prisoner
+from .fingerprints import queue_fingerprints
+from .models import User
+from .uploads import MAX_ID_PROOF_SIZE, MAX_PROFILE_PHOTO_SIZE
+
+IMPORT_COLUMNS = [
+    'username', 'first_name', 'last_name', 'email', 'phone_number', 'address',
+    'aadhar_number', 'id_proof', 'profile_photo', 'related_prisoner',
+    'relationship_to_prisoner', 'password',
+]
+REQUIRED_COLUMNS = ['username', 'first_name', 'last_name', 'aadhar_number', 'id_proof']
+
+AADHAR_SEPARATORS = re.compile(r'[\s-]')
+AADHAR_PATTERN = re.compile(r'[2-9]\d{11}')
+PHONE_SEPARATORS = re.compile(r'[\s\-\+\(\)]')
+PHONE_PATTERN = re.compile(r'[6-9]\d{9}')
+
+# Verhoeff checksum tables (Aadhar numbers carry a Verhoeff check digit)
+VERHOEFF_D = [
+    [0, 1, 2, 3, 4, 5, 6, 7, 8, 9],
+    [1, 2, 3, 4, 0, 6, 7, 8, 9, 5],
+    [2, 3, 4, 0, 1, 7, 8, 9, 5, 6],
+    [3, 4, 0, 1, 2, 8, 9, 5, 6, 7],
+    [4, 0, 1, 2, 3, 9, 5, 6, 7, 8],
+    [5, 9, 8, 7, 6, 0, 4, 3, 2, 1],
+    [6, 5, 9, 8, 7, 1, 0, 4, 3, 2],
+    [7, 6, 5, 9, 8, 2, 1, 0, 4, 3],
+    [8, 7, 6, 5, 9, 3, 2, 1, 0, 4],
+    [9, 8, 7, 6, 5, 4, 3, 2, 1, 0],
+]
+VERHOEFF_P = [
+    [0, 1, 2, 3, 4, 5, 6, 7, 8, 9],
+    [1, 5, 7, 6, 2, 8, 3, 0, 9, 4],
+    [5, 8, 0, 3, 7, 9, 6, 1, 4, 2],
+    [8, 9, 1, 6, 0, 4, 3, 5, 2, 7],
+    [9, 4, 5, 8, 3, 6, 2, 7, 1, 0],
+    [4, 2, 8, 9, 1, 7, 5, 3, 6, 0],
+    [2, 7, 9, 3, 8, 0, 6, 4, 1, 5],
+    [7, 0, 4, 6, 9, 1, 3, 2, 5, 8],
+]
+# Position-permuted digit lookup: VERHOEFF_PD[position % 8][digit character]
+VERHOEFF_PD = [{str(digit): row[digit] for digit in range(10)} for row in VERHOEFF_P]
+
+def verhoeff_valid(number):
+    """Check the Verhoeff check digit of a digit string"""
+    check = 0
+    for position, char in enumerate(reversed(number)):
+        check = VERHOEFF_D[check][VERHOEFF_PD[position % 8][char]]
+    return check == 0
+
+def validate_aadhar_column(values):
+    """
+    Normalize and validate a whole column of Aadhar numbers at once.
+    Returns (cleaned values, error or None per row).
+    """
+    cleaned = [AADHAR_SEPARATORS.sub('', value or '') for value in values]
+    errors = []
+    for value in cleaned:
+        if not value:
+            errors.append("Aadhar number is required.")
+        elif not AADHAR_PATTERN.fullmatch(value):
+            errors.append("Aadhar number must be 12 digits and cannot start with 0 or 1.")
+        elif not verhoeff_valid(value):
+            errors.append("Aadhar number checksum is invalid.")
+        else:
+            errors.append(None)
+    return cleaned, errors
+
+def validate_phone_column(values):
+    """Normalize and validate a column of optional Indian mobile numbers"""
+    cleaned = [PHONE_SEPARATORS.sub('', value or '') for value in values]
+    errors = [
+        None if not value or PHONE_PATTERN.fullmatch(value)
+        else "Enter a valid 10-digit Indian mobile number starting with 6, 7, 8, or 9."
+        for value in cleaned
+    ]
+    return cleaned, errors
+
+def read_import_csv(csv_file):
+    """Read the onboarding CSV into a list of row dicts with stripped values"""
+    if isinstance(csv_file, (bytes, bytearray)):
+        csv_file = io.StringIO(csv_file.decode('utf-8-sig'))
+    reader = csv.DictReader(csv_file)
+    missing = [column for column in REQUIRED_COLUMNS if column not in (reader.fieldnames or [])]
+    if missing:
+        raise ValueError(f"CSV is missing required columns: {', '.join(missing)}")
+    return [
+        {column: (row.get(column) or '').strip() for column in IMPORT_COLUMNS}
+        for row in reader
+    ]
+
+def _check_image(data, max_size):
+    """Return an error message for an unusable image, or None"""
+    if len(data) > max_size:
+        return f"Image size should be less than {max_size // (1024 * 1024)}MB."
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            image.verify()
+    except Exception:
+        return "Only image files are allowed."
+    return None
+
+def _save_image(column, name, data):
+    field = User._meta.get_field(column)
+    return field.storage.save(os.path.join(field.upload_to, os.path.basename(name)), ContentFile(data))
+
+class VisitorImport:
+    """
+    Bulk onboarding of visitors from a CSV plus an optional zip of ID photos.
+
+    Validation runs column by column over the whole file, duplicates are
+    checked against the database with one query per unique column, rows that
+    pass are run through User.full_clean, images are verified and stored in
+    a thread pool, and all valid users are inserted with a single bulk_create.
+    """
+
+    def __init__(self, rows, photos=None, default_password=None, workers=4):
+        self.rows = rows
+        self.photos = photos
+        self.default_password = default_password
+        self.workers = workers
+        self.errors = [[] for _ in rows]
+        self.created = []
+
+    def _column(self, name):
+        return [row[name] for row in self.rows]
+
+    def _add_errors(self, errors):
+        for row_errors, error in zip(self.errors, errors):
+            if error:
+                row_errors.append(error)
+
+    def validate(self):
+        """Run every batch check and record per-row errors"""
+        for column in ['username', 'first_name', 'last_name']:
+            self._add_errors([None if value else f"{column} is required." for value in self._column(column)])
+
+        aadhar, aadhar_errors = validate_aadhar_column(self._column('aadhar_number'))
+        self._add_errors(aadhar_errors)
+        phones, phone_errors = validate_phone_column(self._column('phone_number'))
+        self._add_errors(phone_errors)
+        for row, aadhar_clean, phone_clean in zip(self.rows, aadhar, phones):
+            row['aadhar_number'] = aadhar_clean
+            row['phone_number'] = phone_clean
+
+        # Duplicates inside the file, then against the database (one set query each)
+        for column, label in [('aadhar_number', 'Aadhar number'), ('username', 'Username')]:
+            values = self._column(column)
+            counts = Counter(value for value in values if value)
+            self._add_errors([
+                f"{label} appears more than once in this file." if value and counts[value] > 1 else None
+                for value in values
+            ])
+            existing = set(
+                User.objects.filter(**{f'{column}__in': list(counts)}).values_list(column, flat=True)
+            )
+            self._add_errors([
+                f"{label} is already registered." if value in existing else None
+                for value in values
+            ])
+
+        # Prisoner references resolved in one query
+        prisoner_ids = {value for value in self._column('related_prisoner') if value}
+        self.prisoners = Prisoner.objects.in_bulk(prisoner_ids, field_name='prisoner_id') if prisoner_ids else {}
+        choices = dict(User.RELATIONSHIP_CHOICES)
+        for row, row_errors in zip(self.rows, self.errors):
+            if row['related_prisoner']:
+                if row['related_prisoner'] not in self.prisoners:
+                    row_errors.append(f"Prisoner {row['related_prisoner']} not found.")
+                if row['relationship_to_prisoner'] not in choices:
+                    row_errors.append("Please specify a valid relationship to the prisoner.")
+
+        self._validate_images()
+        self._validate_users()
+
+    def _build_user(self, index):
+        row = self.rows[index]
+        prisoner = self.prisoners.get(row['related_prisoner'])
+        return User(
+            username=row['username'],
+            first_name=row['first_name'],
+            last_name=row['last_name'],
+            full_name=f"{row['first_name']} {row['last_name']}",
+            email=row['email'],
+            phone_number=row['phone_number'],
+            address=row['address'],
+            aadhar_number=row['aadhar_number'],
+            related_prisoner=prisoner,
+            relationship_to_prisoner=row['relationship_to_prisoner'] if prisoner else None,
+            role='family' if prisoner else 'visitor',
+            is_family_member=bool(prisoner),
+        )
+
+    def _validate_users(self):
+        """
+        Model validation (username and email validators, field lengths,
+        User.clean) for rows that passed the batch checks. Uniqueness and the
+        prisoner lookup were already checked in bulk, so they are skipped here.
+        """
+        self.users = {}
+        for index, errors in enumerate(self.errors):
+            if errors:
+                continue
+            user = self._build_user(index)
+            try:
+                user.full_clean(exclude=['password', 'related_prisoner'], validate_unique=False, validate_constraints=False)
+            except ValidationError as e:
+                for field, messages in e.message_dict.items():
+                    prefix = '' if field == '__all__' else f"{field}: "
+                    errors.extend(prefix + message for message in messages)
+            else:
+                self.users[index] = user
+
+    def _photo_bytes(self, name, max_size):
+        """Return (bytes, error) for a photo in the archive; oversized entries are not read"""
+        if not name or self.photos is None:
+            return None, None
+        try:
+            info = self.photos.getinfo(name)
+        except KeyError:
+            return None, None
+        if info.file_size > max_size:
+            return None, f"Image size should be less than {max_size // (1024 * 1024)}MB."
+        return self.photos.read(info), None
+
+    def _validate_images(self):
+        """Read and verify every referenced image in parallel"""
+        jobs = []
+        for index, row in enumerate(self.rows):
+            for column, max_size, required in [
+                ('id_proof', MAX_ID_PROOF_SIZE, True),
+                ('profile_photo', MAX_PROFILE_PHOTO_SIZE, False),
+            ]:
+                name = row[column]
+                data, error = self._photo_bytes(name, max_size)
+                if error:
+                    self.errors[index].append(f"{column}: {error}")
+                    continue
+                if data is None:
+                    if name or required:
+                        self.errors[index].append(f"{column} image '{name}' not found in the photo archive.")
+                    continue
+                jobs.append((index, column, name, data, max_size))
+
+        self.images = {}
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            results = pool.map(lambda job: _check_image(job[3], job[4]), jobs)
+            for (index, column, name, data, _), error in zip(jobs, results):
+                if error:
+                    self.errors[index].append(f"{column}: {error}")
+                else:
+                    self.images[(index, column)] = (name, data)
+
+    def _hash_passwords(self, valid):
+        """Hash passwords in a thread pool (PBKDF2 releases the GIL); a shared default is hashed once"""
+        default_hash = make_password(self.default_password) if self.default_password else make_password(None)
+        explicit = [index for index in valid if self.rows[index]['password']]
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            hashes = dict(zip(explicit, pool.map(lambda index: make_password(self.rows[index]['password']), explicit)))
+        return {index: hashes.get(index, default_hash) for index in valid}
+
+    def run(self, dry_run=False):
+        """Validate, then store images and create all valid users. Returns the per-row report."""
+        self.validate()
+        valid = list(self.users)
+        if dry_run or not valid:
+            return self.report()
+
+        passwords = self._hash_passwords(valid)
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            keys = [key for key in self.images if key[0] in passwords]
+            stored = dict(zip(keys, pool.map(
+                lambda key: _save_image(key[1], *self.images[key]),
+                keys
+            )))
+
+        users = []
+        for index in valid:
+            user = self.users[index]
+            user.password = passwords[index]
+            user.id_proof = stored.get((index, 'id_proof'))
+            user.profile_photo = stored.get((index, 'profile_photo'))
+            users.append(user)
+
+        try:
+            with transaction.atomic():
+                self.created = User.objects.bulk_create(users, batch_size=500)
+        except Exception:
+            for (_, column), name in stored.items():
+                User._meta.get_field(column).storage.delete(name)
+            raise
+
+        for user in self.created:
+            queue_renditions(user)
+            queue_fingerprints(user)
+
+        return self.report()
+
+    def report(self):
+        """One entry per CSV row (line numbers count the header as line 1)"""
+        created = {user.username for user in self.created}
+        return [
+            {
+                'line': index + 2,
+                'username': row['username'],
+                'status': 'created' if row['username'] in created else ('error' if errors else 'valid'),
+                'errors': '; '.join(errors),
+            }
+            for index, (row, errors) in enumerate(zip(self.rows, self.errors))
+        ]
+
+def import_visitors(csv_file, photos_zip=None, default_password=None, workers=4, dry_run=False):
+    """Import visitors from a CSV (file object or bytes) and an optional zip path or file of photos"""
+    rows = read_import_csv(csv_file)
+    photos = zipfile.ZipFile(photos_zip) if photos_zip else None
+    try:
+        return VisitorImport(rows, photos, default_password, workers).run(dry_run=dry_run)
+    finally:
+        if photos is not None:
+            photos.close()
@@ -0,0 +1,46 @@
+# accounts/management/commands/import_visitors.py
+
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.importers import import_visitors
+
+class Command(BaseCommand):
+    help = "Bulk-register visitors from a facility CSV and a zip of ID/profile photos"
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_path', help="CSV with columns username, first_name, last_name, aadhar_number, id_proof, ...")
+        parser.add_argument('--photos', help="Zip archive containing the images named in id_proof/profile_photo")
+        parser.add_argument('--default-password', help="Temporary password for rows without a password column value")
+        parser.add_argument('--report', help="Write the per-row report to this CSV path")
+        parser.add_argument('--workers', type=int, default=4, help="Threads for image checks and password hashing")
+        parser.add_argument('--dry-run', action='store_true', help="Validate only, do not create users")
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['csv_path'], encoding='utf-8-sig', newline='') as csv_file:
+                report = import_visitors(
+                    csv_file,
+                    photos_zip=options['photos'],
+                    default_password=options['default_password'],
+                    workers=options['workers'],
+                    dry_run=options['dry_run'],
+                )
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+
+        if options['report']:
+            with open(options['report'], 'w', newline='') as report_file:
+                writer = csv.DictWriter(report_file, fieldnames=['line', 'username', 'status', 'errors'])
+                writer.writeheader()
+                writer.writerows(report)
+
+        for entry in report:
+            if entry['errors']:
+                self.stderr.write(f"Line {entry['line']} ({entry['username']}): {entry['errors']}")
+
+        counts = {status: sum(1 for entry in report if entry['status'] == status) for status in ['created', 'valid', 'error']}
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(report)} rows: {counts['created']} created, {counts['valid']} valid, {counts['error']} with errors"
+        ))
@@ -0,0 +1,82 @@
+# accounts/management/commands/screen_identities.py
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+
+from accounts.fingerprints import (
+    FINGERPRINT_FIELDS, MAX_DISTANCE, find_duplicate_pairs, fingerprint_file, save_fingerprint,
+    screening_report, store_duplicate_pairs,
+)
+from accounts.models import ImageFingerprint, User
+
+class Command(BaseCommand):
+    help = (
+        "Fingerprint identity images, store every near-duplicate pair for the screening page "
+        "and report accounts that share Aadhar or face photos"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--distance', type=int, default=MAX_DISTANCE, help=f"Max differing bits (0-{MAX_DISTANCE})")
+        parser.add_argument('--backfill', action='store_true', help="Fingerprint images that have no fingerprint yet")
+        parser.add_argument('--force', action='store_true', help="With --backfill, recompute every fingerprint")
+        parser.add_argument('--workers', type=int, default=4, help="Parallel image workers for --backfill")
+
+    def backfill(self, force, workers):
+        has_image = Q()
+        for field_name in FINGERPRINT_FIELDS:
+            has_image |= ~Q(**{field_name: ''}) & Q(**{f'{field_name}__isnull': False})
+        users = User.objects.filter(has_image).only('pk', 'username', *FINGERPRINT_FIELDS)
+        current = set() if force else set(
+            ImageFingerprint.objects.values_list('user_id', 'field', 'image_name')
+        )
+        jobs = [
+            (user, field_name)
+            for user in users
+            for field_name in FINGERPRINT_FIELDS
+            if getattr(user, field_name)
+            and (user.pk, field_name, getattr(user, field_name).name) not in current
+        ]
+
+        # Decode and hash in the pool; rows are written from this thread only
+        written = failed = 0
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                pool.submit(fingerprint_file, getattr(user, field_name)): (user, field_name)
+                for user, field_name in jobs
+            }
+            for future in as_completed(futures):
+                user, field_name = futures[future]
+                try:
+                    save_fingerprint(user, field_name, future.result())
+                    written += 1
+                except Exception as e:
+                    failed += 1
+                    self.stderr.write(f"{user.username} {field_name}: {e}")
+        self.stdout.write(f"{written} fingerprints written, {failed} failed")
+
+    def handle(self, *args, **options):
+        if options['backfill']:
+            self.backfill(options['force'], options['workers'])
+
+        if not 0 <= options['distance'] <= MAX_DISTANCE:
+            raise CommandError(f"--distance must be between 0 and {MAX_DISTANCE}")
+
+        # Store every pair up to MAX_DISTANCE; the page filters by distance
+        pairs, skipped = find_duplicate_pairs(MAX_DISTANCE)
+        store_duplicate_pairs(pairs)
+        self.stdout.write(f"{len(pairs)} near-duplicate pairs stored")
+
+        clusters = screening_report(options['distance'])
+        for cluster in clusters:
+            self.stdout.write(self.style.WARNING(
+                f"{len(cluster['users'])} linked accounts: " + ', '.join(user.username for user in cluster['users'])
+            ))
+            for distance, first, second in cluster['matches']:
+                self.stdout.write(
+                    f"    {first.user.username} {first.field} <-> {second.user.username} {second.field} ({distance} bits)"
+                )
+        if skipped:
+            self.stdout.write(f"{skipped} overcrowded hash bands skipped (blank or placeholder images)")
+        self.stdout.write(self.style.SUCCESS(f"{len(clusters)} clusters of possible duplicate identities"))
@@ -0,0 +1,94 @@
+# accounts/middleware.py
+
+from django.contrib import auth
+from django.contrib.auth.models import AnonymousUser
+from django.utils.functional import SimpleLazyObject, empty
+
+from prison_core.models import Jail
+from .models import User
+from .principal import get_principal
+
+def _principal_attribute(name):
+    """Read an attribute from the loaded User if there is one, else from the cached principal"""
+    def getter(self):
+        if self._wrapped is not empty:
+            return getattr(self._wrapped, name)
+        return getattr(self.__dict__['_principal'], name)
+    return property(getter)
+
+class PrincipalUser(SimpleLazyObject):
+    """
+    request.user replacement that answers the common attributes (role, jail,
+    username, ...) from the cached principal and loads the real User row only
+    when anything else is touched.
+    """
+
+    def __init__(self, request):
+        super().__init__(lambda: auth.get_user(request))
+        self.__dict__['_principal'] = SimpleLazyObject(
+            lambda: get_principal(request, self._load_user)
+        )
+
+    def _load_user(self):
+        if self._wrapped is empty:
+            self._setup()
+        return self._wrapped
+
+    id = _principal_attribute('id')
+    pk = _principal_attribute('pk')
+    username = _principal_attribute('username')
+    full_name = _principal_attribute('full_name')
+    role = _principal_attribute('role')
+    is_staff = _principal_attribute('is_staff')
+    is_active = _principal_attribute('is_active')
+    jail_id = _principal_attribute('jail_id')
+    is_authenticated = _principal_attribute('is_authenticated')
+    is_anonymous = _principal_attribute('is_anonymous')
+    is_blacklisted = _principal_attribute('is_blacklisted')
+    can_authorize_emergency_visits = _principal_attribute('can_authorize_emergency_visits')
+
+    @property
+    def __class__(self):
+        # isinstance() checks (templates, ORM lookups) must not force a load
+        if self._wrapped is not empty:
+            return self._wrapped.__class__
+        return User if self.__dict__['_principal'].is_authenticated else AnonymousUser
+
+    def __getitem__(self, key):
+        # Templates try item lookup before attributes; User is not subscriptable,
+        # so fail the same way without loading it.
+        raise TypeError("'User' object is not subscriptable")
+
+    def get_role_display(self):
+        if self._wrapped is not empty:
+            return self._wrapped.get_role_display()
+        role = self.__dict__['_principal'].role
+        return dict(User.ROLE_CHOICES).get(role, role)
+
+    @property
+    def jail(self):
+        if self._wrapped is not empty:
+            return self._wrapped.jail
+        if 'jail' not in self.__dict__:
+            principal = self.__dict__['_principal']
+            # Deferred instance: id and name come from the cache, location loads on access
+            self.__dict__['jail'] = (
+                Jail.from_db('default', ['id', 'name'], [principal.jail_id, principal.jail_name])
+                if principal.jail_id else None
+            )
+        return self.__dict__['jail']
+
+class PrincipalMiddleware:
+    """
+    Attach request.principal and a principal-backed request.user.
+    Must come after SessionMiddleware and AuthenticationMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        user = PrincipalUser(request)
+        request.user = user
+        request.principal = user.__dict__['_principal']
+        return self.get_response(request)
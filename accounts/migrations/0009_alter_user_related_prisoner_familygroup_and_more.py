@@ -0,0 +1,74 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:59
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def build_family_groups(apps, schema_editor):
+    """Materialize family groups from the existing primary_family_member links"""
+    User = apps.get_model('accounts', 'User')
+    FamilyGroup = apps.get_model('accounts', 'FamilyGroup')
+    FamilyMembership = apps.get_model('accounts', 'FamilyMembership')
+
+    head_ids = set(
+        User.objects.filter(primary_family_member__isnull=False).values_list('primary_family_member_id', flat=True)
+    )
+    head_ids.update(User.objects.filter(can_authorize_emergency_visits=True).values_list('id', flat=True))
+
+    groups = {}
+    for head_id in head_ids:
+        group = FamilyGroup.objects.create(head_id=head_id)
+        FamilyMembership.objects.create(group=group, user_id=head_id, role='head')
+        groups[head_id] = group
+
+    FamilyMembership.objects.bulk_create([
+        FamilyMembership(
+            group=groups[member.primary_family_member_id],
+            user_id=member.id,
+            role='member',
+            relationship=member.relationship_to_primary,
+        )
+        for member in User.objects.filter(primary_family_member__isnull=False).only(
+            'id', 'primary_family_member_id', 'relationship_to_primary'
+        )
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0008_user_related_prisoner_user_relationship_to_prisoner_and_more'),
+        ('prison_core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='user',
+            name='related_prisoner',
+            field=models.ForeignKey(blank=True, help_text='Select the prisoner you are related to', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='relatives', to='prison_core.prisoner', verbose_name='Related Prisoner'),
+        ),
+        migrations.CreateModel(
+            name='FamilyGroup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('head', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='headed_family_group', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='FamilyMembership',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('role', models.CharField(choices=[('head', 'Primary Family Member'), ('member', 'Family Member')], default='member', max_length=10)),
+                ('relationship', models.CharField(blank=True, choices=[('father', 'Father'), ('mother', 'Mother'), ('spouse', 'Spouse/Husband/Wife'), ('son', 'Son'), ('daughter', 'Daughter'), ('brother', 'Brother'), ('sister', 'Sister'), ('grandfather', 'Grandfather'), ('grandmother', 'Grandmother'), ('uncle', 'Uncle'), ('aunt', 'Aunt'), ('cousin', 'Cousin'), ('nephew', 'Nephew'), ('niece', 'Niece'), ('son_in_law', 'Son-in-law'), ('daughter_in_law', 'Daughter-in-law'), ('father_in_law', 'Father-in-law'), ('mother_in_law', 'Mother-in-law'), ('other', 'Other Relative')], help_text='Relationship to the head of the family', max_length=20, null=True)),
+                ('group', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='memberships', to='accounts.familygroup')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='family_memberships', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'group'], name='accounts_fa_user_id_7909e1_idx')],
+                'constraints': [models.UniqueConstraint(fields=('group', 'user'), name='unique_family_membership')],
+            },
+        ),
+        migrations.RunPython(build_family_groups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:06
+
+import prison_core.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0009_alter_user_related_prisoner_familygroup_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='user',
+            name='id_proof',
+            field=models.ImageField(blank=True, null=True, storage=prison_core.storage.ContentAddressedStorage(), upload_to='id_proofs/'),
+        ),
+        migrations.AlterField(
+            model_name='user',
+            name='profile_photo',
+            field=models.ImageField(blank=True, null=True, storage=prison_core.storage.ContentAddressedStorage(), upload_to='profile_photos/'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0011_imagefingerprint'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='blacklist',
+            index=models.Index(fields=['-created_at', '-id'], name='accounts_bl_created_82f467_idx'),
+        ),
+    ]
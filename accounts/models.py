@@ -3,6 +3,7 @@ from django.db import models
 from django.core.exceptions import ValidationError
 from prison_core.models import Jail
 from prison_core.models import Prisoner
+from prison_core.storage import media_storage
 import re
 
 class User(AbstractUser):
@@ -34,9 +35,12 @@ class User(AbstractUser):
         ("mother_in_law", "Mother-in-law"),
         ("other", "Other Relative"),
     ]
+
+    # Fields the materialized family groups are derived from
+    FAMILY_FIELDS = ('primary_family_member', 'relationship_to_primary', 'can_authorize_emergency_visits')
     
     role = models.CharField(max_length=20, choices=ROLE_CHOICES, default="visitor")
-    profile_photo = models.ImageField(upload_to="profile_photos/", blank=True, null=True)
+    profile_photo = models.ImageField(upload_to="profile_photos/", storage=media_storage, blank=True, null=True)
     is_family_member = models.BooleanField(default=False)
     jail = models.ForeignKey(Jail, on_delete=models.SET_NULL, null=True, blank=True)
 
@@ -45,7 +49,7 @@ class User(AbstractUser):
     address = models.TextField(blank=True, null=True)
     
     # Identity Information
-    id_proof = models.ImageField(upload_to="id_proofs/", blank=True, null=True)
+    id_proof = models.ImageField(upload_to="id_proofs/", storage=media_storage, blank=True, null=True)
     aadhar_number = models.CharField(
         max_length=12,
         unique=True,
@@ -68,7 +72,7 @@ class User(AbstractUser):
         on_delete=models.SET_NULL,
         null=True,
         blank=True,
-        related_name='family_members',
+        related_name='relatives',
         help_text="Select the prisoner you are related to",
         verbose_name="Related Prisoner"
     )
@@ -160,6 +164,15 @@ class User(AbstractUser):
                 return f"XXXX XXXX {clean_aadhar[8:]}"
         return "XXXX XXXX XXXX"
 
+    @property
+    def is_blacklisted(self):
+        """Check for a blacklist entry (no extra query when loaded through accounts.backends)"""
+        try:
+            self.blacklist
+        except Blacklist.DoesNotExist:
+            return False
+        return True
+
     @property
     def has_valid_aadhar(self):
         """Check if user has valid Aadhar identification"""
@@ -174,27 +187,52 @@ class User(AbstractUser):
         if self.can_authorize_emergency_visits:
             return True
         
-        if self.primary_family_member and self.primary_family_member.can_authorize_emergency_visits:
-            return True
-        
-        return False
+        return self.family_memberships.filter(
+            role=FamilyMembership.ROLE_MEMBER,
+            group__head__can_authorize_emergency_visits=True
+        ).exists()
+
+    def get_family_memberships(self):
+        """
+        Memberships of everyone sharing a family group with this user,
+        resolved in a single query against the materialized membership table.
+        """
+        return FamilyMembership.objects.filter(
+            group__in=FamilyGroup.objects.filter(memberships__user=self)
+        ).exclude(user=self).select_related('user').order_by('role', 'user_id')
 
     def get_family_members(self):
         """Get all family members connected to this user"""
-        family_members = []
-        
-        # If this is a primary family member, get all connected members
-        if self.can_authorize_emergency_visits:
-            family_members.extend(self.family_members.all())
+        members = {}
+        for membership in self.get_family_memberships():
+            members.setdefault(membership.user_id, membership.user)
+        return list(members.values())
+
+    def sync_family_membership(self):
+        """
+        Bring the materialized family group rows in line with
+        primary_family_member / relationship_to_primary / can_authorize_emergency_visits.
+        Runs after every save that may change those fields (accounts.signals).
+        """
+        stale = FamilyMembership.objects.filter(user=self, role=FamilyMembership.ROLE_MEMBER)
         
-        # If this user has a primary family member, get all siblings
-        if self.primary_family_member:
-            family_members.append(self.primary_family_member)
-            family_members.extend(
-                self.primary_family_member.family_members.exclude(id=self.id)
+        if self.primary_family_member_id:
+            group = FamilyGroup.for_head(self.primary_family_member_id)
+            FamilyMembership.objects.update_or_create(
+                group=group,
+                user=self,
+                defaults={
+                    'role': FamilyMembership.ROLE_MEMBER,
+                    'relationship': self.relationship_to_primary,
+                }
             )
+            stale = stale.exclude(group=group)
+        
+        stale.delete()
         
-        return family_members
+        # Authorizers always head their own group so dependents can join it
+        if self.can_authorize_emergency_visits:
+            FamilyGroup.for_head(self.pk)
 
     def __str__(self):
         """Display format: ID + Name for better search and identification"""
@@ -230,6 +268,106 @@ class User(AbstractUser):
             
         return display
 
+class FamilyGroup(models.Model):
+    """A family headed by one primary member who authorizes emergency visits"""
+    head = models.OneToOneField(User, on_delete=models.CASCADE, related_name='headed_family_group')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    @classmethod
+    def for_head(cls, head_id):
+        """Get or create the group headed by the given user, including the head's membership"""
+        group, created = cls.objects.get_or_create(head_id=head_id)
+        if created:
+            FamilyMembership.objects.get_or_create(
+                group=group,
+                user_id=head_id,
+                defaults={'role': FamilyMembership.ROLE_HEAD}
+            )
+        return group
+
+    def __str__(self):
+        return f"Family of {self.head}"
+
+class FamilyMembership(models.Model):
+    """Materialized membership of a user in a family group"""
+    ROLE_HEAD = 'head'
+    ROLE_MEMBER = 'member'
+    ROLE_CHOICES = [
+        (ROLE_HEAD, 'Primary Family Member'),
+        (ROLE_MEMBER, 'Family Member'),
+    ]
+
+    group = models.ForeignKey(FamilyGroup, on_delete=models.CASCADE, related_name='memberships')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='family_memberships')
+    role = models.CharField(max_length=10, choices=ROLE_CHOICES, default=ROLE_MEMBER)
+    relationship = models.CharField(
+        max_length=20,
+        choices=User.RELATIONSHIP_CHOICES,
+        blank=True,
+        null=True,
+        help_text="Relationship to the head of the family"
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['group', 'user'], name='unique_family_membership'),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'group']),
+        ]
+
+    def __str__(self):
+        return f"{self.user} in {self.group}"
+
+class ImageFingerprint(models.Model):
+    """
+    64-bit difference hash of an uploaded identity image. The hash is also
+    stored as four 16-bit indexed bands: two hashes within Hamming distance 3
+    always share at least one band exactly, so near-duplicate lookups are
+    four index probes plus a popcount on the few candidates.
+    """
+    FIELD_CHOICES = [
+        ('id_proof', 'Aadhar Card Image'),
+        ('profile_photo', 'Profile Photo'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='image_fingerprints')
+    field = models.CharField(max_length=20, choices=FIELD_CHOICES)
+    image_name = models.CharField(max_length=255)
+    dhash = models.BigIntegerField()
+    band0 = models.PositiveIntegerField(db_index=True)
+    band1 = models.PositiveIntegerField(db_index=True)
+    band2 = models.PositiveIntegerField(db_index=True)
+    band3 = models.PositiveIntegerField(db_index=True)
+    computed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'field'], name='unique_image_fingerprint'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_field_display()} of {self.user}"
+
+class IdentityMatch(models.Model):
+    """
+    Stored screening result: two fingerprints of different users within
+    MAX_DISTANCE bits, with first_id < second_id. Written when an image is
+    fingerprinted and rebuilt in full by screen_identities.
+    """
+    first = models.ForeignKey(ImageFingerprint, on_delete=models.CASCADE, related_name='+')
+    second = models.ForeignKey(ImageFingerprint, on_delete=models.CASCADE, related_name='+')
+    distance = models.PositiveSmallIntegerField(db_index=True)
+    found_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['first', 'second'], name='unique_identity_match'),
+        ]
+
+    def __str__(self):
+        return f"{self.first} ~ {self.second} ({self.distance} bits)"
+
 # Keep existing Blacklist model unchanged
 class Blacklist(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='blacklist')
@@ -237,5 +375,10 @@ class Blacklist(models.Model):
     blacklisted_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='created_blacklists')
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['-created_at', '-id']),
+        ]
+
     def __str__(self):
         return f"{self.user.username} - Blacklisted"
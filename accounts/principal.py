@@ -0,0 +1,136 @@
+# accounts/principal.py
+
+from uuid import uuid4
+
+from django.conf import settings
+from django.contrib.auth import HASH_SESSION_KEY, SESSION_KEY
+from django.core.cache import caches
+from django.utils.crypto import constant_time_compare
+
+PRINCIPAL_CACHE_TIMEOUT = getattr(settings, 'PRINCIPAL_CACHE_TIMEOUT', 300)
+
+def _cache():
+    return caches[getattr(settings, 'PRINCIPAL_CACHE_ALIAS', 'default')]
+
+def _principal_key(session_key):
+    return f"principal:{session_key}"
+
+def _version_key(user_id):
+    return f"principal-version:{user_id}"
+
+class Principal:
+    """
+    Cacheable snapshot of the authenticated user: just enough to route a
+    request and run the role decorators without loading the User row.
+    """
+    FIELDS = (
+        'id', 'username', 'full_name', 'role', 'is_staff',
+        'jail_id', 'jail_name', 'is_blacklisted', 'can_authorize_emergency_visits',
+        'is_active', 'auth_hash',
+    )
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, **values):
+        for field in self.FIELDS:
+            setattr(self, field, values.get(field))
+
+    @property
+    def pk(self):
+        return self.id
+
+    @classmethod
+    def from_user(cls, user):
+        """Build a principal from a User loaded through accounts.backends (jail and blacklist joined)"""
+        return cls(
+            id=user.pk,
+            username=user.username,
+            full_name=user.full_name,
+            role=user.role,
+            is_staff=user.is_staff,
+            jail_id=user.jail_id,
+            jail_name=user.jail.name if user.jail_id else None,
+            is_blacklisted=user.is_blacklisted,
+            can_authorize_emergency_visits=user.can_authorize_emergency_visits,
+            is_active=user.is_active,
+            auth_hash=user.get_session_auth_hash(),
+        )
+
+    def as_dict(self):
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+    def __str__(self):
+        return self.username
+
+class AnonymousPrincipal:
+    """Principal for requests without a logged-in user"""
+    id = pk = None
+    username = ''
+    full_name = None
+    role = None
+    is_staff = False
+    jail_id = jail_name = None
+    is_blacklisted = False
+    can_authorize_emergency_visits = False
+    is_active = False
+    auth_hash = None
+    is_authenticated = False
+    is_anonymous = True
+
+    def __str__(self):
+        return 'AnonymousUser'
+
+def get_principal(request, load_user):
+    """
+    Return the principal for this request's session.
+
+    The cached entry and the user's invalidation token are read with a
+    single get_many(); load_user() (the real User) is only called on a miss.
+    A hit also needs the token to exist (an evicted token is a miss), the
+    user to be active and the session's auth hash to match the cached one.
+    """
+    session = getattr(request, 'session', None)
+    user_id = session.get(SESSION_KEY) if session is not None else None
+    if user_id is None or not session.session_key:
+        return AnonymousPrincipal()
+
+    cache = _cache()
+    principal_key = _principal_key(session.session_key)
+    version_key = _version_key(user_id)
+    cached = cache.get_many([principal_key, version_key])
+    version = cached.get(version_key)
+    entry = cached.get(principal_key)
+
+    if entry and version is not None and entry['version'] == version and _is_valid(entry['values'], session, user_id):
+        return Principal(**entry['values'])
+
+    user = load_user()
+    if not user.is_authenticated:
+        return AnonymousPrincipal()
+
+    if version is None:
+        # First entry since the token was rotated out or evicted; keep whichever token wins a race
+        cache.add(version_key, uuid4().hex, None)
+        version = cache.get(version_key)
+    principal = Principal.from_user(user)
+    cache.set(principal_key, {'version': version, 'values': principal.as_dict()}, PRINCIPAL_CACHE_TIMEOUT)
+    return principal
+
+def _is_valid(values, session, user_id):
+    return (
+        str(values['id']) == str(user_id)
+        and values.get('is_active')
+        and constant_time_compare(values.get('auth_hash') or '', session.get(HASH_SESSION_KEY) or '')
+    )
+
+def invalidate_principal(user):
+    """
+    Drop every cached principal of a user (all sessions) by rotating their
+    invalidation token. Called from the User and Blacklist save/delete
+    signals (accounts.signals); call it directly after queryset update()s.
+    """
+    invalidate_principals([getattr(user, 'pk', user)])
+
+def invalidate_principals(user_ids):
+    """invalidate_principal for many users with a single set_many()"""
+    _cache().set_many({_version_key(user_id): uuid4().hex for user_id in user_ids}, None)
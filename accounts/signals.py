@@ -0,0 +1,32 @@
+# accounts/signals.py
+
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from prison_core.models import Jail
+from .models import Blacklist, User
+from .principal import invalidate_principal, invalidate_principals
+
+# Every save goes through here, including Django admin and shell edits, so a
+# cached principal never outlives a change to the user, their jail or their
+# blacklist entry, and family groups always follow the user's family fields
+
+@receiver([post_save, post_delete], sender=User, dispatch_uid='invalidate_principal_user')
+def invalidate_user_principal(sender, instance, **kwargs):
+    invalidate_principal(instance.pk)
+
+@receiver(post_save, sender=User, dispatch_uid='sync_family_membership')
+def sync_family_membership(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or (update_fields is not None and not set(update_fields) & set(User.FAMILY_FIELDS)):
+        return
+    instance.sync_family_membership()
+
+@receiver([post_save, post_delete], sender=Blacklist, dispatch_uid='invalidate_principal_blacklist')
+def invalidate_blacklisted_principal(sender, instance, **kwargs):
+    invalidate_principal(instance.user_id)
+
+@receiver([post_save, pre_delete], sender=Jail, dispatch_uid='invalidate_principal_jail')
+def invalidate_jail_principals(sender, instance, **kwargs):
+    # Principals cache the jail name; deleting a jail nulls User.jail with a
+    # queryset update, so its users are collected before the delete
+    invalidate_principals(User.objects.filter(jail=instance).values_list('pk', flat=True))
@@ -1,3 +1,110 @@
-from django.test import TestCase
+import io
+import shutil
+import tempfile
 
-# Create your tests here.
+from django.contrib.auth import BACKEND_SESSION_KEY, SESSION_KEY
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from prison_core.models import Jail
+from .models import FamilyGroup, FamilyMembership, User
+
+def png(name='photo.png'):
+    buffer = io.BytesIO()
+    Image.new('RGB', (8, 8), 'blue').save(buffer, 'PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+class MediaRootMixin:
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+class VisitorRegistrationTests(MediaRootMixin, TestCase):
+    def test_registration_logs_the_new_user_in(self):
+        response = self.client.post(reverse('visitor_registration'), {
+            'username': 'newvisitor',
+            'first_name': 'New',
+            'last_name': 'Visitor',
+            'email': 'new@example.com',
+            'address': 'Thiruvananthapuram',
+            'role': 'visitor',
+            'aadhar_number': '2345 6789 0123',
+            'id_proof': png('aadhar.png'),
+            'password1': 'Sturdy-passphrase-42',
+            'password2': 'Sturdy-passphrase-42',
+        })
+        self.assertRedirects(response, reverse('dashboard'), fetch_redirect_response=False)
+        user = User.objects.get(username='newvisitor')
+        self.assertEqual(self.client.session[SESSION_KEY], str(user.pk))
+        self.assertEqual(self.client.session[BACKEND_SESSION_KEY], 'accounts.backends.PreloadedUserBackend')
+
+class PrincipalCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.jail = Jail.objects.create(name='District Jail', location='Thiruvananthapuram')
+        self.client.force_login(User.objects.create(username='admin1', role='admin', jail=self.jail))
+
+    def principal(self):
+        return self.client.get(reverse('landing_page')).wsgi_request.principal
+
+    def test_renaming_the_jail_drops_cached_principals(self):
+        self.assertEqual(self.principal().jail_name, 'District Jail')
+        self.jail.name = 'Central Prison'
+        self.jail.save()
+        self.assertEqual(self.principal().jail_name, 'Central Prison')
+
+    def test_deleting_the_jail_drops_cached_principals(self):
+        self.principal()
+        self.jail.delete()
+        self.assertIsNone(self.principal().jail_id)
+
+class FamilyGroupSyncTests(TestCase):
+    def setUp(self):
+        self.heads = [
+            User.objects.create(username=f'head{number}', role='family', can_authorize_emergency_visits=True)
+            for number in (1, 2)
+        ]
+        self.member = User.objects.create(username='member1', role='family')
+
+    def groups(self, user):
+        return set(FamilyMembership.objects.filter(user=user).values_list('group__head_id', 'role', 'relationship'))
+
+    def test_plain_saves_keep_groups_in_sync(self):
+        self.assertEqual(self.groups(self.heads[0]), {(self.heads[0].pk, FamilyMembership.ROLE_HEAD, None)})
+
+        # What the admin does: change the fields and save, with no view involved
+        self.member.primary_family_member = self.heads[0]
+        self.member.relationship_to_primary = 'son'
+        self.member.save()
+        self.assertEqual(self.groups(self.member), {(self.heads[0].pk, FamilyMembership.ROLE_MEMBER, 'son')})
+
+        self.member.primary_family_member = self.heads[1]
+        self.member.relationship_to_primary = 'brother'
+        self.member.save()
+        self.assertEqual(self.groups(self.member), {(self.heads[1].pk, FamilyMembership.ROLE_MEMBER, 'brother')})
+        self.assertEqual(self.member.get_family_members(), [self.heads[1]])
+
+        self.member.primary_family_member = None
+        self.member.save()
+        self.assertEqual(self.groups(self.member), set())
+
+    def test_saves_of_other_fields_skip_the_sync(self):
+        self.member.primary_family_member = self.heads[0]
+        self.member.save(update_fields=['primary_family_member'])
+        FamilyMembership.objects.filter(user=self.member).delete()
+        self.member.save(update_fields=['full_name'])
+        self.assertEqual(self.groups(self.member), set())
+
+    def test_new_authorizer_heads_a_group(self):
+        user = User.objects.create(username='head3')
+        self.assertFalse(FamilyGroup.objects.filter(head=user).exists())
+        user.can_authorize_emergency_visits = True
+        user.save()
+        self.assertTrue(FamilyGroup.objects.filter(head=user).exists())
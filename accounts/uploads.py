@@ -0,0 +1,97 @@
+# accounts/uploads.py
+
+from functools import wraps
+
+from django.core.files.uploadhandler import FileUploadHandler, SkipFile
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+
+MAX_ID_PROOF_SIZE = 5 * 1024 * 1024
+MAX_PROFILE_PHOTO_SIZE = 3 * 1024 * 1024
+
+# Byte limit per upload field name
+UPLOAD_LIMITS = {
+    'id_proof': MAX_ID_PROOF_SIZE,
+    'aadhar_image': MAX_ID_PROOF_SIZE,
+    'profile_photo': MAX_PROFILE_PHOTO_SIZE,
+}
+
+# Leading bytes of the image formats we accept
+IMAGE_SIGNATURES = {
+    b'\xff\xd8\xff': 'image/jpeg',
+    b'\x89PNG\r\n\x1a\n': 'image/png',
+    b'GIF87a': 'image/gif',
+    b'GIF89a': 'image/gif',
+    b'BM': 'image/bmp',
+}
+
+def sniff_image(header):
+    """Content type of an image from its first bytes, or None if it isn't one we accept"""
+    if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+        return 'image/webp'
+    for signature, content_type in IMAGE_SIGNATURES.items():
+        if header.startswith(signature):
+            return content_type
+    return None
+
+class LimitedImageUploadHandler(FileUploadHandler):
+    """
+    Runs ahead of Django's memory/temp-file handlers and checks image uploads
+    while they stream in: the first chunk must carry a known image header and
+    the running size may not pass the field's limit. A rejected file is
+    skipped (its remaining bytes are discarded, never buffered) and the
+    reason is left in request.upload_errors for the view to show.
+    """
+
+    def new_file(self, field_name, *args, **kwargs):
+        super().new_file(field_name, *args, **kwargs)
+        self.limit = UPLOAD_LIMITS.get(field_name)
+        self.received = 0
+
+    def _reject(self, message):
+        if not hasattr(self.request, 'upload_errors'):
+            self.request.upload_errors = {}
+        self.request.upload_errors[self.field_name] = message
+        raise SkipFile()
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.limit is None:
+            return raw_data
+        if start == 0:
+            if sniff_image(raw_data[:16]) is None:
+                self._reject("Only image files (JPEG, PNG, GIF, BMP or WebP) are allowed.")
+        self.received += len(raw_data)
+        if self.received > self.limit:
+            self._reject(f"Image size should be less than {self.limit // (1024 * 1024)}MB.")
+        return raw_data
+
+    def file_complete(self, file_size):
+        # The next handler in the chain builds the UploadedFile
+        return None
+
+def limit_uploads(view):
+    """
+    Install LimitedImageUploadHandler for a view's POSTs. The handler must be
+    in place before request.POST is read, so CSRF is checked inside the
+    wrapper instead of by the middleware.
+    """
+    protected = csrf_protect(view)
+
+    @csrf_exempt
+    @wraps(view)
+    def wrap(request, *args, **kwargs):
+        if request.method == 'POST':
+            request.upload_handlers.insert(0, LimitedImageUploadHandler(request))
+        return protected(request, *args, **kwargs)
+    return wrap
+
+def form_is_valid(request, form):
+    """
+    Validate a bound form and report files the upload handler rejected on
+    their own fields (replacing the generic "required" error a dropped file causes).
+    """
+    form.is_valid()
+    for field_name, message in getattr(request, 'upload_errors', {}).items():
+        if field_name in form.fields:
+            form.errors.pop(field_name, None)
+            form.add_error(field_name, message)
+    return form.is_valid()
@@ -38,6 +38,10 @@ urlpatterns = [
     path('blacklist/add/', views.add_to_blacklist, name='add_to_blacklist'),
     path('blacklist/remove/<int:pk>/', views.remove_from_blacklist, name='remove_from_blacklist'),
 
+    # === IDENTITY SCREENING (Admin Only) ===
+
+    path('screening/', views.identity_screening, name='identity_screening'),
+
     # === API ENDPOINTS ===
     
     # Emergency Alert System APIs
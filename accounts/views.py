@@ -13,9 +13,16 @@ from .forms import (
     UserRegisterForm, StaffCreationForm, VisitorRegistrationForm,
     UserProfileForm, FamilyAuthorizationForm  # NEW: Added profile forms
 )
-from .models import User, Blacklist
+from .models import User, Blacklist, FamilyMembership
 from .decorators import admin_required
-from visitor_management.models import Visit, EmergencyAlert
+from .fingerprints import MAX_DISTANCE, queue_fingerprints, screening_report
+from prison_core.pagination import ApproximateTotal, paginate
+from .uploads import form_is_valid, limit_uploads
+from prison_core.images import queue_renditions
+from visitor_management.models import Visit
+from visitor_management.alerts import user_active_alert
+from visitor_management.forecast import upcoming_forecast
+from visitor_management.stats import jail_trends
 import re
 
 logger = logging.getLogger(__name__)
@@ -31,6 +38,7 @@ def landing_page(request):
         return redirect('dashboard')
     return render(request, 'landing_page.html')
 
+@limit_uploads
 def register(request):
     """
     UPDATED: Handles new visitor registration with enhanced family relationships.
@@ -40,8 +48,10 @@ def register(request):
     
     if request.method == "POST":
         form = VisitorRegistrationForm(request.POST, request.FILES)
-        if form.is_valid():
+        if form_is_valid(request, form):
             user = form.save()
+            queue_renditions(user)
+            queue_fingerprints(user)
             username = form.cleaned_data.get('username')
             messages.success(request, f"Account created successfully for {username}! Please login with your credentials.")
             return redirect("visitor_login")
@@ -52,6 +62,7 @@ def register(request):
     
     return render(request, "accounts/register.html", {"form": form})
 
+@limit_uploads
 def visitor_registration(request):
     """
     Enhanced visitor registration with family relationship support
@@ -61,8 +72,10 @@ def visitor_registration(request):
     
     if request.method == "POST":
         form = VisitorRegistrationForm(request.POST, request.FILES)
-        if form.is_valid():
+        if form_is_valid(request, form):
             user = form.save()
+            queue_renditions(user)
+            queue_fingerprints(user)
             username = form.cleaned_data.get('username')
             aadhar_masked = user.get_masked_aadhar() if hasattr(user, 'get_masked_aadhar') else 'XXXX XXXX XXXX'
             
@@ -77,8 +90,9 @@ def visitor_registration(request):
             
             messages.success(request, success_message)
             
-            # Auto-login the user after registration
-            login(request, user)
+            # Auto-login the user after registration; the user did not come
+            # from authenticate(), so name the backend to store in the session
+            login(request, user, backend='accounts.backends.PreloadedUserBackend')
             return redirect('dashboard')
         else:
             messages.error(request, 'Please correct the errors below.')
@@ -108,29 +122,18 @@ def visitor_login(request):
             messages.error(request, "Both username and password are required.")
             return render(request, "accounts/visitor_login.html")
         
-        try:
-            user_exists = User.objects.get(username=username)
-            logger.info(f"User '{username}' exists - Role: {user_exists.role}, Family: {user_exists.is_family_member}")
-        except User.DoesNotExist:
-            logger.error(f"User '{username}' does not exist in database")
-            messages.error(request, "Invalid username or password.")
-            return render(request, "accounts/visitor_login.html")
-        
+        # One joined query: user, jail and blacklist entry (see accounts.backends)
         user = authenticate(request, username=username, password=password)
         
         if user is not None:
-            logger.info(f"✓ Authentication successful for '{username}'")
+            logger.info(f"✓ Authentication successful for '{username}' - Role: {user.role}, Family: {user.is_family_member}")
             
-            # Check blacklist status
-            try:
-                blacklist_entry = user.blacklist
-                logger.warning(f"✗ User '{username}' is blacklisted: {blacklist_entry.reason}")
+            # Check blacklist status (preloaded by the authentication backend)
+            if user.is_blacklisted:
+                logger.warning(f"✗ User '{username}' is blacklisted: {user.blacklist.reason}")
                 messages.error(request, "Your account has been suspended. Please contact administration.")
                 return render(request, "accounts/visitor_login.html")
-            except Blacklist.DoesNotExist:
-                logger.info(f"✓ User '{username}' is not blacklisted")
-            except AttributeError:
-                logger.info(f"✓ User '{username}' has no blacklist relation")
+            logger.info(f"✓ User '{username}' is not blacklisted")
             
             if user.role in ["family", "visitor"]:
                 logger.info(f"✓ User '{username}' has correct role: {user.role}")
@@ -194,12 +197,13 @@ def user_logout(request):
 def dashboard(request):
     """Enhanced dashboard router with family relationship context"""
     user = request.user
-    active_alert = EmergencyAlert.objects.filter(is_active=True).first()
+    active_alert = user_active_alert(request.user)
     
     if user.role == "admin":
         pending_visits_count = 0
         active_staff_count = 0
         family_members_count = 0  # NEW: Track family members
+        trends = None
         
         if user.jail:
             pending_visits_count = Visit.objects.filter(
@@ -214,12 +218,15 @@ def dashboard(request):
             family_members_count = User.objects.filter(
                 role='family'
             ).count()
+            # Charts read the daily rollup, never the raw Visit table
+            trends = jail_trends(user.jail)
 
         context = {
             'pending_visits_count': pending_visits_count,
             'active_staff_count': active_staff_count,
             'family_members_count': family_members_count,  # NEW
             'active_alert': active_alert,
+            'trends': trends,
         }
         return render(request, "accounts/admin_dashboard.html", context)
     
@@ -241,7 +248,10 @@ def dashboard(request):
         # Family relationship notifications
         if user.role == 'family':
             if user.can_authorize_emergency_visits:
-                family_count = user.family_members.count()
+                family_count = FamilyMembership.objects.filter(
+                    group__head=user,
+                    role=FamilyMembership.ROLE_MEMBER
+                ).count()
                 if family_count > 0:
                     messages.info(request, f"You are authorizing emergency visits for {family_count} family member(s).")
             elif user.primary_family_member:
@@ -256,15 +266,15 @@ def user_profile(request):
     """Display user profile page with family information"""
     user = request.user
     
-    # Get family members
-    family_members = user.get_family_members() if hasattr(user, 'get_family_members') else []
+    # Get family members (one query over the materialized family group)
+    family_memberships = list(user.get_family_memberships())
     
     # Get active emergency alert
-    active_alert = EmergencyAlert.objects.filter(is_active=True).first()
+    active_alert = user_active_alert(request.user)
     
     context = {
         'user': user,
-        'family_members': family_members,
+        'family_memberships': family_memberships,
         'active_alert': active_alert,
         'can_request_emergency': user.can_request_emergency_visit() if hasattr(user, 'can_request_emergency_visit') else False,
     }
@@ -272,6 +282,7 @@ def user_profile(request):
     return render(request, 'accounts/user_profile.html', context)
 
 @login_required
+@limit_uploads
 def edit_profile(request):
     """Edit user profile information with family relationship support"""
     user = request.user
@@ -285,7 +296,7 @@ def edit_profile(request):
             auth_form = FamilyAuthorizationForm(request.POST, instance=user)
         
         # Validate forms
-        forms_valid = profile_form.is_valid()
+        forms_valid = form_is_valid(request, profile_form)
         if auth_form:
             forms_valid = forms_valid and auth_form.is_valid()
         
@@ -308,6 +319,8 @@ def edit_profile(request):
                         updated_user.is_family_member = False
                     
                     updated_user.save()
+                    queue_renditions(updated_user)
+                    queue_fingerprints(updated_user)
                     
                     # Enhanced success message
                     success_msg = 'Profile updated successfully!'
@@ -331,7 +344,7 @@ def edit_profile(request):
         if user.role == 'family':
             auth_form = FamilyAuthorizationForm(instance=user)
     
-    active_alert = EmergencyAlert.objects.filter(is_active=True).first()
+    active_alert = user_active_alert(request.user)
     
     context = {
         'profile_form': profile_form,
@@ -396,13 +409,17 @@ def manage_security_staff(request):
     else:
         form = StaffCreationForm()
 
-    security_staff = User.objects.filter(jail=request.user.jail, role='security')
-    active_alert = EmergencyAlert.objects.filter(is_active=True).first()
+    security_staff = paginate(
+        request, User.objects.filter(jail=request.user.jail, role='security'), ('username',),
+        per_page=50, with_total=True
+    )
+    active_alert = user_active_alert(request.user)
     
     context = {
         'form': form,
         'security_staff': security_staff,
         'active_alert': active_alert,
+        'forecast': upcoming_forecast(request.user.jail_id),
     }
     return render(request, 'accounts/manage_security_staff.html', context)
 
@@ -422,17 +439,21 @@ def delete_security_staff(request, pk):
 @admin_required
 def blacklist_list(request):
     """Displays a list of all blacklisted users and a form to add new ones."""
-    blacklisted_users = Blacklist.objects.all()
-    non_blacklisted_users = User.objects.filter(
-        role__in=['visitor', 'family'], 
-        blacklist__isnull=True
+    blacklisted_users = paginate(
+        request, Blacklist.objects.select_related('user'), ('-created_at', '-id'),
+        per_page=50, with_total=True
     )
+    # Visitors are picked by username in the form, not from a list of every account
+    active_users = ApproximateTotal(User.objects.filter(
+        role__in=['visitor', 'family'],
+        blacklist__isnull=True
+    ))
     
-    active_alert = EmergencyAlert.objects.filter(is_active=True).first()
+    active_alert = user_active_alert(request.user)
     
     context = {
         'blacklisted_users': blacklisted_users,
-        'non_blacklisted_users': non_blacklisted_users,
+        'active_users': active_users,
         'active_alert': active_alert,
     }
     return render(request, 'accounts/blacklist_management.html', context)
@@ -443,13 +464,18 @@ def add_to_blacklist(request):
     """Handles the submission to add a user to the blacklist."""
     if request.method == 'POST':
         user_id = request.POST.get('user_id')
+        username = request.POST.get('username', '').strip()
         reason = request.POST.get('reason')
         
-        if not user_id or not reason:
+        if not (user_id or username) or not reason:
             messages.error(request, "User and reason are required.")
             return redirect('blacklist_list')
         
-        user_to_blacklist = get_object_or_404(User, id=user_id)
+        lookup = {'id': user_id} if user_id else {'username': username}
+        user_to_blacklist = User.objects.filter(role__in=['visitor', 'family'], **lookup).first()
+        if user_to_blacklist is None:
+            messages.error(request, f"No visitor account found for '{username or user_id}'.")
+            return redirect('blacklist_list')
         
         # Check if user is already blacklisted
         if hasattr(user_to_blacklist, 'blacklist'):
@@ -496,7 +522,7 @@ def remove_from_blacklist(request, pk):
 def check_alert_api(request):
     """API endpoint to check if there's an active emergency alert"""
     try:
-        active_alert = EmergencyAlert.objects.filter(is_active=True).order_by('-issued_at').first()
+        active_alert = user_active_alert(request.user)
         
         if active_alert:
             response_data = {
@@ -549,11 +575,17 @@ def validate_aadhar_format(aadhar_number):
     return True
 
 @login_required
+@limit_uploads
 def update_aadhar_info(request):
     """Allow existing users to update their Aadhar information"""
     if request.method == 'POST':
         aadhar_number = request.POST.get('aadhar_number', '').strip()
         aadhar_image = request.FILES.get('aadhar_image')
+        upload_error = getattr(request, 'upload_errors', {}).get('aadhar_image')
+        
+        if upload_error:
+            messages.error(request, upload_error)
+            return redirect('update_aadhar_info')
         
         if not aadhar_number:
             messages.error(request, "Aadhar number is required.")
@@ -574,12 +606,34 @@ def update_aadhar_info(request):
         if aadhar_image:
             request.user.id_proof = aadhar_image
         request.user.save()
+        queue_renditions(request.user, 'id_proof')
+        queue_fingerprints(request.user, 'id_proof')
         
         messages.success(request, "Your Aadhar information has been updated successfully.")
         return redirect('user_profile')  # Changed from dashboard to user_profile
     
     return render(request, 'accounts/update_aadhar.html')
 
+# --- Identity Screening (Admin Only) ---
+
+@login_required
+@admin_required
+def identity_screening(request):
+    """Clusters of accounts whose Aadhar or face images are near duplicates (stored matches)"""
+    try:
+        max_distance = min(max(int(request.GET.get('distance', MAX_DISTANCE)), 0), MAX_DISTANCE)
+    except ValueError:
+        max_distance = MAX_DISTANCE
+    clusters = screening_report(max_distance)
+
+    context = {
+        'clusters': clusters,
+        'max_distance': max_distance,
+        'distances': range(MAX_DISTANCE + 1),
+        'active_alert': user_active_alert(request.user),
+    }
+    return render(request, 'accounts/identity_screening.html', context)
+
 # --- NEW: Family Relationship Management API ---
 
 @login_required
@@ -595,18 +649,24 @@ def get_family_members_api(request):
                 'message': 'Only family members can access this endpoint'
             }, status=403)
         
-        family_members = []
-        
-        if hasattr(user, 'get_family_members'):
-            for member in user.get_family_members():
-                family_members.append({
-                    'id': member.id,
-                    'full_name': member.full_name or member.username,
-                    'username': member.username,
-                    'relationship': member.get_relationship_to_primary_display() if member.relationship_to_primary else 'N/A',
-                    'can_authorize_emergency': member.can_authorize_emergency_visits,
-                    'role': member.get_role_display()
-                })
+        relationship_labels = dict(User.RELATIONSHIP_CHOICES)
+        role_labels = dict(User.ROLE_CHOICES)
+        
+        family_members = [
+            {
+                'id': row['user_id'],
+                'full_name': row['user__full_name'] or row['user__username'],
+                'username': row['user__username'],
+                'relationship': relationship_labels.get(row['relationship'], 'N/A'),
+                'family_role': row['role'],
+                'can_authorize_emergency': row['user__can_authorize_emergency_visits'],
+                'role': role_labels.get(row['user__role'], row['user__role'])
+            }
+            for row in user.get_family_memberships().values(
+                'user_id', 'user__full_name', 'user__username', 'user__role',
+                'user__can_authorize_emergency_visits', 'relationship', 'role'
+            )
+        ]
         
         return JsonResponse({
             'status': 'success',
@@ -0,0 +1,159 @@
+# api/resources.py
+
+from django.db.models import Q
+from django.utils.dateparse import parse_date
+
+from accounts.models import User
+from prison_core.models import Jail, Prisoner
+from visitor_management.alerts import visible_to
+from visitor_management.models import EmergencyAlert, Visit
+
+STAFF_ROLES = ('admin', 'security')
+
+def parse_bool(value):
+    if value.lower() in ('1', 'true', 'yes'):
+        return True
+    if value.lower() in ('0', 'false', 'no'):
+        return False
+    raise ValueError("expected true or false")
+
+def parse_iso_date(value):
+    parsed = parse_date(value)
+    if parsed is None:
+        raise ValueError("expected YYYY-MM-DD")
+    return parsed
+
+class Resource:
+    """
+    Read-only description of one API collection.
+
+    fields maps public field names to ORM paths read with values(), so a
+    request for ?fields=id,status selects only those columns (and joins).
+    staff_fields are only returned to admin and security users.
+    """
+
+    def __init__(self, name, model, fields, default_fields, ordering,
+                 filters=None, staff_fields=(), last_modified=None, scope=None):
+        self.name = name
+        self.model = model
+        self.fields = fields
+        self.default_fields = default_fields
+        self.ordering = ordering
+        self.filters = filters or {}
+        self.staff_fields = set(staff_fields)
+        self.last_modified = last_modified
+        self.scope = scope
+
+    def allowed_fields(self, principal):
+        if principal.role in STAFF_ROLES:
+            return list(self.fields)
+        return [name for name in self.fields if name not in self.staff_fields]
+
+    def queryset(self, principal):
+        queryset = self.model._default_manager.all()
+        if self.scope is not None:
+            queryset = self.scope(queryset, principal)
+        return queryset
+
+def _visit_scope(queryset, principal):
+    if principal.role in STAFF_ROLES:
+        return queryset.filter(prisoner__jail_id=principal.jail_id)
+    return queryset.filter(visitor_id=principal.id)
+
+def _prisoner_scope(queryset, principal):
+    if principal.role in STAFF_ROLES:
+        return queryset.filter(jail_id=principal.jail_id)
+    # Visitors only see the prisoner they are related to and those they have visits with
+    return queryset.filter(
+        Q(id__in=User.objects.filter(pk=principal.id).values('related_prisoner_id'))
+        | Q(id__in=Visit.objects.filter(visitor_id=principal.id).values('prisoner_id'))
+    )
+
+def _alert_scope(queryset, principal):
+    return queryset.filter(visible_to(principal.jail_id))
+
+RESOURCES = {
+    'visits': Resource(
+        'visits', Visit,
+        fields={
+            'id': 'id',
+            'visit_date': 'visit_date',
+            'time_slot': 'visit_time_slot',
+            'status': 'status',
+            'visit_type': 'visit_type',
+            'visitor': 'visitor__username',
+            'visitor_name': 'visitor__full_name',
+            'prisoner': 'prisoner__prisoner_id',
+            'prisoner_first_name': 'prisoner__first_name',
+            'prisoner_last_name': 'prisoner__last_name',
+            'jail': 'prisoner__jail_id',
+            'jail_name': 'prisoner__jail__name',
+            'check_in_time': 'check_in_time',
+            'check_out_time': 'check_out_time',
+            'updated_at': 'updated_at',
+        },
+        default_fields=['id', 'visit_date', 'time_slot', 'status', 'visit_type', 'prisoner', 'jail_name'],
+        ordering=('-visit_date', '-id'),
+        filters={
+            'status': ('status', str.upper),
+            'visit_type': ('visit_type', str.upper),
+            'visit_date': ('visit_date', parse_iso_date),
+            'from': ('visit_date__gte', parse_iso_date),
+            'to': ('visit_date__lte', parse_iso_date),
+            'prisoner': ('prisoner__prisoner_id', str),
+        },
+        last_modified='updated_at',
+        scope=_visit_scope,
+    ),
+    'prisoners': Resource(
+        'prisoners', Prisoner,
+        fields={
+            'id': 'id',
+            'prisoner_id': 'prisoner_id',
+            'first_name': 'first_name',
+            'last_name': 'last_name',
+            'date_of_birth': 'date_of_birth',
+            'jail': 'jail_id',
+            'jail_name': 'jail__name',
+        },
+        default_fields=['id', 'prisoner_id', 'first_name', 'last_name', 'jail'],
+        ordering=('id',),
+        filters={
+            'jail': ('jail_id', int),
+            'prisoner_id': ('prisoner_id', str),
+        },
+        staff_fields=['date_of_birth'],
+        scope=_prisoner_scope,
+    ),
+    'jails': Resource(
+        'jails', Jail,
+        fields={
+            'id': 'id',
+            'name': 'name',
+            'location': 'location',
+        },
+        default_fields=['id', 'name', 'location'],
+        ordering=('id',),
+    ),
+    'alerts': Resource(
+        'alerts', EmergencyAlert,
+        fields={
+            'id': 'id',
+            'message': 'message',
+            'issued_at': 'issued_at',
+            'is_active': 'is_active',
+            'issued_by': 'issued_by__username',
+            'jail': 'facility_id',
+            'is_broadcast': 'is_broadcast',
+        },
+        default_fields=['id', 'message', 'issued_at', 'is_active', 'is_broadcast'],
+        ordering=('-issued_at', '-id'),
+        filters={
+            'is_active': ('is_active', parse_bool),
+            'is_broadcast': ('is_broadcast', parse_bool),
+        },
+        staff_fields=['issued_by'],
+        last_modified='updated_at',
+        scope=_alert_scope,
+    ),
+}
@@ -0,0 +1,44 @@
+from datetime import date
+
+from django.test import TestCase
+from django.urls import reverse
+
+from accounts.models import User
+from prison_core.models import Jail, Prisoner
+from visitor_management.models import Visit
+
+def make_prisoner(jail, prisoner_id):
+    return Prisoner.objects.create(
+        jail=jail, prisoner_id=prisoner_id, first_name='Prisoner', last_name=prisoner_id, date_of_birth=date(1990, 1, 1)
+    )
+
+class PrisonerScopeTests(TestCase):
+    def setUp(self):
+        self.jails = [Jail.objects.create(name=f'Jail {number}', location='Thiruvananthapuram') for number in (1, 2)]
+        self.related, self.visited, self.stranger = (
+            make_prisoner(self.jails[0], 'P1'), make_prisoner(self.jails[1], 'P2'), make_prisoner(self.jails[0], 'P3'),
+        )
+        self.visitor = User.objects.create(username='visitor1', role='family', related_prisoner=self.related)
+        Visit.objects.create(
+            visitor=self.visitor, prisoner=self.visited, visit_date=date(2030, 1, 1), visit_time_slot='10:00 AM - 11:00 AM'
+        )
+
+    def prisoner_ids(self, **params):
+        response = self.client.get(reverse('api_prisoners'), params)
+        self.assertEqual(response.status_code, 200)
+        return [row['prisoner_id'] for row in response.json()['results']]
+
+    def test_visitor_sees_related_and_visited_prisoners_only(self):
+        self.client.force_login(self.visitor)
+        self.assertEqual(self.prisoner_ids(), ['P1', 'P2'])
+        self.assertEqual(self.client.get(reverse('api_prisoner', args=[self.stranger.pk])).status_code, 404)
+        self.assertEqual(self.client.get(reverse('api_prisoner', args=[self.visited.pk])).status_code, 200)
+        self.assertEqual(self.client.get(reverse('api_prisoners'), {'fields': 'date_of_birth'}).status_code, 400)
+
+    def test_visitor_without_links_sees_no_prisoners(self):
+        self.client.force_login(User.objects.create(username='visitor2'))
+        self.assertEqual(self.prisoner_ids(), [])
+
+    def test_staff_see_their_jail(self):
+        self.client.force_login(User.objects.create(username='admin1', role='admin', jail=self.jails[0]))
+        self.assertEqual(self.prisoner_ids(), ['P1', 'P3'])
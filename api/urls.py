@@ -0,0 +1,15 @@
+from django.urls import path
+from . import views
+
+# Version 1 of the read-only JSON API (mounted at /api/v1/)
+urlpatterns = [
+    path('visits/', views.resource_list, {'resource': 'visits'}, name='api_visits'),
+    path('visits/<int:pk>/', views.resource_detail, {'resource': 'visits'}, name='api_visit'),
+    path('prisoners/', views.resource_list, {'resource': 'prisoners'}, name='api_prisoners'),
+    path('prisoners/<int:pk>/', views.resource_detail, {'resource': 'prisoners'}, name='api_prisoner'),
+    path('jails/', views.resource_list, {'resource': 'jails'}, name='api_jails'),
+    path('jails/<int:pk>/', views.resource_detail, {'resource': 'jails'}, name='api_jail'),
+    path('alerts/', views.resource_list, {'resource': 'alerts'}, name='api_alerts'),
+    path('alerts/<int:pk>/', views.resource_detail, {'resource': 'alerts'}, name='api_alert'),
+    path('visit-events/', views.visit_event_feed, name='api_visit_events'),
+]
@@ -0,0 +1,197 @@
+# api/views.py
+
+import hashlib
+import json
+from functools import wraps
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse, JsonResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import require_GET
+
+from prison_core.pagination import InvalidCursor, KeysetPaginator, encode_cursor
+from visitor_management.models import VisitEvent
+from .resources import RESOURCES, STAFF_ROLES
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+
+def api_error(message, status):
+    return JsonResponse({'error': message}, status=status)
+
+def api_login_required(function):
+    """Like login_required, but answers 401 JSON instead of redirecting to a login page"""
+    @wraps(function)
+    def wrap(request, *args, **kwargs):
+        principal = getattr(request, 'principal', request.user)
+        if not principal.is_authenticated:
+            return api_error("Authentication required.", 401)
+        return function(request, *args, **kwargs)
+    return wrap
+
+def _selected_fields(request, resource, principal):
+    allowed = resource.allowed_fields(principal)
+    requested = request.GET.get('fields')
+    if not requested:
+        return [name for name in resource.default_fields if name in allowed]
+    fields = list(dict.fromkeys(name.strip() for name in requested.split(',') if name.strip()))
+    unknown = [name for name in fields if name not in allowed]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}. Available: {', '.join(allowed)}")
+    return fields
+
+def _apply_filters(request, resource, queryset):
+    for param, (lookup, parse) in resource.filters.items():
+        value = request.GET.get(param)
+        if value is None:
+            continue
+        try:
+            queryset = queryset.filter(**{lookup: parse(value)})
+        except ValueError as e:
+            raise ValueError(f"Invalid value for {param}: {e}")
+    return queryset
+
+def _conditional_json(request, payload, last_modified=None):
+    """
+    Serialize once, derive a strong ETag from the bytes, and answer 304 when
+    the client already holds them (If-None-Match / If-Modified-Since).
+    """
+    body = json.dumps(payload, cls=DjangoJSONEncoder, separators=(',', ':')).encode()
+    etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+    response = get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=last_modified.timestamp() if last_modified else None,
+    )
+    if response is None:
+        response = HttpResponse(body, content_type='application/json')
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ['Cookie'])
+    return response
+
+@require_GET
+@api_login_required
+@gzip_page
+def resource_list(request, resource):
+    """
+    GET /api/v1/<resource>/?fields=a,b&limit=50&cursor=...&<filter>=...
+    Keyset-paginated; follow "next" until it is null.
+    """
+    resource = RESOURCES[resource]
+    principal = getattr(request, 'principal', request.user)
+    try:
+        fields = _selected_fields(request, resource, principal)
+        queryset = _apply_filters(request, resource, resource.queryset(principal))
+        limit = min(max(int(request.GET.get('limit', DEFAULT_LIMIT)), 1), MAX_LIMIT)
+    except ValueError as e:
+        return api_error(str(e), 400)
+
+    # Only the selected columns, plus the sort keys the page needs
+    paths = [resource.fields[name] for name in fields]
+    keys = [name.lstrip('-') for name in resource.ordering]
+    extra = [name for name in dict.fromkeys(keys) if name not in paths]
+    paginator = KeysetPaginator(queryset.values(*paths, *extra), resource.ordering, per_page=limit)
+    try:
+        page = paginator.page(request.GET.get('cursor'))
+    except InvalidCursor as e:
+        return api_error(str(e), 400)
+
+    results = [{name: row[resource.fields[name]] for name in fields} for row in page]
+    next_url = None
+    if page.next_cursor:
+        query = request.GET.copy()
+        query['cursor'] = page.next_cursor
+        next_url = request.build_absolute_uri(f"{request.path}?{query.urlencode()}")
+
+    # No Last-Modified on lists: a row that left the filter would never move
+    # the newest timestamp of the rows still in the page. The ETag covers it.
+    return _conditional_json(request, {
+        'resource': resource.name,
+        'fields': fields,
+        'results': results,
+        'next_cursor': page.next_cursor,
+        'next': next_url,
+    })
+
+@require_GET
+@api_login_required
+@gzip_page
+def resource_detail(request, resource, pk):
+    """GET /api/v1/<resource>/<id>/?fields=a,b"""
+    resource = RESOURCES[resource]
+    principal = getattr(request, 'principal', request.user)
+    try:
+        fields = _selected_fields(request, resource, principal)
+    except ValueError as e:
+        return api_error(str(e), 400)
+
+    paths = [resource.fields[name] for name in fields]
+    extra = [resource.last_modified] if resource.last_modified and resource.last_modified not in paths else []
+    row = resource.queryset(principal).filter(pk=pk).values(*paths, *extra).first()
+    if row is None:
+        return api_error("Not found.", 404)
+
+    last_modified = row[resource.last_modified] if resource.last_modified else None
+    return _conditional_json(
+        request,
+        {name: row[resource.fields[name]] for name in fields},
+        last_modified,
+    )
+
+@require_GET
+@api_login_required
+@gzip_page
+def visit_event_feed(request):
+    """
+    GET /api/v1/visit-events/?cursor=...&limit=200&visit=<id>
+    Visit transitions in sequence order. Store the returned "cursor" and send
+    it back to receive only newer events; "has_more" means fetch again now.
+    Staff see their jail's events, visitors their own.
+    """
+    principal = getattr(request, 'principal', request.user)
+    events = VisitEvent.objects.all()
+    if principal.role in STAFF_ROLES:
+        events = events.filter(jail_id=principal.jail_id)
+    else:
+        events = events.filter(visitor_id=principal.id)
+    try:
+        limit = min(max(int(request.GET.get('limit', MAX_LIMIT)), 1), MAX_LIMIT)
+        if request.GET.get('visit'):
+            events = events.filter(visit_id=int(request.GET['visit']))
+    except ValueError:
+        return api_error("limit and visit must be numbers", 400)
+
+    cursor = request.GET.get('cursor')
+    paginator = KeysetPaginator(
+        events.values('sequence', 'event_type', 'visit_id', 'from_status', 'to_status',
+                      'actor__username', 'data', 'created_at'),
+        ('sequence',), per_page=limit
+    )
+    try:
+        page = paginator.page(cursor)
+    except InvalidCursor as e:
+        return api_error(str(e), 400)
+
+    results = [
+        {
+            'sequence': row['sequence'],
+            'type': row['event_type'],
+            'visit': row['visit_id'],
+            'from_status': row['from_status'] or None,
+            'to_status': row['to_status'],
+            'actor': row['actor__username'] if principal.role in STAFF_ROLES else None,
+            'data': row['data'],
+            'at': row['created_at'],
+        }
+        for row in page
+    ]
+    return _conditional_json(request, {
+        'results': results,
+        'cursor': encode_cursor([results[-1]['sequence']]) if results else cursor,
+        'has_more': page.has_next,
+    })
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class PrisonCoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'prison_core'
+
+    def ready(self):
+        from .signals import connect_media_signals
+        connect_media_signals()
@@ -0,0 +1,109 @@
+# prison_core/images.py
+
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from PIL import Image, ImageOps, features
+
+logger = logging.getLogger(__name__)
+
+# Downscaled copies served instead of the (up to 5 MB) originals.
+# name: (longest side in px, quality)
+RENDITIONS = {
+    'gate': (480, 78),   # gate verification card
+    'thumb': (160, 70),  # list thumbnails
+}
+RENDITION_FORMAT = 'WEBP' if features.check('webp') else 'JPEG'
+RENDITION_EXTENSION = '.webp' if RENDITION_FORMAT == 'WEBP' else '.jpg'
+RENDITION_DIR = 'renditions'
+
+# Image fields that get renditions, per model label
+IMAGE_FIELDS = {
+    'accounts.User': ['profile_photo', 'id_proof'],
+    'prison_core.Prisoner': ['photo'],
+}
+
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='renditions')
+
+def rendition_name(name, rendition):
+    """Storage name of a rendition, derived from the original's name"""
+    base, _ = os.path.splitext(name)
+    return f"{RENDITION_DIR}/{base}__{rendition}{RENDITION_EXTENSION}"
+
+def rendition_url(field_file, rendition):
+    """
+    URL of the requested rendition, falling back to the original until the
+    rendition has been built. 'original' always returns the original URL.
+    """
+    if not field_file:
+        return None
+    if rendition != 'original':
+        name = rendition_name(field_file.name, rendition)
+        if default_storage.exists(name):
+            return default_storage.url(name)
+    return field_file.url
+
+def build_renditions(field_file, force=False):
+    """Write every rendition of one stored image. Returns the number written."""
+    if not field_file:
+        return 0
+    # Renditions keep deterministic names, so they bypass the content-addressed field storage
+    storage = default_storage
+    pending = {
+        rendition: rendition_name(field_file.name, rendition)
+        for rendition in RENDITIONS
+    }
+    if not force:
+        pending = {rendition: name for rendition, name in pending.items() if not storage.exists(name)}
+    if not pending:
+        return 0
+
+    with field_file.storage.open(field_file.name, 'rb') as source:
+        image = Image.open(source)
+        image.draft('RGB', (max(RENDITIONS[r][0] for r in pending),) * 2)  # fast JPEG downscale on decode
+        image = ImageOps.exif_transpose(image).convert('RGB')
+
+    for rendition, name in pending.items():
+        size, quality = RENDITIONS[rendition]
+        copy = image.copy()
+        copy.thumbnail((size, size), Image.LANCZOS)
+        buffer = BytesIO()
+        if RENDITION_FORMAT == 'WEBP':
+            copy.save(buffer, format='WEBP', quality=quality, method=4)
+        else:
+            copy.save(buffer, format='JPEG', quality=quality, optimize=True, progressive=True)
+        if storage.exists(name):
+            storage.delete(name)
+        storage.save(name, ContentFile(buffer.getvalue()))
+    return len(pending)
+
+def _build_for_names(model, pk, field_names):
+    try:
+        instance = model._default_manager.only('pk', *field_names).get(pk=pk)
+        for field_name in field_names:
+            try:
+                build_renditions(getattr(instance, field_name))
+            except Exception as e:
+                logger.error(f"Rendition build failed for {model.__name__} #{pk} {field_name}: {e}")
+    except model.DoesNotExist:
+        pass
+    finally:
+        # Worker threads hold their own connection; don't leak it
+        connection.close()
+
+def queue_renditions(instance, *field_names):
+    """
+    Build renditions for the given image fields in the background once the
+    current transaction commits. Defaults to every image field of the model.
+    """
+    field_names = field_names or IMAGE_FIELDS.get(instance._meta.label, [])
+    field_names = [name for name in field_names if getattr(instance, name)]
+    if not field_names:
+        return
+    model, pk = instance._meta.model, instance.pk
+    transaction.on_commit(lambda: _executor.submit(_build_for_names, model, pk, field_names))
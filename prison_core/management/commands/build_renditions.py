@@ -0,0 +1,48 @@
+# prison_core/management/commands/build_renditions.py
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from prison_core.images import IMAGE_FIELDS, build_renditions
+
+class Command(BaseCommand):
+    help = "Backfill downscaled renditions (gate card, thumbnail) for existing profile, ID and prisoner photos"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help="Parallel image workers")
+        parser.add_argument('--force', action='store_true', help="Rebuild renditions that already exist")
+
+    def _jobs(self):
+        for label, field_names in IMAGE_FIELDS.items():
+            model = apps.get_model(label)
+            rows = model._default_manager.only('pk', *field_names).iterator(chunk_size=1000)
+            for instance in rows:
+                for field_name in field_names:
+                    field_file = getattr(instance, field_name)
+                    if field_file:
+                        yield f"{label} #{instance.pk} {field_name}", field_file
+
+    def handle(self, *args, **options):
+        written = failed = 0
+        # Collect first: the worker threads must not share the iterator's cursor
+        jobs = list(self._jobs())
+        connection.close()
+
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            futures = {
+                pool.submit(build_renditions, field_file, options['force']): description
+                for description, field_file in jobs
+            }
+            for future in as_completed(futures):
+                try:
+                    written += future.result()
+                except Exception as e:
+                    failed += 1
+                    self.stderr.write(f"{futures[future]}: {e}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Checked {len(jobs)} images: {written} renditions written, {failed} failed"
+        ))
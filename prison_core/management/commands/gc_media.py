@@ -0,0 +1,204 @@
+# prison_core/management/commands/gc_media.py
+
+import json
+import os
+import shutil
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from prison_core.images import RENDITIONS, rendition_name
+from prison_core.models import StoredMedia
+from prison_core.storage import CONTENT_ADDRESSED_FIELDS
+
+# Progress of an interrupted run, kept next to manage.py (not under MEDIA_ROOT)
+STATE_FILE = '.gc_media_state.json'
+
+def _scan(root, directory, live, cutoff, recursive=True):
+    """Walk one directory and return its unreferenced files older than cutoff as (name, mtime)"""
+    orphans = []
+    stack = [os.path.join(root, directory)]
+    while stack:
+        with os.scandir(stack.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    if recursive:
+                        stack.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    name = os.path.relpath(entry.path, root).replace(os.sep, '/')
+                    if name in live:
+                        continue
+                    mtime = entry.stat(follow_symlinks=False).st_mtime
+                    if mtime < cutoff:
+                        orphans.append((name, mtime))
+    return orphans
+
+def _prune_empty(root, path):
+    """Remove now-empty shard directories up to (not including) the media root"""
+    directory = os.path.dirname(path)
+    while directory and os.path.abspath(directory) != os.path.abspath(root):
+        try:
+            os.rmdir(directory)
+        except OSError:
+            break
+        directory = os.path.dirname(directory)
+
+class Command(BaseCommand):
+    help = "Delete or archive media files that no database row references any more"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--archive', help="Move orphans here (sharded by year/month) instead of deleting them")
+        parser.add_argument('--min-age', type=float, default=24, help="Only collect files, and correct reference counts, older than this many hours")
+        parser.add_argument('--workers', type=int, default=4, help="Parallel directory scanners")
+        parser.add_argument('--resume', action='store_true', help="Skip directories finished by an interrupted run")
+        parser.add_argument('--dry-run', action='store_true', help="Only report what would be collected")
+
+    def _live_references(self):
+        """Every stored name a row points at, its renditions, and per-name reference counts"""
+        counts = Counter()
+        for label, field_names in CONTENT_ADDRESSED_FIELDS.items():
+            model = apps.get_model(label)
+            for field_name in field_names:
+                queryset = model._default_manager.exclude(**{field_name: ''}).exclude(**{f'{field_name}__isnull': True})
+                counts.update(queryset.values_list(field_name, flat=True).iterator(chunk_size=5000))
+        live = set(counts)
+        live.update(rendition_name(name, rendition) for name in counts for rendition in RENDITIONS)
+        return live, counts
+
+    def _units(self, root):
+        """
+        Work units for the scanners: the second level under each top-level media
+        directory (the <aa> hash shards), so large trees split evenly.
+        """
+        units = []
+        with os.scandir(root) as top:
+            for entry in top:
+                if not entry.is_dir(follow_symlinks=False):
+                    continue
+                with os.scandir(entry.path) as children:
+                    for child in children:
+                        if child.is_dir(follow_symlinks=False):
+                            units.append(f"{entry.name}/{child.name}")
+                units.append(f"{entry.name}/.")  # files sitting directly in the directory
+        return sorted(units)
+
+    def _scan_unit(self, root, unit, live, cutoff):
+        directory, child = unit.split('/', 1)
+        if child == '.':
+            return _scan(root, directory, live, cutoff, recursive=False)
+        return _scan(root, unit, live, cutoff)
+
+    def _collect(self, root, name, mtime, archive):
+        """Delete or archive one orphan. Returns its size in bytes."""
+        path = os.path.join(root, name)
+        size = os.path.getsize(path)
+        if archive:
+            stamp = datetime.fromtimestamp(mtime)
+            target = os.path.join(archive, f"{stamp:%Y}", f"{stamp:%m}", name)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.move(path, target)
+        else:
+            os.remove(path)
+        _prune_empty(root, path)
+        return size
+
+    def _references(self, name):
+        """Rows referencing one stored name right now"""
+        total = 0
+        for label, field_names in CONTENT_ADDRESSED_FIELDS.items():
+            model = apps.get_model(label)
+            for field_name in field_names:
+                if name.startswith(model._meta.get_field(field_name).upload_to):
+                    total += model._default_manager.filter(**{field_name: name}).count()
+        return total
+
+    def _reconcile(self, counts, grace):
+        """
+        Bring StoredMedia in line with what rows actually reference; drop
+        unreferenced records. The snapshot only picks candidates: each one is
+        recounted under a row lock on its record (the lock an upload takes to
+        bump the count), and records touched within the grace period are left
+        alone, since their upload may not have committed its row yet.
+        """
+        candidates = [
+            pk for pk, name, ref_count in StoredMedia.objects.filter(updated_at__lt=grace)
+            .values_list('pk', 'name', 'ref_count').iterator(chunk_size=2000)
+            if counts.get(name, 0) != ref_count
+        ]
+        corrected = 0
+        for pk in candidates:
+            with transaction.atomic():
+                record = StoredMedia.objects.select_for_update().filter(pk=pk, updated_at__lt=grace).first()
+                if record is None:
+                    continue
+                actual = self._references(record.name)
+                if actual == 0:
+                    record.delete()
+                elif actual != record.ref_count:
+                    # update() keeps updated_at, which tracks uploads and releases only
+                    StoredMedia.objects.filter(pk=pk).update(ref_count=actual)
+                else:
+                    continue
+                corrected += 1
+        return corrected
+
+    def handle(self, *args, **options):
+        root = settings.MEDIA_ROOT
+        state_path = os.path.join(settings.BASE_DIR, STATE_FILE)
+        dry_run = options['dry_run']
+        cutoff = time.time() - options['min_age'] * 3600
+
+        done = set()
+        if options['resume'] and os.path.exists(state_path):
+            with open(state_path) as state_file:
+                done = set(json.load(state_file)['done'])
+
+        live, counts = self._live_references()
+        if not dry_run:
+            grace = timezone.now() - timedelta(hours=options['min_age'])
+            self.stdout.write(f"{self._reconcile(counts, grace)} StoredMedia records corrected")
+        units = [unit for unit in self._units(root) if unit not in done]
+        self.stdout.write(f"{len(live)} live names; scanning {len(units)} directories ({len(done)} already done)")
+
+        collected = collected_bytes = 0
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            futures = {pool.submit(self._scan_unit, root, unit, live, cutoff): unit for unit in units}
+            for future in as_completed(futures):
+                unit = futures[future]
+                try:
+                    orphans = future.result()
+                except OSError as e:
+                    self.stderr.write(f"{unit}: {e}")
+                    continue
+                if orphans and not dry_run:
+                    # A file can gain a reference after the snapshot (identical bytes
+                    # re-uploaded); the storage then counts it in StoredMedia again.
+                    revived = set(StoredMedia.objects.filter(
+                        name__in=[name for name, _ in orphans], ref_count__gt=0
+                    ).values_list('name', flat=True))
+                    orphans = [(name, mtime) for name, mtime in orphans if name not in revived]
+                for name, mtime in orphans:
+                    if dry_run:
+                        self.stdout.write(f"orphan: {name}")
+                    else:
+                        collected_bytes += self._collect(root, name, mtime, options['archive'])
+                    collected += 1
+                if not dry_run:
+                    done.add(unit)
+                    with open(state_path, 'w') as state_file:
+                        json.dump({'done': sorted(done)}, state_file)
+
+        if not dry_run and os.path.exists(state_path):
+            os.remove(state_path)
+
+        action = 'would be collected' if dry_run else ('archived' if options['archive'] else 'deleted')
+        self.stdout.write(self.style.SUCCESS(
+            f"{collected} orphaned files {action}" + ('' if dry_run else f", {collected_bytes // 1024} KB freed")
+        ))
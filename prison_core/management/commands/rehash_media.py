@@ -0,0 +1,57 @@
+# prison_core/management/commands/rehash_media.py
+
+from django.apps import apps
+from django.core.management.base import BaseCommand
+
+from django.db.models import F
+
+from prison_core.models import StoredMedia
+from prison_core.storage import CONTENT_ADDRESSED_FIELDS, ContentAddressedStorage, is_content_addressed
+
+class Command(BaseCommand):
+    help = "Move existing uploads into the content-addressed layout, collapsing duplicate files"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keep-originals', action='store_true', help="Leave the old files on disk")
+        parser.add_argument('--dry-run', action='store_true', help="Only report what would change")
+
+    def handle(self, *args, **options):
+        moved = {}  # old name -> hashed name
+        rows = 0
+
+        for label, field_names in CONTENT_ADDRESSED_FIELDS.items():
+            model = apps.get_model(label)
+            for field_name in field_names:
+                storage = model._meta.get_field(field_name).storage
+                queryset = model._default_manager.exclude(**{field_name: ''}).exclude(**{f'{field_name}__isnull': True})
+                for pk, name in queryset.values_list('pk', field_name).iterator(chunk_size=1000):
+                    if name in moved:
+                        hashed = moved[name]
+                        if not options['dry_run']:
+                            StoredMedia.objects.filter(name=hashed).update(ref_count=F('ref_count') + 1)
+                    elif is_content_addressed(name):
+                        continue  # already content-addressed
+                    elif not storage.exists(name):
+                        self.stderr.write(f"{label} #{pk} {field_name}: missing file {name}")
+                        continue
+                    elif options['dry_run']:
+                        hashed = moved[name] = name
+                    else:
+                        with storage.open(name, 'rb') as source:
+                            hashed = moved[name] = storage.save(name, source)
+                    if not options['dry_run']:
+                        model._default_manager.filter(pk=pk).update(**{field_name: hashed})
+                    rows += 1
+
+        removed = 0
+        if not options['dry_run'] and not options['keep_originals']:
+            for old_name, hashed in moved.items():
+                if old_name != hashed:
+                    # Legacy files have no StoredMedia record, so this deletes outright
+                    ContentAddressedStorage().delete(old_name)
+                    removed += 1
+
+        unique = len(set(moved.values()))
+        self.stdout.write(self.style.SUCCESS(
+            f"{rows} references to {len(moved)} files rewritten to {unique} content-addressed files; {removed} old files removed"
+        ))
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prison_core', '0002_storedmedia_alter_prisoner_photo'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='prisoner',
+            index=models.Index(fields=['jail', 'prisoner_id'], name='prison_core_jail_id_d58726_idx'),
+        ),
+    ]
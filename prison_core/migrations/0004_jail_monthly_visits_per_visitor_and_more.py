@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prison_core', '0003_prisoner_prison_core_jail_id_d58726_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='jail',
+            name='monthly_visits_per_visitor',
+            field=models.PositiveSmallIntegerField(blank=True, help_text='Approved visits a visitor may make to this jail per calendar month', null=True),
+        ),
+        migrations.AddField(
+            model_name='jail',
+            name='weekly_visits_per_prisoner',
+            field=models.PositiveSmallIntegerField(blank=True, help_text='Approved visits a prisoner may receive per week (Monday to Sunday)', null=True),
+        ),
+    ]
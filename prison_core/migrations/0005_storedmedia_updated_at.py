@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:40
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def fill_updated_at(apps, schema_editor):
+    StoredMedia = apps.get_model('prison_core', 'StoredMedia')
+    StoredMedia.objects.update(updated_at=models.F('created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prison_core', '0004_jail_monthly_visits_per_visitor_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='storedmedia',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_updated_at, migrations.RunPython.noop),
+    ]
@@ -1,10 +1,18 @@
 # Add this import at the top
 from django.db import models
+from .storage import media_storage
 
 # This is your new Jail model
 class Jail(models.Model):
     name = models.CharField(max_length=200, unique=True)
     location = models.CharField(max_length=200)
+    # Visit quotas; empty means no limit. Enforced from VisitQuotaCounter rows.
+    weekly_visits_per_prisoner = models.PositiveSmallIntegerField(
+        blank=True, null=True, help_text="Approved visits a prisoner may receive per week (Monday to Sunday)"
+    )
+    monthly_visits_per_visitor = models.PositiveSmallIntegerField(
+        blank=True, null=True, help_text="Approved visits a visitor may make to this jail per calendar month"
+    )
 
     def __str__(self):
         return self.name
@@ -18,7 +26,25 @@ class Prisoner(models.Model):
     last_name = models.CharField(max_length=100)
     prisoner_id = models.CharField(max_length=20, unique=True)
     date_of_birth = models.DateField()
-    photo = models.ImageField(upload_to='prisoner_photos/', blank=True, null=True)
+    photo = models.ImageField(upload_to='prisoner_photos/', storage=media_storage, blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['jail', 'prisoner_id']),
+        ]
+
+    def __str__(self):
+        return f"{self.first_name} {self.last_name} ({self.prisoner_id})"
+
+class StoredMedia(models.Model):
+    """Reference count for a content-addressed file written by ContentAddressedStorage"""
+    name = models.CharField(max_length=255, unique=True)
+    sha256 = models.CharField(max_length=64, db_index=True)
+    size = models.PositiveBigIntegerField()
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Last reference change; gc_media leaves recently touched records alone
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
-        return f"{self.first_name} {self.last_name} ({self.prisoner_id})"
\ No newline at end of file
+        return f"{self.name} ({self.ref_count} refs)"
@@ -0,0 +1,185 @@
+# prison_core/pagination.py
+
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.db import NotSupportedError
+from django.db.models import Q
+
+class InvalidCursor(ValueError):
+    pass
+
+def encode_cursor(values):
+    raw = json.dumps(values, separators=(',', ':'), default=str).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (ValueError, TypeError):
+        raise InvalidCursor("Malformed cursor")
+    if not isinstance(values, list):
+        raise InvalidCursor("Malformed cursor")
+    return values
+
+class KeysetPaginator:
+    """
+    Cursor pagination on an indexed, unique ordering such as
+    ('-visit_date', '-id'). Each page is a "WHERE key < last key ... LIMIT n"
+    query, so page 10,000 costs the same as page 1 (no COUNT, no OFFSET).
+    Ordering fields must be non-null and the last one unique (normally the
+    primary key).
+    """
+
+    def __init__(self, queryset, ordering, per_page=25):
+        self.queryset = queryset
+        self.ordering = list(ordering)
+        self.per_page = per_page
+        self.fields = [name.lstrip('-') for name in self.ordering]
+        self.descending = [name.startswith('-') for name in self.ordering]
+        opts = queryset.model._meta
+        self.model_fields = [
+            opts.pk if name == 'pk' else opts.get_field(name) for name in self.fields
+        ]
+
+    def _key(self, row):
+        if isinstance(row, dict):
+            return [row[name] for name in self.fields]
+        return [getattr(row, name) for name in self.fields]
+
+    def _after(self, values, reverse=False):
+        """Q for rows strictly after (or, reversed, before) the given key values"""
+        condition = Q()
+        for index in reversed(range(len(self.fields))):
+            lookup = 'lt' if self.descending[index] != reverse else 'gt'
+            clause = Q(**{f'{self.fields[index]}__{lookup}': values[index]})
+            if index < len(self.fields) - 1:
+                clause |= Q(**{self.fields[index]: values[index]}) & condition
+            condition = clause
+        return condition
+
+    def _parse(self, cursor):
+        values = decode_cursor(cursor)
+        if len(values) != len(self.fields):
+            raise InvalidCursor("Cursor does not match this list")
+        try:
+            return [field.to_python(value) for field, value in zip(self.model_fields, values)]
+        except ValidationError:
+            raise InvalidCursor("Malformed cursor")
+
+    def page(self, cursor=None, before=None):
+        """
+        Return a KeysetPage starting after `cursor`, or ending just before
+        `before` when paging backwards. Neither gives the first page.
+        """
+        if before:
+            reversed_ordering = [name[1:] if name.startswith('-') else f'-{name}' for name in self.ordering]
+            queryset = self.queryset.order_by(*reversed_ordering).filter(self._after(self._parse(before), reverse=True))
+            rows = list(queryset[:self.per_page + 1])
+            has_previous = len(rows) > self.per_page
+            rows = rows[:self.per_page][::-1]
+            return KeysetPage(
+                rows,
+                next_cursor=encode_cursor(self._key(rows[-1])) if rows else None,
+                previous_cursor=encode_cursor(self._key(rows[0])) if has_previous else None,
+            )
+
+        queryset = self.queryset.order_by(*self.ordering)
+        if cursor:
+            queryset = queryset.filter(self._after(self._parse(cursor)))
+        rows = list(queryset[:self.per_page + 1])
+        has_next = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        return KeysetPage(
+            rows,
+            next_cursor=encode_cursor(self._key(rows[-1])) if has_next else None,
+            previous_cursor=encode_cursor(self._key(rows[0])) if cursor and rows else None,
+        )
+
+class KeysetPage:
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.next_url = self.previous_url = self.first_url = None
+        self.total = None
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    @property
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+class ApproximateTotal:
+    """
+    Row count that never scans the whole table: the planner's estimate where
+    the database can EXPLAIN in JSON (PostgreSQL), otherwise a COUNT capped at
+    `cap` rows and shown as "1000+" beyond that.
+    """
+
+    def __init__(self, queryset, cap=1000):
+        self.estimated = False
+        self.capped = False
+        try:
+            plan = json.loads(queryset.order_by().explain(format='json'))
+            self.value = int(plan[0]['Plan']['Plan Rows'])
+            self.estimated = True
+        except (NotSupportedError, ValueError, TypeError, KeyError, IndexError):
+            self.value = queryset.order_by()[:cap + 1].count()
+            if self.value > cap:
+                self.value, self.capped = cap, True
+
+    def __int__(self):
+        return self.value
+
+    def __str__(self):
+        if self.capped:
+            return f"{self.value:,}+"
+        if self.estimated:
+            return f"~{self.value:,}"
+        return f"{self.value:,}"
+
+def paginate(request, queryset, ordering, per_page=25, with_total=False):
+    """
+    Keyset-paginate a list view from ?cursor= / ?before=, keeping the other
+    query parameters (filters, search) in the page links. Invalid cursors
+    fall back to the first page.
+    """
+    paginator = KeysetPaginator(queryset, ordering, per_page)
+    try:
+        page = paginator.page(request.GET.get('cursor'), request.GET.get('before'))
+    except InvalidCursor:
+        page = paginator.page()
+
+    def url(**cursor):
+        query = request.GET.copy()
+        query.pop('cursor', None)
+        query.pop('before', None)
+        query.update(cursor)
+        return f"?{query.urlencode()}" if query else "?"
+
+    if page.next_cursor:
+        page.next_url = url(cursor=page.next_cursor)
+    if page.previous_cursor:
+        page.previous_url = url(before=page.previous_cursor)
+        page.first_url = url()
+    if with_total:
+        page.total = ApproximateTotal(queryset)
+    return page
@@ -0,0 +1,54 @@
+# prison_core/signals.py
+
+from django.apps import apps
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+
+from .storage import CONTENT_ADDRESSED_FIELDS, is_content_addressed
+
+# ContentAddressedStorage counts one reference per save, so the reference held
+# by the previous value of a field is released when the field is overwritten
+# or its row is deleted. Releases run after commit; a rollback keeps them.
+
+def _release(storage, names):
+    for name in names:
+        transaction.on_commit(lambda name=name: storage.delete(name))
+
+def remember_replaced_media(sender, instance, update_fields=None, raw=False, **kwargs):
+    field_names = CONTENT_ADDRESSED_FIELDS[sender._meta.label]
+    if update_fields is not None:
+        field_names = [name for name in field_names if name in update_fields]
+    instance._replaced_media = {}
+    if raw or instance.pk is None or not field_names:
+        return
+    old = sender._base_manager.filter(pk=instance.pk).values(*field_names).first()
+    if old is not None:
+        instance._replaced_media = {
+            field_name: old[field_name] for field_name in field_names if is_content_addressed(old[field_name])
+        }
+
+def release_replaced_media(sender, instance, **kwargs):
+    replaced = getattr(instance, '_replaced_media', {})
+    instance._replaced_media = {}
+    for field_name in CONTENT_ADDRESSED_FIELDS[sender._meta.label]:
+        storage = sender._meta.get_field(field_name).storage
+        new_name = getattr(instance, field_name).name
+        # Saving the same bytes again gives the same name but still counts a
+        # new reference, so the old one is released as well
+        fresh = bool(new_name) and storage.claim(new_name)
+        old_name = replaced.get(field_name)
+        if old_name and (fresh or old_name != new_name):
+            _release(storage, [old_name])
+
+def release_deleted_media(sender, instance, **kwargs):
+    for field_name in CONTENT_ADDRESSED_FIELDS[sender._meta.label]:
+        name = getattr(instance, field_name).name
+        if is_content_addressed(name):
+            _release(sender._meta.get_field(field_name).storage, [name])
+
+def connect_media_signals():
+    for label in CONTENT_ADDRESSED_FIELDS:
+        model = apps.get_model(label)
+        pre_save.connect(remember_replaced_media, sender=model, dispatch_uid=f'remember_replaced_media_{label}')
+        post_save.connect(release_replaced_media, sender=model, dispatch_uid=f'release_replaced_media_{label}')
+        post_delete.connect(release_deleted_media, sender=model, dispatch_uid=f'release_deleted_media_{label}')
@@ -0,0 +1,111 @@
+# prison_core/storage.py
+
+import hashlib
+import os
+import re
+import threading
+
+from django.core.files.storage import FileSystemStorage
+from django.db.models import F
+from django.utils import timezone
+from django.utils.deconstruct import deconstructible
+
+# Image fields stored through ContentAddressedStorage, per model label
+CONTENT_ADDRESSED_FIELDS = {
+    'accounts.User': ['profile_photo', 'id_proof'],
+    'prison_core.Prisoner': ['photo'],
+    'visitor_management.Visit': ['qr_code'],
+}
+
+HASHED_NAME = re.compile(r'(^|/)([0-9a-f]{2})/([0-9a-f]{2})/\2\3[0-9a-f]{60}(\.\w+)?$')
+
+def is_content_addressed(name):
+    """True if the name is already in the sharded <aa>/<bb>/<sha256> layout"""
+    return bool(HASHED_NAME.search(name or ''))
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Stores uploads by the SHA-256 of their bytes, sharded two levels deep
+    under the field's upload_to directory:
+
+        id_proofs/3f/a2/3fa2...e1.png
+
+    Identical bytes are written once; every save of them bumps a reference
+    count in StoredMedia, and delete() only removes the file when the last
+    reference is released. Resubmitting a form no longer creates
+    KPSC_MASTER_1_<random>.png copies.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._saved = threading.local()
+
+    def get_available_name(self, name, max_length=None):
+        # The final name is chosen from the content in _save()
+        return name
+
+    @staticmethod
+    def hashed_name(name, digest):
+        directory = os.path.dirname(name)
+        extension = os.path.splitext(name)[1].lower()
+        return os.path.join(directory, digest[:2], digest[2:4], f"{digest}{extension}")
+
+    def _save(self, name, content):
+        from .models import StoredMedia
+
+        sha256 = hashlib.sha256()
+        size = 0
+        for chunk in content.chunks():
+            sha256.update(chunk)
+            size += len(chunk)
+        digest = sha256.hexdigest()
+        hashed = self.hashed_name(name, digest)
+
+        if not self.exists(hashed):
+            if hasattr(content, 'seek'):
+                content.seek(0)
+            stored = super()._save(hashed, content)
+            if stored != hashed:
+                # Lost a race with an identical upload; keep the first copy
+                super().delete(stored)
+
+        updated = StoredMedia.objects.filter(name=hashed).update(ref_count=F('ref_count') + 1, updated_at=timezone.now())
+        if not updated:
+            _, created = StoredMedia.objects.get_or_create(
+                name=hashed, defaults={'sha256': digest, 'size': size, 'ref_count': 1}
+            )
+            if not created:
+                StoredMedia.objects.filter(name=hashed).update(ref_count=F('ref_count') + 1, updated_at=timezone.now())
+        self._unclaimed().add(hashed)
+        return hashed
+
+    def _unclaimed(self):
+        if not hasattr(self._saved, 'names'):
+            self._saved.names = set()
+        return self._saved.names
+
+    def claim(self, name):
+        """
+        True if this thread saved the name since it was last claimed, i.e. a
+        model field now holds a newly counted reference to it
+        """
+        names = self._unclaimed()
+        if name in names:
+            names.discard(name)
+            return True
+        return False
+
+    def delete(self, name):
+        from .models import StoredMedia
+
+        record = StoredMedia.objects.filter(name=name).first()
+        if record is not None:
+            StoredMedia.objects.filter(pk=record.pk).update(ref_count=F('ref_count') - 1, updated_at=timezone.now())
+            record.refresh_from_db(fields=['ref_count'])
+            if record.ref_count > 0:
+                return
+            record.delete()
+        super().delete(name)
+
+media_storage = ContentAddressedStorage()
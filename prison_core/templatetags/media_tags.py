@@ -0,0 +1,12 @@
+# prison_core/templatetags/media_tags.py
+
+from django import template
+
+from prison_core.images import rendition_url
+
+register = template.Library()
+
+@register.filter
+def rendition(field_file, name='thumb'):
+    """Usage: {{ prisoner.photo|rendition:'thumb' }} -> URL of the downscaled copy"""
+    return rendition_url(field_file, name) or ''
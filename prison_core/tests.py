@@ -1,3 +1,124 @@
-from django.test import TestCase
+import io
+import shutil
+import tempfile
+from datetime import date
 
-# Create your tests here.
+from django.core.files.base import ContentFile
+from django.test import RequestFactory, TestCase, override_settings
+from PIL import Image
+
+from .models import Jail, Prisoner, StoredMedia
+from .pagination import InvalidCursor, KeysetPaginator, encode_cursor, paginate
+
+def png(color):
+    buffer = io.BytesIO()
+    Image.new('RGB', (8, 8), color).save(buffer, 'PNG')
+    return ContentFile(buffer.getvalue(), name='photo.png')
+
+class ContentAddressedStorageTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        jail = Jail.objects.create(name='District Jail', location='Thiruvananthapuram')
+        self.prisoners = [
+            Prisoner.objects.create(
+                jail=jail, prisoner_id=f'P{number}', first_name='Prisoner', last_name=str(number),
+                date_of_birth=date(1990, 1, 1),
+            )
+            for number in (1, 2)
+        ]
+
+    def refs(self, name):
+        return StoredMedia.objects.filter(name=name).values_list('ref_count', flat=True).first()
+
+    def test_identical_bytes_are_stored_once(self):
+        first, second = self.prisoners
+        with self.captureOnCommitCallbacks(execute=True):
+            first.photo = png('blue')
+            first.save()
+            second.photo = png('blue')
+            second.save()
+        self.assertEqual(first.photo.name, second.photo.name)
+        self.assertEqual(self.refs(first.photo.name), 2)
+
+    def test_overwrite_and_delete_release_the_old_blob(self):
+        prisoner, other = self.prisoners
+        with self.captureOnCommitCallbacks(execute=True):
+            prisoner.photo = png('blue')
+            prisoner.save()
+        blue = prisoner.photo.name
+
+        with self.captureOnCommitCallbacks(execute=True):
+            prisoner.photo.save('again.png', png('blue'))
+        self.assertEqual(self.refs(blue), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            prisoner.photo = png('green')
+            prisoner.save()
+        green = prisoner.photo.name
+        self.assertIsNone(self.refs(blue))
+        self.assertFalse(prisoner.photo.storage.exists(blue))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            prisoner.save(update_fields=['first_name'])
+            other.photo = png('green')
+            other.save()
+        self.assertEqual(self.refs(green), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            prisoner.delete()
+        self.assertEqual(self.refs(green), 1)
+        self.assertTrue(other.photo.storage.exists(green))
+
+class KeysetPaginatorTests(TestCase):
+    def setUp(self):
+        jail = Jail.objects.create(name='District Jail', location='Thiruvananthapuram')
+        # Mostly equal sort keys, so pages have to break ties on the id
+        for number in range(11):
+            Prisoner.objects.create(
+                jail=jail, prisoner_id=f'P{number}', first_name='Prisoner', last_name=str(number),
+                date_of_birth=date(1990, 1, 1) if number % 4 else date(1985 + number, 1, 1),
+            )
+        self.ordering = ('-date_of_birth', '-id')
+        self.expected = list(Prisoner.objects.order_by(*self.ordering).values_list('id', flat=True))
+        self.paginator = KeysetPaginator(Prisoner.objects.all(), self.ordering, per_page=3)
+
+    def ids(self, page):
+        return [prisoner.id for prisoner in page]
+
+    def test_forward_pages_cover_every_row_once(self):
+        pages, page = [], self.paginator.page()
+        while True:
+            pages.append(self.ids(page))
+            if not page.has_next:
+                break
+            page = self.paginator.page(page.next_cursor)
+        self.assertEqual([prisoner_id for ids in pages for prisoner_id in ids], self.expected)
+        self.assertEqual([len(ids) for ids in pages], [3, 3, 3, 2])
+
+        # Walking back from the last page gives the same pages
+        backwards = [self.ids(page)]
+        while page.has_previous:
+            page = self.paginator.page(before=page.previous_cursor)
+            backwards.append(self.ids(page))
+        self.assertEqual(backwards[::-1], pages)
+
+    def test_rows_added_before_the_cursor_do_not_shift_pages(self):
+        first = self.paginator.page()
+        Prisoner.objects.create(
+            jail_id=Prisoner.objects.values_list('jail_id', flat=True).first(), prisoner_id='NEW',
+            first_name='Prisoner', last_name='New', date_of_birth=date(2000, 1, 1),
+        )
+        second = self.paginator.page(first.next_cursor)
+        self.assertEqual(self.ids(second), self.expected[3:6])
+
+    def test_bad_cursors(self):
+        for cursor in ('not a cursor', encode_cursor([1]), encode_cursor(['not a date', 1])):
+            with self.assertRaises(InvalidCursor):
+                self.paginator.page(cursor)
+        page = paginate(RequestFactory().get('/', {'cursor': 'garbage', 'q': 'x'}), Prisoner.objects.all(), self.ordering, 3)
+        self.assertEqual(self.ids(page), self.expected[:3])
+        self.assertEqual(page.next_url, f"?q=x&cursor={page.next_cursor}")
@@ -6,6 +6,7 @@ from django.urls import reverse_lazy
 from django.views.generic import ListView, CreateView, UpdateView, DeleteView
 from django.contrib import messages
 from .models import Jail, Prisoner
+from .pagination import paginate
 from accounts.decorators import admin_required
 
 # -- Jail Management Views (Admin Only) --
@@ -16,7 +17,7 @@ def jail_list(request):
     """
     Displays a list of all jails. Only accessible by admins.
     """
-    jails = Jail.objects.all()
+    jails = paginate(request, Jail.objects.all(), ('name',), per_page=50)
     return render(request, 'prison_core/jail_list.html', {'jails': jails})
 
 class JailCreateView(CreateView):
@@ -69,10 +70,14 @@ def prisoner_list(request):
         messages.error(request, "You are not assigned to a jail. Please contact the super administrator.")
         return redirect('admin_dashboard') # Or some other appropriate page
 
-    prisoners = Prisoner.objects.filter(jail=request.user.jail)
+    prisoners = paginate(
+        request, Prisoner.objects.filter(jail=request.user.jail), ('prisoner_id',),
+        per_page=50, with_total=True
+    )
     return render(request, 'prison_core/prisoner_list.html', {'prisoners': prisoners, 'jail': request.user.jail})
 
 from .forms import PrisonerForm # Add this import
+from .images import queue_renditions
 
 @login_required
 @admin_required
@@ -83,6 +88,7 @@ def prisoner_create(request):
             prisoner = form.save(commit=False)
             prisoner.jail = request.user.jail # Assign the admin's jail
             prisoner.save()
+            queue_renditions(prisoner)
             messages.success(request, "Prisoner created successfully.")
             return redirect('prisoner_list')
     else:
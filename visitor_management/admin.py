@@ -1,7 +1,12 @@
 from django.contrib import admin
 
 # Register your models here.
-from .models import Visit,EmergencyAlert
+from .models import Visit,EmergencyAlert,EmergencyAlertReport,VisitEvent,VisitQuotaCounter,ArchivedVisit,ArchivedEmergencyAlert
 
 admin.site.register(Visit)
-admin.site.register(EmergencyAlert)
\ No newline at end of file
+admin.site.register(VisitEvent)
+admin.site.register(VisitQuotaCounter)
+admin.site.register(EmergencyAlert)
+admin.site.register(EmergencyAlertReport)
+admin.site.register(ArchivedVisit)
+admin.site.register(ArchivedEmergencyAlert)
\ No newline at end of file
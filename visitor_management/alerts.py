@@ -0,0 +1,295 @@
+# visitor_management/alerts.py
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.mail import send_mail
+from django.db import connection, transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from accounts.models import User
+from prison_core.models import Jail
+from .models import EmergencyAlert, EmergencyAlertReport, Visit
+
+logger = logging.getLogger(__name__)
+
+ALERT_CACHE_TIMEOUT = getattr(settings, 'ALERT_CACHE_TIMEOUT', 60)
+# Triggers of the same type at a jail within this many seconds of the
+# previous one join the open alert instead of raising a new one
+ALERT_COALESCE_SECONDS = getattr(settings, 'ALERT_COALESCE_SECONDS', 120)
+# Follow-up reports are emailed together, at most once per alert per interval
+ALERT_UPDATE_SECONDS = getattr(settings, 'ALERT_UPDATE_SECONDS', 60)
+ALERT_STATS_CACHE_TIMEOUT = getattr(settings, 'ALERT_STATS_CACHE_TIMEOUT', 60)
+# Scope of state-wide alerts; every other scope is a jail id
+BROADCAST = 'broadcast'
+STAFF_ROLES = ('admin', 'security')
+
+def _cache_key(scope):
+    return f"active-alert:{scope}"
+
+def alert_scope(alert):
+    return BROADCAST if alert.is_broadcast else alert.facility_id
+
+def visible_to(jail_id):
+    """Filter for the alerts a jail's staff see: its own plus state-wide broadcasts"""
+    scope = Q(is_broadcast=True)
+    if jail_id:
+        scope |= Q(facility_id=jail_id)
+    return scope
+
+def _latest_active(scope):
+    alerts = EmergencyAlert.objects.filter(is_active=True).select_related('issued_by', 'facility')
+    if scope == BROADCAST:
+        alerts = alerts.filter(is_broadcast=True)
+    else:
+        alerts = alerts.filter(is_broadcast=False, facility_id=scope)
+    return alerts.order_by('-issued_at', '-id').first()
+
+def active_alert(*jail_ids):
+    """
+    Newest active alert for the given jails (their own or a broadcast). Each
+    scope has its own cache entry, read together with one get_many(), so an
+    alert at one jail only invalidates that jail's entry.
+    """
+    scopes = [BROADCAST] + sorted({jail_id for jail_id in jail_ids if jail_id})
+    keys = {_cache_key(scope): scope for scope in scopes}
+    cached = cache.get_many(list(keys))
+    alerts = []
+    for key, scope in keys.items():
+        alert = cached.get(key)
+        if alert is None:
+            # False marks "no active alert" so the miss is cached too
+            alert = _latest_active(scope) or False
+            cache.set(key, alert, ALERT_CACHE_TIMEOUT)
+        if alert:
+            alerts.append(alert)
+    return max(alerts, key=lambda alert: (alert.issued_at, alert.id), default=None)
+
+def alert_jails(user):
+    """
+    Jails whose alerts a user sees: staff their own jail; visitors and
+    family the jails of their related prisoner and of their upcoming
+    visits, cached for ALERT_CACHE_TIMEOUT.
+    """
+    if user.jail_id:
+        return [user.jail_id]
+    key = f"alert-jails:{user.id}"
+    jail_ids = cache.get(key)
+    if jail_ids is None:
+        visits = Visit.objects.filter(
+            visitor_id=user.id, status__in=['PENDING', 'APPROVED'], visit_date__gte=timezone.localdate(),
+        ).values_list('prisoner__jail_id')
+        related = User.objects.filter(pk=user.id, related_prisoner__isnull=False).values_list('related_prisoner__jail_id')
+        jail_ids = sorted({jail_id for jail_id, in visits.union(related)})
+        cache.set(key, jail_ids, ALERT_CACHE_TIMEOUT)
+    return jail_ids
+
+def user_active_alert(user):
+    """Newest active alert for the jails in alert_jails(user), or a broadcast"""
+    return active_alert(*alert_jails(user)) if user.is_authenticated else None
+
+def _stats_key(scope, day):
+    return f"alert-log-stats:{scope}:{day.isoformat()}"
+
+def alert_log_stats(alerts, scope):
+    """
+    Emergency log totals for a queryset of alerts, from one grouped query:
+    per-type counts with conditional active and today counts, summed here.
+    Cached per scope (a jail id, or 'all') for ALERT_STATS_CACHE_TIMEOUT.
+    """
+    today = timezone.localdate()
+    key = _stats_key(scope, today)
+    stats = cache.get(key)
+    if stats is not None:
+        return stats
+    midnight = timezone.make_aware(datetime.combine(today, time.min))
+    by_type = list(
+        alerts.order_by().values('emergency_type').annotate(
+            count=Count('id'),
+            active=Count('id', filter=Q(is_active=True)),
+            today=Count('id', filter=Q(issued_at__gte=midnight)),
+        ).order_by('-count')
+    )
+    total = sum(row['count'] for row in by_type)
+    active = sum(row['active'] for row in by_type)
+    stats = {
+        'total_alerts': total,
+        'active_alerts': active,
+        'resolved_alerts': total - active,
+        'alerts_today': sum(row['today'] for row in by_type),
+        'by_type': [{'emergency_type': row['emergency_type'], 'count': row['count']} for row in by_type],
+    }
+    cache.set(key, stats, ALERT_STATS_CACHE_TIMEOUT)
+    return stats
+
+def invalidate_alert_cache(alert):
+    """
+    Once the transaction commits, drop the cached active alert of the
+    alert's scope and the emergency log stats of every scope that counts
+    it: all jails, its own jail, and for a broadcast each jail.
+    """
+    if alert.is_broadcast:
+        stats_scopes = ['all'] + list(Jail.objects.values_list('id', flat=True))
+    else:
+        stats_scopes = ['all', alert.facility_id]
+    today = timezone.localdate()
+    keys = [_cache_key(alert_scope(alert))] + [_stats_key(scope, today) for scope in stats_scopes]
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+def issue_alert(facility_id=None, broadcast=False, replace=False, **fields):
+    """
+    Create an active alert for a jail, or state-wide when `broadcast` (or no
+    jail is given). With `replace`, active alerts in the same scope are
+    resolved first; other jails' alerts are never touched.
+    """
+    broadcast = broadcast or facility_id is None
+    with transaction.atomic():
+        if replace:
+            previous = EmergencyAlert.objects.filter(is_active=True, is_broadcast=broadcast)
+            if not broadcast:
+                previous = previous.filter(facility_id=facility_id)
+            previous.update(is_active=False, updated_at=timezone.now())
+        alert = EmergencyAlert.objects.create(
+            facility_id=facility_id, is_broadcast=broadcast, is_active=True,
+            last_reported_at=timezone.now(), **fields
+        )
+        invalidate_alert_cache(alert)
+    return alert
+
+def set_alert_active(alert, active):
+    """Resolve or reactivate an alert and refresh its scope's cache entry"""
+    alert.is_active = active
+    alert.save(update_fields=['is_active', 'updated_at'])
+    invalidate_alert_cache(alert)
+
+def alert_recipients(alert):
+    """Email addresses to notify: the alert jail's staff and superusers, or all staff for a broadcast"""
+    staff = User.objects.filter(Q(is_staff=True) | Q(is_superuser=True) | Q(role__in=STAFF_ROLES))
+    if not alert.is_broadcast:
+        staff = staff.filter(Q(jail_id=alert.facility_id) | Q(is_superuser=True))
+    return sorted({email.strip() for email in staff.values_list('email', flat=True) if email and email.strip()})
+
+# One worker: update emails go out one at a time however many alerts are open
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='alert-updates')
+
+def report_emergency(facility_id, emergency_type, reported_by_id, reason='', location='',
+                     source_ip=None, replace=False, **fields):
+    """
+    Raise an alert for a trigger, or attach it as a report to the jail's open
+    alert of the same type when that was last reported within
+    ALERT_COALESCE_SECONDS. Returns (alert, created); only a created alert
+    needs the initial notification, follow-ups are batched into updates.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        open_alerts = EmergencyAlert.objects.select_for_update().filter(
+            is_active=True,
+            emergency_type=emergency_type,
+            last_reported_at__gte=now - timedelta(seconds=ALERT_COALESCE_SECONDS),
+        )
+        if facility_id is None:
+            open_alerts = open_alerts.filter(is_broadcast=True, facility__isnull=True)
+        else:
+            # Lock the jail row so simultaneous triggers queue up and find the same alert
+            list(Jail.objects.select_for_update().filter(pk=facility_id).values_list('pk'))
+            open_alerts = open_alerts.filter(is_broadcast=False, facility_id=facility_id)
+        alert = open_alerts.order_by('-issued_at', '-id').first()
+
+        if alert is None:
+            alert = issue_alert(
+                facility_id=facility_id, replace=replace, emergency_type=emergency_type,
+                issued_by_id=reported_by_id, reason=reason, location=location, source_ip=source_ip, **fields
+            )
+            return alert, True
+
+        EmergencyAlertReport.objects.create(
+            alert=alert, reported_by_id=reported_by_id, reason=reason, location=location, source_ip=source_ip,
+        )
+        EmergencyAlert.objects.filter(pk=alert.pk).update(report_count=F('report_count') + 1, last_reported_at=now, updated_at=now)
+        alert.report_count += 1
+        alert.last_reported_at = now
+        schedule_alert_update(alert.pk)
+    return alert, False
+
+def schedule_alert_update(alert_id):
+    """
+    After commit, send one update for the alert in ALERT_UPDATE_SECONDS unless
+    one is already due. The timer lives in this process only; reports it
+    misses go out with the next update or from send_alert_updates.
+    """
+    def schedule():
+        if cache.add(f"alert-update:{alert_id}", True, ALERT_UPDATE_SECONDS):
+            timer = threading.Timer(ALERT_UPDATE_SECONDS, _executor.submit, (_send_update, alert_id))
+            timer.daemon = True
+            timer.start()
+    transaction.on_commit(schedule)
+
+def _send_update(alert_id):
+    try:
+        send_alert_update(alert_id)
+    except Exception as e:
+        logger.error(f"Alert #{alert_id} update failed: {e}")
+    finally:
+        connection.close()
+
+def send_alert_update(alert_id):
+    """
+    Email every report on the alert not yet sent out, as one message to the
+    alert's recipients. Reports are marked sent first, so an update goes out
+    at most once. Returns the number of recipients.
+    """
+    with transaction.atomic():
+        alert = EmergencyAlert.objects.select_for_update().filter(pk=alert_id).first()
+        if alert is None:
+            return 0
+        reports = list(alert.reports.select_related('reported_by').order_by('id')[alert.notified_reports:])
+        if not reports:
+            return 0
+        EmergencyAlert.objects.filter(pk=alert_id).update(notified_reports=alert.notified_reports + len(reports))
+
+    recipients = alert_recipients(alert)
+    if not recipients:
+        return 0
+    lines = []
+    for report in reports:
+        reporter = (report.reported_by.get_full_name() or report.reported_by.username) if report.reported_by else 'Unknown'
+        lines.append(
+            f"- {timezone.localtime(report.reported_at).strftime('%H:%M:%S')} {reporter}"
+            f" at {report.location or 'unknown location'}: {report.reason or 'no details'}"
+        )
+    status = 'ACTIVE' if alert.is_active else 'RESOLVED'
+    send_mail(
+        subject=f"EMERGENCY ALERT #{alert.id} UPDATE - {len(reports)} further report{'s' if len(reports) != 1 else ''}",
+        message=(
+            f"Emergency alert #{alert.id} ({alert.emergency_type}) is {status} "
+            f"with {alert.report_count} reports in total.\n\nNew reports:\n" + "\n".join(lines)
+        ),
+        from_email=getattr(settings, 'DEFAULT_FROM_EMAIL', 'noreply@prison.gov'),
+        recipient_list=recipients,
+    )
+    logger.info(f"Alert #{alert.id} update with {len(reports)} reports sent to {len(recipients)} recipients")
+    return len(recipients)
+
+def send_due_alert_updates():
+    """
+    Send updates whose timer was lost (the worker exited before it fired):
+    alerts whose oldest unsent report is more than ALERT_UPDATE_SECONDS old.
+    Run from the send_alert_updates command. Returns the alerts updated.
+    """
+    due = timezone.now() - timedelta(seconds=ALERT_UPDATE_SECONDS)
+    pending = EmergencyAlert.objects.annotate(report_rows=Count('reports')).filter(report_rows__gt=F('notified_reports'))
+    sent = 0
+    for alert_id, notified in pending.values_list('id', 'notified_reports'):
+        oldest = list(
+            EmergencyAlertReport.objects.filter(alert_id=alert_id).order_by('id')
+            .values_list('reported_at', flat=True)[notified:notified + 1]
+        )
+        if oldest and oldest[0] <= due:
+            send_alert_update(alert_id)
+            sent += 1
+    return sent
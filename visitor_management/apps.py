@@ -1,6 +1,30 @@
 from django.apps import AppConfig
+from django.db import connections
+from django.db.models.signals import post_migrate, pre_migrate
+
+
+def _drop_search_triggers(sender, using, **kwargs):
+    from .search import drop_search_triggers
+
+    if connections[using].vendor == 'sqlite':
+        drop_search_triggers(connections[using])
+
+
+def _install_search_triggers(sender, using, **kwargs):
+    from .search import install_search_triggers
+
+    if connections[using].vendor == 'sqlite':
+        install_search_triggers(connections[using])
 
 
 class VisitorManagementConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'visitor_management'
+
+    def ready(self):
+        from . import checks  # noqa: F401
+
+        # Migrations may rebuild the alert or user tables, which SQLite refuses
+        # while the search triggers refer to them; the index is refilled after
+        pre_migrate.connect(_drop_search_triggers, sender=self, dispatch_uid='alert_search_drop')
+        post_migrate.connect(_install_search_triggers, sender=self, dispatch_uid='alert_search_install')
@@ -0,0 +1,84 @@
+# visitor_management/archive.py
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import ArchivedEmergencyAlert, ArchivedVisit, EmergencyAlert, Visit
+
+ARCHIVE_BATCH_SIZE = 1000
+VISIT_ARCHIVE_AFTER_DAYS = getattr(settings, 'VISIT_ARCHIVE_AFTER_DAYS', 365)
+ALERT_ARCHIVE_AFTER_DAYS = getattr(settings, 'ALERT_ARCHIVE_AFTER_DAYS', 90)
+# Visits that can no longer change; anything still live stays in Visit
+ARCHIVED_STATUSES = ('COMPLETED', 'REJECTED', 'CANCELLED', 'EXPIRED', 'NO_SHOW')
+
+VISIT_FIELDS = [
+    'id', 'visitor_id', 'prisoner_id', 'visit_date', 'visit_time_slot', 'status', 'visit_type',
+    'check_in_time', 'check_out_time', 'updated_at',
+]
+ALERT_FIELDS = [
+    'id', 'message', 'issued_by_id', 'issued_at', 'is_active',
+    'emergency_type', 'reason', 'location', 'facility_id', 'source_ip', 'is_broadcast',
+    'report_count', 'last_reported_at',
+]
+
+def archivable_visits(days=VISIT_ARCHIVE_AFTER_DAYS):
+    return Visit.objects.filter(
+        status__in=ARCHIVED_STATUSES, visit_date__lt=timezone.localdate() - timedelta(days=days)
+    )
+
+def archivable_alerts(days=ALERT_ARCHIVE_AFTER_DAYS):
+    return EmergencyAlert.objects.filter(is_active=False, issued_at__lt=timezone.now() - timedelta(days=days))
+
+def _move(queryset, fields, archive_model, make_row, batch_size):
+    """
+    Copy rows into their archive table and delete them, one transaction per
+    batch, so an interrupted run just continues from what is left. Yields
+    each batch's source rows after it commits.
+    """
+    while True:
+        with transaction.atomic():
+            rows = list(queryset.order_by('id').values(*fields)[:batch_size])
+            if not rows:
+                return
+            archived = [make_row(row) for row in rows]
+            archive_model.objects.bulk_create(archived, batch_size=batch_size)
+            queryset.model.objects.filter(id__in=[row['id'] for row in rows]).delete()
+        yield rows
+
+def archive_visits(days=VISIT_ARCHIVE_AFTER_DAYS, batch_size=ARCHIVE_BATCH_SIZE):
+    """
+    Move finished visits dated more than `days` ago to ArchivedVisit.
+    The event log and stats rollup keep their rows. Returns the count moved.
+    """
+    qr_storage = Visit._meta.get_field('qr_code').storage
+    moved = 0
+    batches = _move(
+        archivable_visits(days),
+        VISIT_FIELDS + ['prisoner__jail_id', 'qr_code'],
+        ArchivedVisit,
+        lambda row: ArchivedVisit(
+            jail_id=row['prisoner__jail_id'],
+            **{field: row[field] for field in VISIT_FIELDS},
+        ),
+        batch_size,
+    )
+    for rows in batches:
+        for row in rows:
+            if row['qr_code']:
+                qr_storage.delete(row['qr_code'])
+        moved += len(rows)
+    return moved
+
+def archive_alerts(days=ALERT_ARCHIVE_AFTER_DAYS, batch_size=ARCHIVE_BATCH_SIZE):
+    """Move alerts resolved and issued more than `days` ago to ArchivedEmergencyAlert"""
+    batches = _move(
+        archivable_alerts(days),
+        ALERT_FIELDS,
+        ArchivedEmergencyAlert,
+        lambda row: ArchivedEmergencyAlert(**row),
+        batch_size,
+    )
+    return sum(len(rows) for rows in batches)
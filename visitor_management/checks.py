@@ -0,0 +1,20 @@
+# visitor_management/checks.py
+
+from django.core.checks import Tags, Warning, register
+from django.db import connections
+
+from .search import missing_search_triggers
+
+@register(Tags.database)
+def check_alert_search_triggers(app_configs, databases=None, **kwargs):
+    """The emergency log search index goes stale without its triggers"""
+    errors = []
+    for alias in databases or []:
+        missing = missing_search_triggers(connections[alias])
+        if missing:
+            errors.append(Warning(
+                f"Emergency alert search triggers are missing: {', '.join(missing)}.",
+                hint="Run `manage.py rebuild_alert_search` to reinstall them and refill the index.",
+                id='visitor_management.W001',
+            ))
+    return errors
@@ -0,0 +1,80 @@
+# visitor_management/emergency.py
+
+import re
+
+from django.conf import settings
+
+GENERAL_EMERGENCY = 'GENERAL EMERGENCY'
+PANIC_ALARM = 'PANIC ALARM'
+
+# Checked in order: the first type with any keyword in the reason wins.
+# Override with settings.EMERGENCY_TAXONOMY in the same shape.
+DEFAULT_EMERGENCY_TAXONOMY = [
+    ('VIOLENCE/FIGHT', ['fight', 'violence', 'attack', 'assault', 'riot']),
+    ('MEDICAL EMERGENCY', ['medical', 'injury', 'hurt', 'sick', 'health', 'ambulance']),
+    ('FIRE EMERGENCY', ['fire', 'smoke', 'burn', 'flames']),
+    ('ESCAPE ATTEMPT', ['escape', 'missing', 'fled', 'breakout']),
+    ('SECURITY BREACH', ['breach', 'unauthorized', 'security', 'intruder']),
+    ('LOCKDOWN REQUIRED', ['lockdown', 'lock down', 'secure', 'containment']),
+    ('WEAPON/CONTRABAND', ['weapon', 'knife', 'gun', 'contraband']),
+]
+
+def _trie_pattern(words):
+    """Regex alternation of words factored into a prefix trie, e.g. f(?:ight|ire)"""
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def build(node):
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+        return f"(?:{body})?" if '' in node else body
+
+    return build(trie)
+
+class EmergencyClassifier:
+    """
+    Keyword classifier compiled into one trie-shaped regex inside a
+    lookahead, so a single finditer pass over the reason reports the longest
+    keyword starting at every position, however many keywords there are.
+    Each keyword is mapped to the highest-priority type among itself and its
+    prefixes, which makes the result match checking the types one by one.
+    """
+
+    def __init__(self, taxonomy, default=GENERAL_EMERGENCY):
+        self.types = [emergency_type for emergency_type, _ in taxonomy]
+        self.default = default
+        priority = {}
+        for index, (_, keywords) in enumerate(taxonomy):
+            for keyword in keywords:
+                priority.setdefault(keyword.lower(), index)
+        self.priority = {
+            keyword: min(rank for other, rank in priority.items() if keyword.startswith(other))
+            for keyword in priority
+        }
+        self.pattern = re.compile(f"(?=({_trie_pattern(self.priority)}))") if self.priority else None
+
+    def classify(self, reason):
+        if not self.pattern or not reason:
+            return self.default
+        best = len(self.types)
+        for keyword in self.pattern.findall(reason.lower()):
+            best = min(best, self.priority[keyword])
+            if best == 0:
+                break
+        return self.types[best] if best < len(self.types) else self.default
+
+    @property
+    def choices(self):
+        return [*self.types, self.default, PANIC_ALARM]
+
+emergency_classifier = EmergencyClassifier(getattr(settings, 'EMERGENCY_TAXONOMY', DEFAULT_EMERGENCY_TAXONOMY))
+
+def classify_emergency_type(reason):
+    """Emergency type for a free-text reason, per the configured taxonomy"""
+    return emergency_classifier.classify(reason)
@@ -0,0 +1,74 @@
+# visitor_management/events.py
+
+from django.db import transaction
+from django.db.models import F
+
+from .models import EventSequence, VisitEvent
+from .quotas import apply_quota_changes, apply_quota_transition
+from .stats import apply_status_changes, apply_visit_transition
+
+VISIT_EVENT_SEQUENCE = 'visit_events'
+# Visit.values() read before a bulk status UPDATE, for record_status_changes
+STATUS_CHANGE_FIELDS = [
+    'id', 'visitor_id', 'prisoner_id', 'prisoner__jail_id', 'visit_date', 'visit_time_slot',
+    'status', 'visit_type', 'check_in_time', 'check_out_time',
+]
+
+def next_sequence(name, count=1):
+    """
+    Increment a named counter by `count` and return its new value (the last
+    of the `count` numbers reserved). The UPDATE holds the row lock until the
+    surrounding transaction commits, so numbers are handed out in commit order.
+    """
+    with transaction.atomic():
+        counter = EventSequence.objects.filter(name=name)
+        if not counter.update(value=F('value') + count):
+            EventSequence.objects.get_or_create(name=name)
+            counter.update(value=F('value') + count)
+        return EventSequence.objects.values_list('value', flat=True).get(name=name)
+
+def record_visit_event(visit, event_type, actor=None, from_status='', **data):
+    """
+    Append a VisitEvent for a transition that was just saved and move the
+    visit in the daily stats rollup and quota counters. Call it inside the same
+    transaction.atomic() block as the visit.save() it describes.
+    """
+    apply_visit_transition(visit, event_type, from_status)
+    apply_quota_transition(visit, from_status)
+    return VisitEvent.objects.create(
+        sequence=next_sequence(VISIT_EVENT_SEQUENCE),
+        visit_id=visit.id,
+        visitor_id=visit.visitor_id,
+        jail_id=visit.prisoner.jail_id,
+        event_type=event_type,
+        from_status=from_status or '',
+        to_status=visit.status,
+        actor_id=getattr(actor, 'id', None),
+        data=data,
+    )
+
+def record_status_changes(visits, event_type, to_status, actor=None, **data):
+    """
+    Bulk form of record_visit_event for visits moved to `to_status` by one
+    set-based UPDATE. `visits` are STATUS_CHANGE_FIELDS
+    dicts read before the UPDATE. Call inside the transaction that ran the UPDATE.
+    """
+    if not visits:
+        return []
+    apply_status_changes(visits, to_status)
+    apply_quota_changes(visits, to_status)
+    last = next_sequence(VISIT_EVENT_SEQUENCE, len(visits))
+    return VisitEvent.objects.bulk_create([
+        VisitEvent(
+            sequence=last - len(visits) + position,
+            visit_id=visit['id'],
+            visitor_id=visit['visitor_id'],
+            jail_id=visit['prisoner__jail_id'],
+            event_type=event_type,
+            from_status=visit['status'],
+            to_status=to_status,
+            actor_id=getattr(actor, 'id', None),
+            data=data,
+        )
+        for position, visit in enumerate(visits, start=1)
+    ], batch_size=500)
@@ -0,0 +1,55 @@
+# visitor_management/expiry.py
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .events import STATUS_CHANGE_FIELDS, record_status_changes
+from .models import Visit
+
+EXPIRY_BATCH_SIZE = 1000
+
+# (current status, extra condition, new status) for visits whose date has passed
+EXPIRY_RULES = [
+    ('PENDING', Q(), 'EXPIRED'),
+    ('APPROVED', Q(check_in_time__isnull=True), 'NO_SHOW'),
+]
+
+def stale_visits(status, condition, today):
+    return Visit.objects.filter(condition, status=status, visit_date__lt=today)
+
+def expire_stale_visits(today=None, batch_size=EXPIRY_BATCH_SIZE, dry_run=False):
+    """
+    Move past-date PENDING visits to EXPIRED and never-checked-in APPROVED
+    visits to NO_SHOW, `batch_size` rows per transaction: one locked SELECT,
+    one set-based UPDATE, then the stats, quota counters and event log for
+    the whole batch. Passes are only served for APPROVED visits, so the
+    status change invalidates them; any legacy stored QR image is released.
+    Returns {new status: visits changed}.
+    """
+    today = today or timezone.localdate()
+    qr_storage = Visit._meta.get_field('qr_code').storage
+    changed = {}
+    for status, condition, new_status in EXPIRY_RULES:
+        stale = stale_visits(status, condition, today)
+        if dry_run:
+            changed[new_status] = stale.count()
+            continue
+        changed[new_status] = 0
+        while True:
+            with transaction.atomic():
+                rows = list(
+                    stale.select_for_update(skip_locked=True, of=('self',))
+                    .order_by('id').values(*STATUS_CHANGE_FIELDS, 'qr_code')[:batch_size]
+                )
+                if not rows:
+                    break
+                Visit.objects.filter(id__in=[row['id'] for row in rows]).update(
+                    status=new_status, qr_code='', updated_at=timezone.now()
+                )
+                record_status_changes(rows, new_status, new_status, expired_on=today.isoformat())
+            for row in rows:
+                if row['qr_code']:
+                    qr_storage.delete(row['qr_code'])
+            changed[new_status] += len(rows)
+    return changed
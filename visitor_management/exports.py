@@ -0,0 +1,162 @@
+# visitor_management/exports.py
+
+import csv
+import heapq
+import zipfile
+from datetime import date, datetime
+from operator import itemgetter
+from xml.sax.saxutils import escape
+
+from django.utils import timezone
+
+from .models import Visit
+
+EXPORT_CHUNK_SIZE = 2000
+
+# (header, values_list path) for every exported column
+EXPORT_COLUMNS = [
+    ('Visit ID', 'id'),
+    ('Visit Date', 'visit_date'),
+    ('Time Slot', 'visit_time_slot'),
+    ('Visit Type', 'visit_type'),
+    ('Status', 'status'),
+    ('Visitor Username', 'visitor__username'),
+    ('Visitor Name', 'visitor__full_name'),
+    ('Visitor Phone', 'visitor__phone_number'),
+    ('Prisoner ID', 'prisoner__prisoner_id'),
+    ('Prisoner First Name', 'prisoner__first_name'),
+    ('Prisoner Last Name', 'prisoner__last_name'),
+    ('Jail', 'prisoner__jail__name'),
+    ('Check In', 'check_in_time'),
+    ('Check Out', 'check_out_time'),
+    ('Last Updated', 'updated_at'),
+]
+
+def export_rows(visits):
+    """
+    Tuples for EXPORT_COLUMNS, read in id order in chunks of EXPORT_CHUNK_SIZE.
+    The joins happen in the one query; nothing is cached on the queryset.
+    """
+    paths = [path for _, path in EXPORT_COLUMNS]
+    return visits.order_by('id').values_list(*paths).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+def export_archived_rows(archived):
+    """
+    export_rows for an ArchivedVisit queryset. Its keys are nullable and
+    unconstrained, so the joins are LEFT OUTER: visits whose user or prisoner
+    was deleted are still exported with those columns blank. The jail column
+    is the jail recorded at archival time.
+    """
+    paths = ['jail__name' if path == 'prisoner__jail__name' else path for _, path in EXPORT_COLUMNS]
+    return archived.order_by('id').values_list(*paths).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+def export_all_rows(visits, archived):
+    """Live and archived visits as one stream in id order (archived visits keep their ids)"""
+    return heapq.merge(export_rows(visits), export_archived_rows(archived), key=itemgetter(0))
+
+def _text(value):
+    if value is None:
+        return ''
+    if isinstance(value, datetime):
+        return timezone.localtime(value).strftime('%Y-%m-%d %H:%M:%S')
+    if isinstance(value, date):
+        return value.isoformat()
+    return str(value)
+
+class _Echo:
+    """File-like object whose write() returns the data instead of storing it"""
+
+    def write(self, value):
+        return value
+
+def stream_csv(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow([header for header, _ in EXPORT_COLUMNS])
+    for row in rows:
+        yield writer.writerow([_text(value) for value in row])
+
+class _Chunks:
+    """Unseekable sink for zipfile; the export generator drains it as it fills"""
+
+    def __init__(self):
+        self.parts = []
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self.parts)
+        self.parts = []
+        return data
+
+XLSX_PARTS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/workbook.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Visits" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'
+    ),
+}
+
+def _xlsx_row(values):
+    cells = []
+    for value in values:
+        if isinstance(value, int) and not isinstance(value, bool):
+            cells.append(f'<c t="n"><v>{value}</v></c>')
+        else:
+            cells.append(f'<c t="inlineStr"><is><t>{escape(_text(value))}</t></is></c>')
+    return f'<row>{"".join(cells)}</row>'
+
+def stream_xlsx(rows, rows_per_flush=500):
+    """
+    A single-sheet XLSX built row by row into a deflated zip that is handed
+    out as it grows. Strings are written inline, so no shared-strings table
+    has to be held in memory.
+    """
+    sink = _Chunks()
+    with zipfile.ZipFile(sink, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, content in XLSX_PARTS.items():
+            archive.writestr(name, content)
+        with archive.open('xl/worksheets/sheet1.xml', 'w') as sheet:
+            sheet.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+            )
+            sheet.write(_xlsx_row([header for header, _ in EXPORT_COLUMNS]).encode())
+            for count, row in enumerate(rows, start=1):
+                sheet.write(_xlsx_row(row).encode())
+                if count % rows_per_flush == 0:
+                    yield sink.drain()
+            sheet.write(b'</sheetData></worksheet>')
+    yield sink.drain()
+
+EXPORT_FORMATS = {
+    'csv': ('text/csv', stream_csv),
+    'xlsx': ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', stream_xlsx),
+}
@@ -0,0 +1,195 @@
+# visitor_management/forecast.py
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from prison_core.models import Jail
+from .models import GateForecast, Visit
+from .reports import distinct
+from .snapshot import MISSING, encode, from_days, read_columns, to_days, to_seconds
+
+HISTORY_WEEKS = 12
+HORIZON_WEEKS = 2
+GRID_MINUTES = 15
+STATUS_VALUES = [value for value, _ in Visit.STATUS_CHOICES]
+# Visits that never reach the gate and say nothing about demand
+IGNORED_STATUSES = ['REJECTED', 'CANCELLED', 'EXPIRED']
+BOOKED = [STATUS_VALUES.index('PENDING'), STATUS_VALUES.index('APPROVED')]
+DUE = [STATUS_VALUES.index(status) for status in ('APPROVED', 'COMPLETED', 'NO_SHOW')]
+
+def holiday_days():
+    """settings.VISIT_HOLIDAYS (dates or YYYY-MM-DD strings) as sorted epoch days"""
+    days = []
+    for value in getattr(settings, 'VISIT_HOLIDAYS', []):
+        parsed = parse_date(value) if isinstance(value, str) else value
+        if parsed is not None:
+            days.append(to_days(parsed))
+    return np.array(sorted(days), dtype=np.int64)
+
+def weekday(days):
+    """Epoch days -> 0=Monday .. 6=Sunday (1970-01-01 was a Thursday)"""
+    return (days + 3) % 7
+
+def _occupancy_baseline(jail_index, dates, check_in, check_out, start_day, span, jail_count, weeks):
+    """
+    Mean of each hour's peak concurrent visitors per (jail, weekday), from
+    check-in/out intervals. Every visit day is sampled on a GRID_MINUTES grid;
+    visitors inside at time t = check-ins <= t minus check-outs <= t, found for
+    all sample points at once with searchsorted over the sorted event times.
+    """
+    baseline = np.zeros((jail_count, 7, 24))
+    if not len(dates):
+        return baseline
+    offset = int(timezone.localtime().utcoffset().total_seconds())
+    midnight = dates * 86400 - offset
+    entered = np.clip(check_in - midnight, 0, 86399)
+    left = np.clip(check_out - midnight, entered, 86400)
+
+    day_keys = jail_index * span + (dates - start_day)
+    arrivals = np.sort(day_keys * 86400 + entered)
+    departures = np.sort(day_keys * 86400 + left)
+    days = distinct(day_keys)
+
+    grid = np.arange(0, 86400, GRID_MINUTES * 60)
+    samples = days[:, None] * 86400 + grid[None, :]
+    inside = np.searchsorted(arrivals, samples, side='right') - np.searchsorted(departures, samples, side='right')
+    hourly_peak = inside.reshape(len(days), 24, -1).max(axis=2)
+
+    day_jail = days // span
+    day_weekday = weekday(days % span + start_day)
+    keys = ((day_jail * 7 + day_weekday)[:, None] * 24 + np.arange(24)[None, :]).ravel()
+    totals = np.bincount(keys, weights=hourly_peak.ravel(), minlength=jail_count * 7 * 24)
+    return totals.reshape(jail_count, 7, 24) / np.maximum(weeks, 1)[None, :, None]
+
+def fit_forecasts(history_weeks=HISTORY_WEEKS, horizon_weeks=HORIZON_WEEKS):
+    """
+    Fit seasonal baselines for every jail at once and replace the stored
+    GateForecast rows from today onwards. Returns the number of rows written.
+
+    Expected arrivals per (date, slot) are the larger of the day-of-week x slot
+    baseline (mean arrivals over the last `history_weeks`, scaled on holidays)
+    and the visits already booked for it times the jail's show-up rate. Peak
+    occupancy scales the weekday's hourly occupancy curve by the same ratio.
+    """
+    today = to_days(timezone.localdate())
+    start_day = today - history_weeks * 7
+    horizon = horizon_weeks * 7
+    jail_ids = np.array(sorted(Jail.objects.values_list('id', flat=True)), dtype=np.int64)
+    jail_count = len(jail_ids)
+    if not jail_count:
+        return 0
+
+    slot_values = []
+    visit_jails, dates, status, slots, check_in, check_out = read_columns(
+        Visit.objects.filter(visit_date__gte=from_days(start_day), visit_date__lt=from_days(today + horizon))
+        .exclude(status__in=IGNORED_STATUSES),
+        ['prisoner__jail_id', 'visit_date', 'status', 'visit_time_slot', 'check_in_time', 'check_out_time'],
+        ['q', 'i', 'B', 'H', 'q', 'q'],
+        lambda row: (
+            row[0], to_days(row[1]), STATUS_VALUES.index(row[2]), encode(slot_values, row[3]),
+            to_seconds(row[4]), to_seconds(row[5]),
+        ),
+    )
+    jail_index = np.searchsorted(jail_ids, visit_jails)
+    dates = dates.astype(np.int64)
+    slots = slots.astype(np.int64)
+    slot_count = max(len(slot_values), 1)
+
+    holidays = holiday_days()
+    window = np.arange(start_day, today)
+    ordinary_window = window[~np.isin(window, holidays)]
+    # Ordinary (non-holiday) occurrences of each weekday in the history window
+    weeks = np.bincount(weekday(ordinary_window), minlength=7)
+
+    past = dates < today
+    arrived = past & (check_in != MISSING)
+    on_holiday = np.isin(dates, holidays)
+    ordinary = arrived & ~on_holiday
+
+    keys = (jail_index * 7 + weekday(dates)) * slot_count + slots
+    baseline = (
+        np.bincount(keys[ordinary], minlength=jail_count * 7 * slot_count).reshape(jail_count, 7, slot_count)
+        / np.maximum(weeks, 1)[None, :, None]
+    )
+
+    # Holiday factor: arrivals seen on past holidays against their ordinary baseline
+    holiday_factor = float(getattr(settings, 'VISIT_HOLIDAY_FACTOR', 1.0))
+    past_holidays = holidays[(holidays >= start_day) & (holidays < today)]
+    expected_on_holidays = baseline[:, weekday(past_holidays), :].sum()
+    if len(past_holidays) and expected_on_holidays > 0:
+        holiday_factor = (arrived & on_holiday).sum() / expected_on_holidays
+
+    # Show-up rate: approved visits on past dates that were checked in
+    due = past & np.isin(status, DUE)
+    due_per_jail = np.bincount(jail_index[due], minlength=jail_count)
+    show_rate = np.where(
+        due_per_jail > 0,
+        np.bincount(jail_index[due & arrived], minlength=jail_count) / np.maximum(due_per_jail, 1),
+        1.0,
+    )
+
+    upcoming = np.arange(today, today + horizon)
+    future = (dates >= today) & np.isin(status, BOOKED)
+    booked = np.bincount(
+        ((jail_index * horizon + (dates - today)) * slot_count + slots)[future],
+        minlength=jail_count * horizon * slot_count,
+    ).reshape(jail_count, horizon, slot_count)
+
+    ordinary_expected = baseline[:, weekday(upcoming), :]
+    upcoming_holiday = np.isin(upcoming, holidays)
+    seasonal = ordinary_expected * np.where(upcoming_holiday, holiday_factor, 1.0)[None, :, None]
+    expected = np.maximum(seasonal, booked * show_rate[:, None, None])
+
+    stayed = ordinary & (check_out != MISSING)
+    occupancy = _occupancy_baseline(
+        jail_index[stayed], dates[stayed], check_in[stayed], check_out[stayed],
+        start_day, today - start_day, jail_count, weeks,
+    )[:, weekday(upcoming), :]
+    ordinary_total = ordinary_expected.sum(axis=2)
+    expected_total = expected.sum(axis=2)
+    scale = np.where(ordinary_total > 0, expected_total / np.maximum(ordinary_total, 1e-9), 0.0)
+    curve = occupancy * scale[:, :, None]
+    peak_occupancy = curve.max(axis=2)
+    peak_hour = curve.argmax(axis=2)
+    # No occupancy history: assume the busiest slot's arrivals are inside together
+    no_curve = peak_occupancy <= 0
+    peak_occupancy = np.where(no_curve, expected.max(axis=2), peak_occupancy)
+
+    fitted_at = timezone.now()
+    rows = []
+    for jail in range(jail_count):
+        for day in range(horizon):
+            rows.append(GateForecast(
+                jail_id=int(jail_ids[jail]),
+                date=from_days(today + day),
+                expected_arrivals=round(float(expected_total[jail, day]), 2),
+                booked=int(booked[jail, day].sum()),
+                peak_occupancy=round(float(peak_occupancy[jail, day]), 2),
+                peak_hour=None if no_curve[jail, day] else int(peak_hour[jail, day]),
+                is_holiday=bool(upcoming_holiday[day]),
+                slots={
+                    slot_values[slot]: {
+                        'expected': round(float(expected[jail, day, slot]), 2),
+                        'booked': int(booked[jail, day, slot]),
+                    }
+                    for slot in range(len(slot_values))
+                    if expected[jail, day, slot] > 0 or booked[jail, day, slot] > 0
+                },
+                fitted_at=fitted_at,
+            ))
+
+    with transaction.atomic():
+        GateForecast.objects.filter(date__gte=from_days(today)).delete()
+        GateForecast.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+def upcoming_forecast(jail, days=HORIZON_WEEKS * 7):
+    """Stored forecast rows for a jail from today, each with its slots sorted by name"""
+    rows = list(GateForecast.objects.filter(jail=jail, date__gte=timezone.localdate()).order_by('date')[:days])
+    for row in rows:
+        row.slot_list = [{'time_slot': slot, **values} for slot, values in sorted(row.slots.items())]
+        row.busiest_slot = max(row.slot_list, key=lambda slot: slot['expected'])['time_slot'] if row.slot_list else None
+    return rows
@@ -0,0 +1,39 @@
+# visitor_management/management/commands/archive_history.py
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from visitor_management.archive import (
+    ALERT_ARCHIVE_AFTER_DAYS, ARCHIVE_BATCH_SIZE, VISIT_ARCHIVE_AFTER_DAYS,
+    archivable_alerts, archivable_visits, archive_alerts, archive_visits,
+)
+
+class Command(BaseCommand):
+    help = "Move finished visits and resolved emergency alerts older than the horizon into the archive tables"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--visit-days', type=int, default=VISIT_ARCHIVE_AFTER_DAYS, help="Archive finished visits dated more than this many days ago")
+        parser.add_argument('--alert-days', type=int, default=ALERT_ARCHIVE_AFTER_DAYS, help="Archive resolved alerts issued more than this many days ago")
+        parser.add_argument('--batch-size', type=int, default=ARCHIVE_BATCH_SIZE, help="Rows moved per transaction")
+        parser.add_argument('--dry-run', action='store_true', help="Only count what would be archived")
+
+    def handle(self, *args, **options):
+        if options['visit_days'] < 0 or options['alert_days'] < 0:
+            raise CommandError("--visit-days and --alert-days cannot be negative")
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be positive")
+
+        if options['dry_run']:
+            self.stdout.write(
+                f"Would archive {archivable_visits(options['visit_days']).count()} visits and "
+                f"{archivable_alerts(options['alert_days']).count()} alerts."
+            )
+            return
+
+        started = time.perf_counter()
+        visits = archive_visits(options['visit_days'], options['batch_size'])
+        alerts = archive_alerts(options['alert_days'], options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {visits} visits and {alerts} alerts in {time.perf_counter() - started:.1f}s."
+        ))
@@ -0,0 +1,34 @@
+# visitor_management/management/commands/expire_stale_visits.py
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from visitor_management.expiry import EXPIRY_BATCH_SIZE, expire_stale_visits
+
+class Command(BaseCommand):
+    help = "Expire pending visits and mark unattended approved visits as no-shows once their date has passed"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help="Treat this date as today (YYYY-MM-DD); visits before it are stale")
+        parser.add_argument('--batch-size', type=int, default=EXPIRY_BATCH_SIZE, help="Visits updated per transaction")
+        parser.add_argument('--dry-run', action='store_true', help="Only count the stale visits")
+
+    def handle(self, *args, **options):
+        today = None
+        if options['date']:
+            try:
+                today = parse_date(options['date'])
+            except ValueError:
+                today = None
+            if today is None:
+                raise CommandError("--date must be YYYY-MM-DD")
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be positive")
+
+        started = time.perf_counter()
+        changed = expire_stale_visits(today, options['batch_size'], options['dry_run'])
+        summary = ", ".join(f"{count} {status}" for status, count in changed.items())
+        verb = "Would mark" if options['dry_run'] else "Marked"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {summary} in {time.perf_counter() - started:.2f}s."))
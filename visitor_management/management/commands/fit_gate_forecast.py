@@ -0,0 +1,21 @@
+# visitor_management/management/commands/fit_gate_forecast.py
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from visitor_management.forecast import HISTORY_WEEKS, HORIZON_WEEKS, fit_forecasts
+
+class Command(BaseCommand):
+    help = "Refit gate demand forecasts (expected arrivals and peak occupancy) for every jail"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--history-weeks', type=int, default=HISTORY_WEEKS, help="Weeks of past visits to fit on")
+        parser.add_argument('--horizon-weeks', type=int, default=HORIZON_WEEKS, help="Weeks ahead to forecast")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        rows = fit_forecasts(options['history_weeks'], options['horizon_weeks'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {rows} forecast days in {time.perf_counter() - started:.2f}s."
+        ))
@@ -0,0 +1,22 @@
+# visitor_management/management/commands/rebuild_alert_search.py
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from visitor_management.search import install_search_triggers
+
+class Command(BaseCommand):
+    help = (
+        "Reinstall the emergency log's full-text search triggers and refill the index from the alert tables. "
+        "`migrate` does this itself; use it after changing the alert or user tables outside migrations."
+    )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError("The alert search index is only used on SQLite.")
+        counts = install_search_triggers(connection)
+        if not counts:
+            raise CommandError("The alert search tables do not exist yet; run `manage.py migrate`.")
+        for fts, count in counts.items():
+            self.stdout.write(f"{fts}: {count} alerts indexed")
+        self.stdout.write(self.style.SUCCESS("Alert search index rebuilt."))
@@ -0,0 +1,26 @@
+# visitor_management/management/commands/rebuild_visit_quotas.py
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from visitor_management.models import Visit, VisitQuotaCounter
+from visitor_management.quotas import aggregate_quota_counters
+
+class Command(BaseCommand):
+    help = "Rebuild the per-prisoner weekly and per-visitor monthly quota counters from the Visit table"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--jail', type=int, help="Only rebuild this jail id")
+
+    def handle(self, *args, **options):
+        visits = Visit.objects.all()
+        counters = VisitQuotaCounter.objects.all()
+        if options['jail']:
+            visits = visits.filter(prisoner__jail_id=options['jail'])
+            counters = counters.filter(jail_id=options['jail'])
+
+        with transaction.atomic():
+            deleted, _ = counters.delete()
+            rows = VisitQuotaCounter.objects.bulk_create(aggregate_quota_counters(visits), batch_size=1000)
+
+        self.stdout.write(self.style.SUCCESS(f"Replaced {deleted} quota counters with {len(rows)}."))
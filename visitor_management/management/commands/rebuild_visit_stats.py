@@ -0,0 +1,45 @@
+# visitor_management/management/commands/rebuild_visit_stats.py
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils.dateparse import parse_date
+
+from visitor_management.models import ArchivedVisit, DailyVisitStats, Visit
+from visitor_management.stats import aggregate_visits, merge_stats
+
+class Command(BaseCommand):
+    help = "Rebuild the daily visit statistics rollup from the Visit and ArchivedVisit tables with grouped queries"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--jail', type=int, help="Only rebuild this jail id")
+        parser.add_argument('--from', dest='start', help="First visit date to rebuild (YYYY-MM-DD)")
+        parser.add_argument('--to', dest='end', help="Last visit date to rebuild (YYYY-MM-DD)")
+
+    def handle(self, *args, **options):
+        visits = Visit.objects.all()
+        archived = ArchivedVisit.objects.all()
+        stats = DailyVisitStats.objects.all()
+        if options['jail']:
+            visits = visits.filter(prisoner__jail_id=options['jail'])
+            archived = archived.filter(jail_id=options['jail'])
+            stats = stats.filter(jail_id=options['jail'])
+        for option, lookup in (('start', 'gte'), ('end', 'lte')):
+            if options[option]:
+                try:
+                    value = parse_date(options[option])
+                except ValueError:
+                    value = None
+                if value is None:
+                    raise CommandError(f"--{'from' if option == 'start' else 'to'} must be YYYY-MM-DD")
+                visits = visits.filter(**{f'visit_date__{lookup}': value})
+                archived = archived.filter(**{f'visit_date__{lookup}': value})
+                stats = stats.filter(**{f'date__{lookup}': value})
+
+        with transaction.atomic():
+            deleted, _ = stats.delete()
+            rows = DailyVisitStats.objects.bulk_create(
+                merge_stats(aggregate_visits(visits), aggregate_visits(archived, jail_field='jail_id')),
+                batch_size=1000,
+            )
+
+        self.stdout.write(self.style.SUCCESS(f"Replaced {deleted} rollup rows with {len(rows)}."))
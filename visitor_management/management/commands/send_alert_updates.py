@@ -0,0 +1,15 @@
+# visitor_management/management/commands/send_alert_updates.py
+
+from django.core.management.base import BaseCommand
+
+from visitor_management.alerts import send_due_alert_updates
+
+class Command(BaseCommand):
+    help = (
+        "Email follow-up reports whose batched alert update never went out "
+        "(run every minute or so from cron)"
+    )
+
+    def handle(self, *args, **options):
+        sent = send_due_alert_updates()
+        self.stdout.write(self.style.SUCCESS(f"{sent} alert update{'s' if sent != 1 else ''} sent."))
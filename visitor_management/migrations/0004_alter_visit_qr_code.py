@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:06
+
+import prison_core.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('visitor_management', '0003_alter_emergencyalert_issued_by_alter_visit_prisoner_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='visit',
+            name='qr_code',
+            field=models.ImageField(blank=True, null=True, storage=prison_core.storage.ContentAddressedStorage(), upload_to='visit_qrcodes/'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:20
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prison_core', '0003_prisoner_prison_core_jail_id_d58726_idx'),
+        ('visitor_management', '0005_visit_updated_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='emergencyalert',
+            index=models.Index(fields=['-issued_at', '-id'], name='visitor_man_issued__fb79ee_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='visit',
+            index=models.Index(fields=['visitor', '-visit_date', '-id'], name='visitor_man_visitor_168863_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='visit',
+            index=models.Index(fields=['status', 'visit_type', 'visit_date', 'id'], name='visitor_man_status_1429cb_idx'),
+        ),
+    ]
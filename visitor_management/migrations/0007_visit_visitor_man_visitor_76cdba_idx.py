@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:21
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prison_core', '0003_prisoner_prison_core_jail_id_d58726_idx'),
+        ('visitor_management', '0006_emergencyalert_visitor_man_issued__fb79ee_idx_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='visit',
+            index=models.Index(fields=['visitor', 'updated_at', 'id'], name='visitor_man_visitor_76cdba_idx'),
+        ),
+    ]
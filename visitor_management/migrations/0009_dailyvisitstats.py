@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prison_core', '0003_prisoner_prison_core_jail_id_d58726_idx'),
+        ('visitor_management', '0008_visitevent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyVisitStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('time_slot', models.CharField(max_length=50)),
+                ('total', models.IntegerField(default=0)),
+                ('pending', models.IntegerField(default=0)),
+                ('approved', models.IntegerField(default=0)),
+                ('rejected', models.IntegerField(default=0)),
+                ('completed', models.IntegerField(default=0)),
+                ('cancelled', models.IntegerField(default=0)),
+                ('emergency', models.IntegerField(default=0)),
+                ('checked_in', models.IntegerField(default=0)),
+                ('checked_out', models.IntegerField(default=0)),
+                ('awaiting_check_in', models.IntegerField(default=0)),
+                ('seconds_inside', models.BigIntegerField(default=0)),
+                ('jail', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_visit_stats', to='prison_core.jail')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('jail', 'date', 'time_slot'), name='unique_daily_visit_stats')],
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prison_core', '0003_prisoner_prison_core_jail_id_d58726_idx'),
+        ('visitor_management', '0009_dailyvisitstats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GateForecast',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('expected_arrivals', models.FloatField()),
+                ('booked', models.PositiveIntegerField(default=0)),
+                ('peak_occupancy', models.FloatField()),
+                ('peak_hour', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('is_holiday', models.BooleanField(default=False)),
+                ('slots', models.JSONField(default=dict)),
+                ('fitted_at', models.DateTimeField()),
+                ('jail', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='gate_forecasts', to='prison_core.jail')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('jail', 'date'), name='unique_gate_forecast')],
+            },
+        ),
+    ]
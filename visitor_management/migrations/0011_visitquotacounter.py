@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prison_core', '0004_jail_monthly_visits_per_visitor_and_more'),
+        ('visitor_management', '0010_gateforecast'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VisitQuotaCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(choices=[('PRISONER_WEEK', 'Prisoner per week'), ('VISITOR_MONTH', 'Visitor per month')], max_length=20)),
+                ('subject_id', models.PositiveBigIntegerField()),
+                ('period_start', models.DateField()),
+                ('visits', models.IntegerField(default=0)),
+                ('jail', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='visit_quota_counters', to='prison_core.jail')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('scope', 'subject_id', 'jail', 'period_start'), name='unique_visit_quota_counter')],
+            },
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:39
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prison_core', '0004_jail_monthly_visits_per_visitor_and_more'),
+        ('visitor_management', '0011_visitquotacounter'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='visit',
+            name='visitor_man_status_1429cb_idx',
+        ),
+        migrations.AddField(
+            model_name='dailyvisitstats',
+            name='expired',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='dailyvisitstats',
+            name='no_show',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='visit',
+            name='status',
+            field=models.CharField(choices=[('PENDING', 'Pending'), ('APPROVED', 'Approved'), ('REJECTED', 'Rejected'), ('COMPLETED', 'Completed'), ('CANCELLED', 'Cancelled'), ('EXPIRED', 'Expired'), ('NO_SHOW', 'No Show')], default='PENDING', max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='visitevent',
+            name='event_type',
+            field=models.CharField(choices=[('REQUESTED', 'Requested'), ('APPROVED', 'Approved'), ('REJECTED', 'Rejected'), ('CHECKED_IN', 'Checked In'), ('CHECKED_OUT', 'Checked Out'), ('CANCELLED', 'Cancelled'), ('EXPIRED', 'Expired'), ('NO_SHOW', 'No Show')], max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='visit',
+            index=models.Index(condition=models.Q(('status', 'PENDING')), fields=['visit_type', 'visit_date', 'id'], name='visit_pending_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='visit',
+            index=models.Index(condition=models.Q(('status', 'APPROVED')), fields=['visit_date', 'id'], name='visit_approved_idx'),
+        ),
+    ]
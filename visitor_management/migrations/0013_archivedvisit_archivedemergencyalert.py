@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:42
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prison_core', '0004_jail_monthly_visits_per_visitor_and_more'),
+        ('visitor_management', '0012_visit_expired_no_show'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedEmergencyAlert',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('message', models.TextField()),
+                ('issued_at', models.DateTimeField()),
+                ('is_active', models.BooleanField(default=False)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('issued_by', models.ForeignKey(db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-issued_at', '-id'], name='visitor_man_issued__ccda74_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedVisit',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('visit_date', models.DateField()),
+                ('visit_time_slot', models.CharField(max_length=50)),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('APPROVED', 'Approved'), ('REJECTED', 'Rejected'), ('COMPLETED', 'Completed'), ('CANCELLED', 'Cancelled'), ('EXPIRED', 'Expired'), ('NO_SHOW', 'No Show')], max_length=20)),
+                ('visit_type', models.CharField(choices=[('REGULAR', 'Regular Visit'), ('EMERGENCY', 'Emergency Visit')], max_length=10)),
+                ('check_in_time', models.DateTimeField(blank=True, null=True)),
+                ('check_out_time', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('jail', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='prison_core.jail')),
+                ('prisoner', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='archived_visits', to='prison_core.prisoner')),
+                ('visitor', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='archived_visits', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['visitor', '-visit_date', '-id'], name='visitor_man_visitor_854a36_idx'), models.Index(fields=['jail', 'visit_date'], name='visitor_man_jail_id_108c30_idx')],
+            },
+        ),
+    ]
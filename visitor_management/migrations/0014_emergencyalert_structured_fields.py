@@ -0,0 +1,122 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:43
+
+import ipaddress
+import re
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+from visitor_management.emergency import PANIC_ALARM, classify_emergency_type
+
+MESSAGE_FIELDS = {
+    'Emergency Type': 'emergency_type',
+    'Location': 'location',
+    'Facility': 'facility',
+    'User IP': 'source_ip',
+}
+DETAILS = re.compile(r'EMERGENCY DETAILS:\n(.*?)\n\s*\nIMMEDIATE ACTION REQUIRED', re.S)
+PANIC = re.compile(r'PANIC ALARM TRIGGERED AT GATE: (.*?) 🚨')
+
+
+def fill_structured_fields(apps, schema_editor):
+    """Recover type, reason, location, facility and IP from existing alert messages"""
+    EmergencyAlert = apps.get_model('visitor_management', 'EmergencyAlert')
+    Jail = apps.get_model('prison_core', 'Jail')
+    jails = dict(Jail.objects.values_list('name', 'id'))
+
+    for alert in EmergencyAlert.objects.select_related('issued_by').iterator():
+        values = {}
+        for line in alert.message.splitlines():
+            label, _, value = line.partition(':')
+            if label.strip() in MESSAGE_FIELDS and value.strip():
+                values[MESSAGE_FIELDS[label.strip()]] = value.strip()
+        details = DETAILS.search(alert.message)
+        panic = PANIC.search(alert.message)
+        if panic:
+            values.update(emergency_type=PANIC_ALARM, location='Gate', facility=panic.group(1).strip())
+
+        alert.reason = details.group(1).strip() if details else ('' if panic else alert.message.strip())
+        alert.emergency_type = values.get('emergency_type') or classify_emergency_type(alert.reason)
+        alert.location = values.get('location', '')[:200]
+        alert.facility_id = jails.get(values.get('facility')) or getattr(alert.issued_by, 'jail_id', None)
+        try:
+            alert.source_ip = str(ipaddress.ip_address(values.get('source_ip', '')))
+        except ValueError:
+            alert.source_ip = None
+        alert.save(update_fields=['reason', 'emergency_type', 'location', 'facility', 'source_ip'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prison_core', '0004_jail_monthly_visits_per_visitor_and_more'),
+        ('visitor_management', '0013_archivedvisit_archivedemergencyalert'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedemergencyalert',
+            name='emergency_type',
+            field=models.CharField(blank=True, max_length=50),
+        ),
+        migrations.AddField(
+            model_name='archivedemergencyalert',
+            name='facility',
+            field=models.ForeignKey(db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='prison_core.jail'),
+        ),
+        migrations.AddField(
+            model_name='archivedemergencyalert',
+            name='location',
+            field=models.CharField(blank=True, max_length=200),
+        ),
+        migrations.AddField(
+            model_name='archivedemergencyalert',
+            name='reason',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='archivedemergencyalert',
+            name='source_ip',
+            field=models.GenericIPAddressField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='emergencyalert',
+            name='emergency_type',
+            field=models.CharField(blank=True, max_length=50),
+        ),
+        migrations.AddField(
+            model_name='emergencyalert',
+            name='facility',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='emergency_alerts', to='prison_core.jail'),
+        ),
+        migrations.AddField(
+            model_name='emergencyalert',
+            name='location',
+            field=models.CharField(blank=True, db_index=True, max_length=200),
+        ),
+        migrations.AddField(
+            model_name='emergencyalert',
+            name='reason',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='emergencyalert',
+            name='source_ip',
+            field=models.GenericIPAddressField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='archivedemergencyalert',
+            index=models.Index(fields=['emergency_type', '-issued_at', '-id'], name='visitor_man_emergen_aefbc9_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='emergencyalert',
+            index=models.Index(fields=['emergency_type', '-issued_at', '-id'], name='visitor_man_emergen_e4926e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='emergencyalert',
+            index=models.Index(fields=['facility', '-issued_at', '-id'], name='visitor_man_facilit_343589_idx'),
+        ),
+        migrations.RunPython(fill_structured_fields, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:46
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def broadcast_unscoped_alerts(apps, schema_editor):
+    """Alerts with no facility were shown everywhere; keep them state-wide"""
+    for name in ('EmergencyAlert', 'ArchivedEmergencyAlert'):
+        apps.get_model('visitor_management', name).objects.filter(facility__isnull=True).update(is_broadcast=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prison_core', '0004_jail_monthly_visits_per_visitor_and_more'),
+        ('visitor_management', '0014_emergencyalert_structured_fields'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedemergencyalert',
+            name='is_broadcast',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='emergencyalert',
+            name='is_broadcast',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddIndex(
+            model_name='emergencyalert',
+            index=models.Index(fields=['is_active', 'is_broadcast', 'facility', '-issued_at'], name='visitor_man_is_acti_30c3c3_idx'),
+        ),
+        migrations.RunPython(broadcast_unscoped_alerts, migrations.RunPython.noop),
+    ]
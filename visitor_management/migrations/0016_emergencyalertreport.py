@@ -0,0 +1,60 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:51
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def fill_last_reported_at(apps, schema_editor):
+    """Existing alerts were reported once, when issued"""
+    for name in ('EmergencyAlert', 'ArchivedEmergencyAlert'):
+        apps.get_model('visitor_management', name).objects.update(last_reported_at=models.F('issued_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('visitor_management', '0015_emergencyalert_is_broadcast'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedemergencyalert',
+            name='last_reported_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='archivedemergencyalert',
+            name='report_count',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='emergencyalert',
+            name='last_reported_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='emergencyalert',
+            name='notified_reports',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='emergencyalert',
+            name='report_count',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.CreateModel(
+            name='EmergencyAlertReport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('reported_at', models.DateTimeField(auto_now_add=True)),
+                ('reason', models.TextField(blank=True)),
+                ('location', models.CharField(blank=True, max_length=200)),
+                ('source_ip', models.GenericIPAddressField(blank=True, null=True)),
+                ('alert', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='reports', to='visitor_management.emergencyalert')),
+                ('reported_by', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.RunPython(fill_last_reported_at, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:52
+
+from django.conf import settings
+from django.db import migrations, models
+
+from visitor_management.search import SEARCH_TABLES, drop_search_index_sql, search_index_sql
+
+
+def create_search_indexes(apps, schema_editor):
+    """FTS5 tables over live and archived alerts, filled by the post_migrate handler in apps.py"""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for table, fts in SEARCH_TABLES.items():
+        for statement in search_index_sql(table, fts):
+            schema_editor.execute(statement)
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for table, fts in SEARCH_TABLES.items():
+        for statement in drop_search_index_sql(table, fts):
+            schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prison_core', '0004_jail_monthly_visits_per_visitor_and_more'),
+        ('visitor_management', '0016_emergencyalertreport'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='emergencyalert',
+            index=models.Index(fields=['is_active', '-issued_at', '-id'], name='visitor_man_is_acti_0ad432_idx'),
+        ),
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:20
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def fill_updated_at(apps, schema_editor):
+    """Existing alerts last changed no later than now; issued_at is the best known value"""
+    EmergencyAlert = apps.get_model('visitor_management', 'EmergencyAlert')
+    EmergencyAlert.objects.update(updated_at=models.F('issued_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('visitor_management', '0017_alert_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='emergencyalert',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_updated_at, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:10
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prison_core', '0005_storedmedia_updated_at'),
+        ('visitor_management', '0018_emergencyalert_updated_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='archivedvisit',
+            name='jail',
+            field=models.ForeignKey(db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='prison_core.jail'),
+        ),
+        migrations.AlterField(
+            model_name='archivedvisit',
+            name='prisoner',
+            field=models.ForeignKey(db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='archived_visits', to='prison_core.prisoner'),
+        ),
+        migrations.AlterField(
+            model_name='archivedvisit',
+            name='visitor',
+            field=models.ForeignKey(db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='archived_visits', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('visitor_management', '0019_archivedvisit_nullable_keys'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='visit',
+            name='visit_pending_idx',
+        ),
+        migrations.AddIndex(
+            model_name='visit',
+            index=models.Index(condition=models.Q(('status', 'PENDING')), fields=['visit_date', 'id'], name='visit_pending_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:05
+
+from django.db import migrations
+
+from visitor_management.quotas import aggregate_quota_counters
+
+
+def backfill_quota_counters(apps, schema_editor):
+    """Count the visits that already use up quota, as rebuild_visit_quotas does"""
+    Visit = apps.get_model('visitor_management', 'Visit')
+    VisitQuotaCounter = apps.get_model('visitor_management', 'VisitQuotaCounter')
+    VisitQuotaCounter.objects.all().delete()
+    VisitQuotaCounter.objects.bulk_create([
+        VisitQuotaCounter(
+            scope=row.scope, subject_id=row.subject_id, jail_id=row.jail_id,
+            period_start=row.period_start, visits=row.visits,
+        )
+        for row in aggregate_quota_counters(Visit.objects.all())
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('visitor_management', '0020_pending_index_by_date'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_quota_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:12
+
+from django.db import migrations
+
+from visitor_management.stats import COUNTERS, aggregate_visits, merge_stats
+
+
+def backfill_visit_stats(apps, schema_editor):
+    """Roll up the visits and archived visits that already exist, as rebuild_visit_stats does"""
+    Visit = apps.get_model('visitor_management', 'Visit')
+    ArchivedVisit = apps.get_model('visitor_management', 'ArchivedVisit')
+    DailyVisitStats = apps.get_model('visitor_management', 'DailyVisitStats')
+    rows = merge_stats(
+        aggregate_visits(Visit.objects.all()),
+        aggregate_visits(ArchivedVisit.objects.all(), jail_field='jail_id'),
+    )
+    DailyVisitStats.objects.all().delete()
+    DailyVisitStats.objects.bulk_create([
+        DailyVisitStats(
+            jail_id=row.jail_id, date=row.date, time_slot=row.time_slot,
+            **{name: getattr(row, name) for name in COUNTERS},
+        )
+        for row in rows
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('visitor_management', '0021_backfill_visit_quotas'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_visit_stats, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,7 @@
 from django.db import models
 from accounts.models import User
-from prison_core.models import Prisoner
+from prison_core.models import Jail, Prisoner
+from prison_core.storage import media_storage
 
 class Visit(models.Model):
     STATUS_CHOICES = [
@@ -9,6 +10,9 @@ class Visit(models.Model):
         ('REJECTED', 'Rejected'),
         ('COMPLETED', 'Completed'),
         ('CANCELLED', 'Cancelled'),
+        # Set by the expire_stale_visits command once the visit date has passed
+        ('EXPIRED', 'Expired'),
+        ('NO_SHOW', 'No Show'),
     ]
     VISIT_TYPE_CHOICES = [
         ('REGULAR', 'Regular Visit'),
@@ -22,20 +26,271 @@ class Visit(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING')
     visit_type = models.CharField(max_length=10, choices=VISIT_TYPE_CHOICES, default='REGULAR')
     
-    qr_code = models.ImageField(upload_to='visit_qrcodes/', blank=True, null=True)
+    qr_code = models.ImageField(upload_to='visit_qrcodes/', storage=media_storage, blank=True, null=True)
     check_in_time = models.DateTimeField(blank=True, null=True)
     check_out_time = models.DateTimeField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            # Keyset pagination of "my visits" and the pending review queue
+            models.Index(fields=['visitor', '-visit_date', '-id']),
+            models.Index(fields=['visitor', 'updated_at', 'id']),
+            # Live rows only: expired and finished visits never enter these
+            models.Index(
+                fields=['visit_date', 'id'],
+                condition=models.Q(status='PENDING'),
+                name='visit_pending_idx',
+            ),
+            models.Index(
+                fields=['visit_date', 'id'],
+                condition=models.Q(status='APPROVED'),
+                name='visit_approved_idx',
+            ),
+        ]
 
     def __str__(self):
         return f"Visit by {self.visitor.username} for {self.prisoner.prisoner_id} on {self.visit_date}"
 
+class VisitEvent(models.Model):
+    """
+    Append-only record of one visit state transition. `sequence` is handed
+    out by EventSequence inside the writing transaction, so events become
+    visible in sequence order and a reader can resume after the last
+    sequence it processed without missing anything.
+    """
+    EVENT_TYPES = [
+        ('REQUESTED', 'Requested'),
+        ('APPROVED', 'Approved'),
+        ('REJECTED', 'Rejected'),
+        ('CHECKED_IN', 'Checked In'),
+        ('CHECKED_OUT', 'Checked Out'),
+        ('CANCELLED', 'Cancelled'),
+        ('EXPIRED', 'Expired'),
+        ('NO_SHOW', 'No Show'),
+    ]
+
+    sequence = models.PositiveBigIntegerField(unique=True)
+    # No database constraints: the log outlives archived or deleted visits
+    visit = models.ForeignKey(Visit, on_delete=models.DO_NOTHING, db_constraint=False, related_name='events')
+    visitor = models.ForeignKey(User, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    jail = models.ForeignKey(Jail, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    event_type = models.CharField(max_length=20, choices=EVENT_TYPES)
+    from_status = models.CharField(max_length=20, blank=True)
+    to_status = models.CharField(max_length=20)
+    actor = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='visit_events')
+    data = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['jail', 'sequence']),
+            models.Index(fields=['visitor', 'sequence']),
+            models.Index(fields=['visit', 'sequence']),
+        ]
+
+    def __str__(self):
+        return f"#{self.sequence} {self.event_type} visit {self.visit_id}"
+
+class EventSequence(models.Model):
+    """Named counter; incrementing it row-locks until commit, ordering concurrent writers"""
+    name = models.CharField(max_length=50, primary_key=True)
+    value = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name}: {self.value}"
+
+class DailyVisitStats(models.Model):
+    """
+    Rollup of visits per jail, visit date and time slot. Kept current by
+    visitor_management.stats as visits change state and rebuilt from scratch
+    by the rebuild_visit_stats command; dashboards read this, never Visit.
+    """
+    jail = models.ForeignKey(Jail, on_delete=models.CASCADE, related_name='daily_visit_stats')
+    date = models.DateField()
+    time_slot = models.CharField(max_length=50)
+
+    total = models.IntegerField(default=0)
+    pending = models.IntegerField(default=0)
+    approved = models.IntegerField(default=0)
+    rejected = models.IntegerField(default=0)
+    completed = models.IntegerField(default=0)
+    cancelled = models.IntegerField(default=0)
+    expired = models.IntegerField(default=0)
+    no_show = models.IntegerField(default=0)
+    emergency = models.IntegerField(default=0)
+    checked_in = models.IntegerField(default=0)
+    checked_out = models.IntegerField(default=0)
+    # Approved but never checked in; no-shows once the date has passed
+    awaiting_check_in = models.IntegerField(default=0)
+    seconds_inside = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['jail', 'date', 'time_slot'], name='unique_daily_visit_stats'),
+        ]
+
+    def __str__(self):
+        return f"{self.jail_id} {self.date} {self.time_slot}: {self.total}"
+
+class GateForecast(models.Model):
+    """
+    Expected gate demand for one jail and date, written by
+    visitor_management.forecast.fit_forecasts. `slots` maps each time slot to
+    {"expected": arrivals, "booked": visits already requested}.
+    """
+    jail = models.ForeignKey(Jail, on_delete=models.CASCADE, related_name='gate_forecasts')
+    date = models.DateField()
+    expected_arrivals = models.FloatField()
+    booked = models.PositiveIntegerField(default=0)
+    peak_occupancy = models.FloatField()
+    peak_hour = models.PositiveSmallIntegerField(null=True, blank=True)
+    is_holiday = models.BooleanField(default=False)
+    slots = models.JSONField(default=dict)
+    fitted_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['jail', 'date'], name='unique_gate_forecast'),
+        ]
+
+    def __str__(self):
+        return f"{self.jail_id} {self.date}: {self.expected_arrivals:.1f} expected"
+
+class VisitQuotaCounter(models.Model):
+    """
+    Approved visits per prisoner and week, or per visitor and month, at one
+    jail. Maintained by visitor_management.quotas as visits change state so
+    quota checks read a single row instead of counting visits.
+    """
+    PRISONER_WEEK = 'PRISONER_WEEK'
+    VISITOR_MONTH = 'VISITOR_MONTH'
+    SCOPE_CHOICES = [
+        (PRISONER_WEEK, 'Prisoner per week'),
+        (VISITOR_MONTH, 'Visitor per month'),
+    ]
+
+    scope = models.CharField(max_length=20, choices=SCOPE_CHOICES)
+    # Prisoner id for PRISONER_WEEK, visitor (user) id for VISITOR_MONTH
+    subject_id = models.PositiveBigIntegerField()
+    jail = models.ForeignKey(Jail, on_delete=models.CASCADE, related_name='visit_quota_counters')
+    # Monday of the week, or the first of the month
+    period_start = models.DateField()
+    visits = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['scope', 'subject_id', 'jail', 'period_start'], name='unique_visit_quota_counter'),
+        ]
+
+    def __str__(self):
+        return f"{self.scope} {self.subject_id} @ {self.jail_id} from {self.period_start}: {self.visits}"
+
 class EmergencyAlert(models.Model):
     message = models.TextField()
     issued_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='issued_alerts')
     issued_at = models.DateTimeField(auto_now_add=True)
+    # Bumped by resolve/reactivate too; queryset update()s must set it themselves
+    updated_at = models.DateTimeField(auto_now=True)
     is_active = models.BooleanField(default=True)
+    # Structured copies of what the message text describes, for filtering and stats
+    emergency_type = models.CharField(max_length=50, blank=True)
+    reason = models.TextField(blank=True)
+    location = models.CharField(max_length=200, blank=True, db_index=True)
+    facility = models.ForeignKey(Jail, on_delete=models.SET_NULL, null=True, blank=True, related_name='emergency_alerts')
+    source_ip = models.GenericIPAddressField(null=True, blank=True, db_index=True)
+    # State-wide: shown to every jail instead of only the facility's staff
+    is_broadcast = models.BooleanField(default=False)
+    # Triggers coalesced into this alert (the first one included), the latest
+    # of them, and how many follow-ups have gone out in update emails
+    report_count = models.PositiveIntegerField(default=1)
+    last_reported_at = models.DateTimeField(null=True, blank=True)
+    notified_reports = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-issued_at', '-id']),
+            models.Index(fields=['emergency_type', '-issued_at', '-id']),
+            models.Index(fields=['facility', '-issued_at', '-id']),
+            # Active-alert lookups per scope (see visitor_management.alerts)
+            models.Index(fields=['is_active', 'is_broadcast', 'facility', '-issued_at']),
+            # Emergency log filtered by status, paged newest first
+            models.Index(fields=['is_active', '-issued_at', '-id']),
+        ]
 
     def __str__(self):
         
         return f"Alert: {self.message[:50]}"
 
+class EmergencyAlertReport(models.Model):
+    """
+    A follow-up trigger attached to an open alert instead of raising a new
+    one (see visitor_management.alerts). Unconstrained, so reports stay
+    readable after their alert moves to the archive under the same id.
+    """
+    alert = models.ForeignKey(EmergencyAlert, on_delete=models.DO_NOTHING, db_constraint=False, related_name='reports')
+    reported_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='+')
+    reported_at = models.DateTimeField(auto_now_add=True)
+    reason = models.TextField(blank=True)
+    location = models.CharField(max_length=200, blank=True)
+    source_ip = models.GenericIPAddressField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Report on alert #{self.alert_id} at {self.reported_at}"
+
+class ArchivedVisit(models.Model):
+    """
+    A finished visit moved out of Visit by visitor_management.archive. Keeps
+    the original id and Visit's field names, so exports and templates read
+    both alike; no database constraints, so archived history never blocks
+    deleting a user or prisoner.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    # null=True only so queries LEFT JOIN: the ids are always set but may
+    # point at users, prisoners or jails deleted since
+    visitor = models.ForeignKey(User, on_delete=models.DO_NOTHING, db_constraint=False, null=True, related_name='archived_visits')
+    prisoner = models.ForeignKey(Prisoner, on_delete=models.DO_NOTHING, db_constraint=False, null=True, related_name='archived_visits')
+    jail = models.ForeignKey(Jail, on_delete=models.DO_NOTHING, db_constraint=False, null=True, related_name='+')
+    visit_date = models.DateField()
+    visit_time_slot = models.CharField(max_length=50)
+    status = models.CharField(max_length=20, choices=Visit.STATUS_CHOICES)
+    visit_type = models.CharField(max_length=10, choices=Visit.VISIT_TYPE_CHOICES)
+    check_in_time = models.DateTimeField(blank=True, null=True)
+    check_out_time = models.DateTimeField(blank=True, null=True)
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['visitor', '-visit_date', '-id']),
+            models.Index(fields=['jail', 'visit_date']),
+        ]
+
+    def __str__(self):
+        return f"Archived visit {self.id} on {self.visit_date}"
+
+class ArchivedEmergencyAlert(models.Model):
+    """A resolved emergency alert moved out of EmergencyAlert by visitor_management.archive"""
+    id = models.BigIntegerField(primary_key=True)
+    message = models.TextField()
+    issued_by = models.ForeignKey(User, on_delete=models.DO_NOTHING, db_constraint=False, null=True, related_name='+')
+    issued_at = models.DateTimeField()
+    is_active = models.BooleanField(default=False)
+    emergency_type = models.CharField(max_length=50, blank=True)
+    reason = models.TextField(blank=True)
+    location = models.CharField(max_length=200, blank=True)
+    facility = models.ForeignKey(Jail, on_delete=models.DO_NOTHING, db_constraint=False, null=True, related_name='+')
+    source_ip = models.GenericIPAddressField(null=True, blank=True)
+    is_broadcast = models.BooleanField(default=False)
+    report_count = models.PositiveIntegerField(default=1)
+    last_reported_at = models.DateTimeField(null=True, blank=True)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-issued_at', '-id']),
+            models.Index(fields=['emergency_type', '-issued_at', '-id']),
+        ]
+
+    def __str__(self):
+        return f"Archived alert: {self.message[:50]}"
@@ -0,0 +1,86 @@
+# visitor_management/passes.py
+
+import hashlib
+from collections import OrderedDict
+from io import BytesIO
+from threading import Lock
+
+import qrcode
+import qrcode.image.svg
+from django.conf import settings
+
+# Gate scanners read the payload text, so its format must stay stable
+PASS_FORMATS = {
+    'svg': 'image/svg+xml',
+    'png': 'image/png',
+}
+ERROR_CORRECTION = {
+    'L': qrcode.constants.ERROR_CORRECT_L,
+    'M': qrcode.constants.ERROR_CORRECT_M,
+    'Q': qrcode.constants.ERROR_CORRECT_Q,
+    'H': qrcode.constants.ERROR_CORRECT_H,
+}
+DEFAULT_ERROR_CORRECTION = 'M'
+PASS_CACHE_SIZE = getattr(settings, 'VISIT_PASS_CACHE_SIZE', 512)
+
+def pass_payload(visit):
+    """Text encoded in a visit's QR pass (needs visitor and prisoner__jail loaded)"""
+    return (
+        f"Visit ID: {visit.id}\n"
+        f"Visitor: {visit.visitor.username}\n"
+        f"Prisoner: {visit.prisoner.prisoner_id}\n"
+        f"Date: {visit.visit_date}\n"
+        f"Facility: {visit.prisoner.jail.name}"
+    )
+
+def pass_etag(payload, fmt, level=DEFAULT_ERROR_CORRECTION):
+    """Strong validator: the rendered bytes are a pure function of these inputs"""
+    return hashlib.sha256(f"{fmt}:{level}:{payload}".encode()).hexdigest()[:32]
+
+def pass_version(payload):
+    """Short payload fingerprint used as the ?v= cache-busting parameter of pass URLs"""
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+def render_pass(payload, fmt='svg', level=DEFAULT_ERROR_CORRECTION):
+    """Render a QR pass without caching. Returns the image bytes."""
+    qr = qrcode.QRCode(error_correction=ERROR_CORRECTION[level], box_size=10, border=4)
+    qr.add_data(payload)
+    qr.make(fit=True)
+    if fmt == 'svg':
+        return qr.make_image(image_factory=qrcode.image.svg.SvgPathImage).to_string()
+    buffer = BytesIO()
+    qr.make_image().save(buffer, format='PNG')
+    return buffer.getvalue()
+
+class PassCache:
+    """Bounded LRU of rendered passes keyed by ETag, shared by all request threads"""
+
+    def __init__(self, maxsize=PASS_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, payload, fmt='svg', level=DEFAULT_ERROR_CORRECTION):
+        etag = pass_etag(payload, fmt, level)
+        with self._lock:
+            data = self._entries.get(etag)
+            if data is not None:
+                self._entries.move_to_end(etag)
+                return etag, data
+        # Render outside the lock; a concurrent duplicate render is harmless
+        data = render_pass(payload, fmt, level)
+        with self._lock:
+            self._entries[etag] = data
+            self._entries.move_to_end(etag)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return etag, data
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+pass_cache = PassCache()
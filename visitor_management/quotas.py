@@ -0,0 +1,128 @@
+# visitor_management/quotas.py
+
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, F, Q
+from django.db.models.functions import TruncMonth, TruncWeek
+
+from .models import Visit, VisitQuotaCounter
+
+# Statuses that use up quota; pending requests do not until they are approved,
+# and a missed approved visit still counts
+COUNTED_STATUSES = ('APPROVED', 'COMPLETED', 'NO_SHOW')
+# Emergency visits have their own cooldown and are never refused for quota
+EXEMPT_VISIT_TYPES = ('EMERGENCY',)
+
+def period_starts(visit_date):
+    """Monday of the visit's week and the first of its month"""
+    return visit_date - timedelta(days=visit_date.weekday()), visit_date.replace(day=1)
+
+def _counter_keys(visit):
+    return _keys(visit.prisoner_id, visit.visitor_id, visit.prisoner.jail_id, visit.visit_date)
+
+def _keys(prisoner_id, visitor_id, jail_id, visit_date):
+    week, month = period_starts(Visit._meta.get_field('visit_date').to_python(visit_date))
+    return [
+        dict(scope=VisitQuotaCounter.PRISONER_WEEK, subject_id=prisoner_id, jail_id=jail_id, period_start=week),
+        dict(scope=VisitQuotaCounter.VISITOR_MONTH, subject_id=visitor_id, jail_id=jail_id, period_start=month),
+    ]
+
+def _add(key, delta):
+    row, _ = VisitQuotaCounter.objects.get_or_create(**key)
+    VisitQuotaCounter.objects.filter(pk=row.pk).update(visits=F('visits') + delta)
+
+def apply_quota_transition(visit, from_status=''):
+    """
+    Move the visit's quota counters when it enters or leaves a counted
+    status. Call inside the transaction that saved it.
+    """
+    delta = int(visit.status in COUNTED_STATUSES) - int(from_status in COUNTED_STATUSES)
+    if not delta:
+        return
+    with transaction.atomic():
+        for key in _counter_keys(visit):
+            _add(key, delta)
+
+def apply_quota_changes(visits, to_status):
+    """
+    Bulk form of apply_quota_transition for dicts with prisoner_id,
+    visitor_id, prisoner__jail_id, visit_date and status (before).
+    """
+    deltas = {}
+    for visit in visits:
+        delta = int(to_status in COUNTED_STATUSES) - int(visit['status'] in COUNTED_STATUSES)
+        if not delta:
+            continue
+        for key in _keys(visit['prisoner_id'], visit['visitor_id'], visit['prisoner__jail_id'], visit['visit_date']):
+            identity = tuple(key.values())
+            deltas[identity] = deltas.get(identity, 0) + delta
+    with transaction.atomic():
+        for (scope, subject_id, jail_id, period_start), delta in deltas.items():
+            if delta:
+                _add(dict(scope=scope, subject_id=subject_id, jail_id=jail_id, period_start=period_start), delta)
+
+def quota_error(visit, lock=False):
+    """
+    Why this visit would go over its jail's quota, or None. One indexed
+    lookup on the counters, however many visits the prisoner has had.
+
+    With `lock` (inside a transaction, before approving) both counter rows
+    are created if needed and locked, so concurrent approvals for the same
+    prisoner or visitor queue up instead of both passing the check.
+    """
+    jail = visit.prisoner.jail
+    limits = {
+        VisitQuotaCounter.PRISONER_WEEK: jail.weekly_visits_per_prisoner,
+        VisitQuotaCounter.VISITOR_MONTH: jail.monthly_visits_per_visitor,
+    }
+    if visit.visit_type in EXEMPT_VISIT_TYPES or not any(limit is not None for limit in limits.values()):
+        return None
+
+    keys = _counter_keys(visit)
+    counters = VisitQuotaCounter.objects.filter(Q(**keys[0]) | Q(**keys[1]))
+    if lock:
+        for key in keys:
+            VisitQuotaCounter.objects.get_or_create(**key)
+        # Lock in primary key order so two approvals cannot deadlock
+        counters = counters.select_for_update().order_by('pk')
+    used = dict.fromkeys(limits, 0)
+    used.update(counters.values_list('scope', 'visits'))
+
+    week_start = keys[0]['period_start']
+    limit = limits[VisitQuotaCounter.PRISONER_WEEK]
+    if limit is not None and used[VisitQuotaCounter.PRISONER_WEEK] >= limit:
+        return (
+            f"{visit.prisoner.first_name} {visit.prisoner.last_name} has already received {limit} approved "
+            f"visit{'s' if limit != 1 else ''} in the week of {week_start:%d %b %Y}, the weekly limit at {jail.name}. "
+            f"Please choose a date from {week_start + timedelta(days=7):%d %b %Y} onwards."
+        )
+    limit = limits[VisitQuotaCounter.VISITOR_MONTH]
+    if limit is not None and used[VisitQuotaCounter.VISITOR_MONTH] >= limit:
+        return (
+            f"The monthly limit of {limit} approved visit{'s' if limit != 1 else ''} per visitor at {jail.name} "
+            f"has already been reached for {keys[1]['period_start']:%B %Y}. Please choose a date in a later month."
+        )
+    return None
+
+def aggregate_quota_counters(visits):
+    """Grouped aggregation of a Visit queryset into VisitQuotaCounter rows (unsaved)"""
+    counted = visits.filter(status__in=COUNTED_STATUSES).order_by()
+    groupings = [
+        (VisitQuotaCounter.PRISONER_WEEK, 'prisoner_id', TruncWeek('visit_date')),
+        (VisitQuotaCounter.VISITOR_MONTH, 'visitor_id', TruncMonth('visit_date')),
+    ]
+    for scope, subject, period in groupings:
+        rows = (
+            counted.annotate(period_start=period)
+            .values(subject, 'prisoner__jail_id', 'period_start')
+            .annotate(visits=Count('id'))
+        )
+        for row in rows:
+            yield VisitQuotaCounter(
+                scope=scope,
+                subject_id=row[subject],
+                jail_id=row['prisoner__jail_id'],
+                period_start=row['period_start'],
+                visits=row['visits'],
+            )
@@ -0,0 +1,111 @@
+# visitor_management/reports.py
+
+import numpy as np
+
+from .snapshot import MISSING, STATUS_VALUES
+
+def month_labels(months):
+    """Months since 1970-01 -> 'YYYY-MM' strings"""
+    return np.datetime_as_string(np.asarray(months).astype('datetime64[M]'), unit='M')
+
+def distinct(values):
+    """Sorted distinct values; sort + diff, which is much faster than np.unique here"""
+    values = np.sort(values)
+    if not len(values):
+        return values
+    first = np.empty(len(values), dtype=bool)
+    first[0] = True
+    np.not_equal(values[1:], values[:-1], out=first[1:])
+    return values[first]
+
+def _group_sums(keys, size, mask=None, weights=None):
+    if mask is not None:
+        keys = keys[mask]
+        weights = weights[mask] if weights is not None else None
+    return np.bincount(keys, weights=weights, minlength=size)
+
+def monthly_metrics(snapshot, jail=None):
+    """
+    Standard monthly report per jail from a snapshot (see snapshot.py), fully
+    vectorized: every figure is one np.bincount over a (month, jail) group key,
+    so tens of millions of visits take seconds.
+
+    Returns a list of dicts ordered by month then jail name. no_shows counts
+    NO_SHOW visits plus approved visits on dates before the snapshot that
+    were never checked in (not yet expired).
+    """
+    jail_names = snapshot['jails.name']
+    dates = snapshot['visits.date'].astype(np.int64)
+    jails = snapshot['visits.jail'].astype(np.int64)
+    if jail is not None:
+        matches = np.flatnonzero(jail_names == jail)
+        if not len(matches):
+            raise ValueError(f"No jail named {jail!r} in this snapshot")
+        selected = jails == matches[0]
+        dates, jails = dates[selected], jails[selected]
+    else:
+        selected = slice(None)
+    if not len(dates):
+        return []
+
+    status = snapshot['visits.status'][selected]
+    visit_type = snapshot['visits.visit_type'][selected]
+    slot = snapshot['visits.slot'][selected].astype(np.int64)
+    visitor = snapshot['visits.visitor'][selected].astype(np.int64)
+    check_in = snapshot['visits.check_in'][selected]
+    check_out = snapshot['visits.check_out'][selected]
+
+    months = dates.astype('datetime64[D]').astype('datetime64[M]').astype(np.int64)
+    first_month = months.min()
+    jail_count = len(jail_names)
+    keys = (months - first_month) * jail_count + jails
+    size = int(keys.max()) + 1
+
+    totals = _group_sums(keys, size)
+    by_status = {
+        value: _group_sums(keys, size, status == code)
+        for code, value in enumerate(STATUS_VALUES)
+    }
+    emergency_code = list(snapshot['visit_type_values']).index('EMERGENCY')
+    emergency = _group_sums(keys, size, visit_type == emergency_code)
+
+    checked_in = check_in != MISSING
+    snapshot_day = int(snapshot['created_at']) // 86400
+    no_show_mask = (
+        ((status == STATUS_VALUES.index('APPROVED')) & ~checked_in & (dates < snapshot_day))
+        | (status == STATUS_VALUES.index('NO_SHOW'))
+    )
+    no_shows = _group_sums(keys, size, no_show_mask)
+    attended = _group_sums(keys, size, checked_in)
+
+    stayed = checked_in & (check_out != MISSING)
+    minutes = _group_sums(keys, size, stayed, (check_out - check_in) / 60)
+    stays = _group_sums(keys, size, stayed)
+
+    # Distinct visitors: distinct (group, visitor) pairs, counted per group
+    visitor_span = int(visitor.max()) + 1
+    pairs = distinct(keys * visitor_span + visitor)
+    unique_visitors = np.bincount(pairs // visitor_span, minlength=size)
+
+    slot_count = max(len(snapshot['slot_values']), 1)
+    busiest_slot = np.bincount(keys * slot_count + slot, minlength=size * slot_count).reshape(size, slot_count).argmax(axis=1)
+
+    groups = np.flatnonzero(totals)
+    labels = month_labels(groups // jail_count + first_month)
+    report = []
+    for group, label in zip(groups, labels):
+        expected = no_shows[group] + attended[group]
+        report.append({
+            'month': str(label),
+            'jail': str(jail_names[group % jail_count]),
+            'visits': int(totals[group]),
+            **{status_value.lower(): int(counts[group]) for status_value, counts in by_status.items()},
+            'emergency': int(emergency[group]),
+            'unique_visitors': int(unique_visitors[group]),
+            'no_shows': int(no_shows[group]),
+            'no_show_rate': round(float(100 * no_shows[group] / expected), 1) if expected else None,
+            'average_minutes_inside': round(float(minutes[group] / stays[group]), 1) if stays[group] else None,
+            'busiest_slot': str(snapshot['slot_values'][busiest_slot[group]]) if len(snapshot['slot_values']) else None,
+        })
+    report.sort(key=lambda row: (row['month'], row['jail']))
+    return report
@@ -0,0 +1,128 @@
+# visitor_management/search.py
+
+import re
+
+from django.db import connection, transaction
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+# SQLite FTS5 index per alert table, kept current by triggers (see migration 0017).
+# SQLite rejects rebuilding a table that another table's trigger refers to, so
+# the triggers are dropped before `migrate` and reinstalled after it (apps.py).
+SEARCH_TABLES = {
+    'visitor_management_emergencyalert': 'visitor_management_alert_search',
+    'visitor_management_archivedemergencyalert': 'visitor_management_archived_alert_search',
+}
+USER_TABLE = 'accounts_user'
+SEARCH_TERMS = re.compile(r'\w+', re.UNICODE)
+
+def _reporter_sql(user_id):
+    return (
+        f"COALESCE((SELECT username || ' ' || first_name || ' ' || last_name || ' ' || COALESCE(full_name, '') "
+        f"FROM {USER_TABLE} WHERE id = {user_id}), '')"
+    )
+
+def trigger_names(fts):
+    return [f"{fts}_{name}" for name in ('insert', 'delete', 'update', 'reporter')]
+
+def search_trigger_sql(table, fts):
+    """Triggers keeping `fts` in step with `table` and with reporters' names"""
+    insert = (
+        f"INSERT INTO {fts}(rowid, message, reason, location, reporter) "
+        f"SELECT new.id, new.message, new.reason, new.location, {_reporter_sql('new.issued_by_id')};"
+    )
+    return [
+        f"CREATE TRIGGER {fts}_insert AFTER INSERT ON {table} BEGIN {insert} END",
+        f"CREATE TRIGGER {fts}_delete AFTER DELETE ON {table} BEGIN DELETE FROM {fts} WHERE rowid = old.id; END",
+        f"CREATE TRIGGER {fts}_update AFTER UPDATE OF message, reason, location, issued_by_id ON {table} "
+        f"BEGIN DELETE FROM {fts} WHERE rowid = old.id; {insert} END",
+        # Renaming a user re-indexes the alerts they issued
+        f"CREATE TRIGGER {fts}_reporter AFTER UPDATE OF username, first_name, last_name, full_name ON {USER_TABLE} "
+        f"BEGIN UPDATE {fts} SET reporter = {_reporter_sql('new.id')} "
+        f"WHERE rowid IN (SELECT id FROM {table} WHERE issued_by_id = new.id); END",
+    ]
+
+def drop_trigger_sql(fts):
+    return [f"DROP TRIGGER IF EXISTS {name}" for name in trigger_names(fts)]
+
+def fill_sql(table, fts):
+    """Replace the index contents with the current rows of `table`"""
+    return [
+        f"DELETE FROM {fts}",
+        f"INSERT INTO {fts}(rowid, message, reason, location, reporter) "
+        f"SELECT id, message, reason, location, {_reporter_sql('issued_by_id')} FROM {table}",
+    ]
+
+def search_index_sql(table, fts):
+    """
+    Statements creating `fts` over `table`'s alert text and reporter names.
+    The triggers (and the fill) come from install_search_triggers() once
+    `migrate` finishes, so later migrations in the same run can still
+    rebuild the tables.
+    """
+    return [
+        f"CREATE VIRTUAL TABLE {fts} USING fts5(message, reason, location, reporter, tokenize='unicode61 remove_diacritics 2')",
+    ]
+
+def drop_search_index_sql(table, fts):
+    return drop_trigger_sql(fts) + [f"DROP TABLE IF EXISTS {fts}"]
+
+def _existing(connection, kind):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = %s", [kind])
+        return {name for name, in cursor.fetchall()}
+
+def installed_search_tables(connection):
+    """Search tables present in the database (none before migration 0017, or off SQLite)"""
+    if connection.vendor != 'sqlite':
+        return {}
+    tables = _existing(connection, 'table')
+    return {table: fts for table, fts in SEARCH_TABLES.items() if fts in tables and table in tables}
+
+def missing_search_triggers(connection):
+    triggers = _existing(connection, 'trigger')
+    return [
+        name for fts in installed_search_tables(connection).values()
+        for name in trigger_names(fts) if name not in triggers
+    ]
+
+def drop_search_triggers(connection):
+    with connection.cursor() as cursor:
+        for fts in SEARCH_TABLES.values():
+            for statement in drop_trigger_sql(fts):
+                cursor.execute(statement)
+
+def install_search_triggers(connection):
+    """(Re)create the triggers and refill every installed index; returns {fts table: rows indexed}"""
+    counts = {}
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        for table, fts in installed_search_tables(connection).items():
+            for statement in drop_trigger_sql(fts) + search_trigger_sql(table, fts) + fill_sql(table, fts):
+                cursor.execute(statement)
+            cursor.execute(f"SELECT COUNT(*) FROM {fts}")
+            counts[fts] = cursor.fetchone()[0]
+    return counts
+
+def fts_query(text):
+    """Search box text -> FTS5 query: every word must match as a word prefix"""
+    return ' '.join(f'"{term}"*' for term in SEARCH_TERMS.findall(text))
+
+def search_alerts(alerts, text):
+    """
+    Filter an EmergencyAlert or ArchivedEmergencyAlert queryset to alerts
+    whose text or reporter matches `text`. Uses the FTS5 index on SQLite and
+    falls back to substring matches on other databases.
+    """
+    fts = SEARCH_TABLES.get(alerts.model._meta.db_table)
+    if fts and connection.vendor == 'sqlite':
+        query = fts_query(text)
+        if not query:
+            return alerts
+        return alerts.filter(id__in=RawSQL(f"SELECT rowid FROM {fts} WHERE {fts} MATCH %s", [query]))
+    return alerts.filter(
+        Q(message__icontains=text) |
+        Q(reason__icontains=text) |
+        Q(issued_by__username__icontains=text) |
+        Q(issued_by__first_name__icontains=text) |
+        Q(issued_by__last_name__icontains=text)
+    )
@@ -0,0 +1,161 @@
+# visitor_management/snapshot.py
+
+from array import array
+from datetime import date
+
+import numpy as np
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from accounts.models import User
+from prison_core.models import Jail, Prisoner
+from .models import ArchivedVisit, Visit
+
+SNAPSHOT_VERSION = 1
+SNAPSHOT_CHUNK_SIZE = 5000
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+MISSING = -1
+
+STATUS_VALUES = [value for value, _ in Visit.STATUS_CHOICES]
+VISIT_TYPE_VALUES = [value for value, _ in Visit.VISIT_TYPE_CHOICES]
+ROLE_VALUES = [value for value, _ in User.ROLE_CHOICES]
+RELATIONSHIP_VALUES = [''] + [value for value, _ in User.RELATIONSHIP_CHOICES]
+
+def to_days(value):
+    """Date -> days since 1970-01-01 (MISSING for None)"""
+    return MISSING if value is None else value.toordinal() - EPOCH_ORDINAL
+
+def from_days(days):
+    """Days since 1970-01-01 -> date"""
+    return date.fromordinal(int(days) + EPOCH_ORDINAL)
+
+def to_seconds(value):
+    """Aware datetime -> Unix seconds (MISSING for None)"""
+    return MISSING if value is None else int(value.timestamp())
+
+def encode(values, value):
+    """Dictionary-encode: index of value in values, appending unseen values"""
+    try:
+        return values.index(value)
+    except ValueError:
+        values.append(value)
+        return len(values) - 1
+
+def read_columns(queryset, fields, typecodes, convert=None):
+    """
+    Stream a values_list() in chunks into typed array.array buffers (one per
+    column), so memory grows by the column width only, never by model rows.
+    """
+    columns = [array(typecode) for typecode in typecodes]
+    rows = queryset.order_by('pk').values_list(*fields).iterator(chunk_size=SNAPSHOT_CHUNK_SIZE)
+    for row in rows:
+        if convert:
+            row = convert(row)
+        for column, value in zip(columns, row):
+            column.append(value)
+    return [np.frombuffer(column, dtype=column.typecode) if len(column) else np.array([], dtype=column.typecode) for column in columns]
+
+def build_snapshot():
+    """
+    Columnar copy of jails, prisoners, anonymized users and visits (live and
+    archived) as a dict of NumPy arrays. Dates are int32 days since 1970,
+    timestamps int64 Unix seconds, missing values -1. Status, type, slot, role and relationship are
+    small integer codes into the matching *_values arrays. Users are referred
+    to by their row in the users table only; no names, contact details,
+    Aadhar numbers or database ids are written.
+    """
+    # Visits first: every jail, prisoner and user they refer to already exists
+    slot_values = []
+
+    def visit_columns(queryset, jail_field):
+        return read_columns(
+            queryset,
+            ['id', 'visitor_id', 'prisoner_id', jail_field, 'visit_date', 'status', 'visit_type',
+             'visit_time_slot', 'check_in_time', 'check_out_time'],
+            ['q', 'q', 'q', 'q', 'i', 'B', 'B', 'H', 'q', 'q'],
+            lambda row: (
+                row[0], row[1], row[2], row[3], to_days(row[4]),
+                encode(STATUS_VALUES, row[5]), encode(VISIT_TYPE_VALUES, row[6]), encode(slot_values, row[7]),
+                to_seconds(row[8]), to_seconds(row[9]),
+            ),
+        )
+
+    # Archived visits too, except those whose visitor or prisoner has since been deleted
+    archived = ArchivedVisit.objects.filter(
+        Exists(User.objects.filter(pk=OuterRef('visitor_id'))),
+        Exists(Prisoner.objects.filter(pk=OuterRef('prisoner_id'))),
+    )
+    columns = [
+        np.concatenate([live, old])
+        for live, old in zip(visit_columns(Visit.objects.all(), 'prisoner__jail_id'), visit_columns(archived, 'jail_id'))
+    ]
+    visit_ids, visitor_ids, visit_prisoners, visit_jail_ids, visit_dates, statuses, types, slots, check_in, check_out = columns
+
+    jail_ids, = read_columns(Jail.objects.all(), ['id'], ['q'])
+    jail_rows = list(Jail.objects.order_by('pk').values_list('name', 'location'))
+
+    prisoner_ids, prisoner_jails, prisoner_birth_years = read_columns(
+        Prisoner.objects.all(), ['id', 'jail_id', 'date_of_birth'], ['q', 'q', 'h'],
+        lambda row: (row[0], row[1], row[2].year if row[2] else MISSING),
+    )
+
+    blacklisted = set(User.objects.filter(blacklist__isnull=False).values_list('id', flat=True))
+    user_ids, roles, family, relationships, has_prisoner, joined, user_blacklisted = read_columns(
+        User.objects.all(),
+        ['id', 'role', 'is_family_member', 'relationship_to_prisoner', 'related_prisoner_id', 'date_joined'],
+        ['q', 'B', 'B', 'B', 'B', 'i', 'B'],
+        lambda row: (
+            row[0], encode(ROLE_VALUES, row[1]), int(row[2]), encode(RELATIONSHIP_VALUES, row[3] or ''),
+            int(row[4] is not None), to_days(timezone.localtime(row[5]).date()), int(row[0] in blacklisted),
+        ),
+    )
+
+    return {
+        'version': np.array(SNAPSHOT_VERSION),
+        'created_at': np.array(to_seconds(timezone.now())),
+        'status_values': np.array(STATUS_VALUES),
+        'visit_type_values': np.array(VISIT_TYPE_VALUES),
+        'slot_values': np.array(slot_values, dtype=str),
+        'role_values': np.array(ROLE_VALUES),
+        'relationship_values': np.array(RELATIONSHIP_VALUES),
+
+        'jails.id': jail_ids,
+        'jails.name': np.array([name for name, _ in jail_rows], dtype=str),
+        'jails.location': np.array([location for _, location in jail_rows], dtype=str),
+
+        'prisoners.id': prisoner_ids,
+        'prisoners.jail': np.searchsorted(jail_ids, prisoner_jails).astype(np.int32),
+        'prisoners.birth_year': prisoner_birth_years,
+
+        'users.role': roles,
+        'users.is_family_member': family.astype(bool),
+        'users.relationship': relationships,
+        'users.has_related_prisoner': has_prisoner.astype(bool),
+        'users.joined': joined,
+        'users.is_blacklisted': user_blacklisted.astype(bool),
+
+        'visits.id': visit_ids,
+        'visits.visitor': np.searchsorted(user_ids, visitor_ids).astype(np.int32),
+        'visits.prisoner': np.searchsorted(prisoner_ids, visit_prisoners).astype(np.int32),
+        'visits.jail': np.searchsorted(jail_ids, visit_jail_ids).astype(np.int32),
+        'visits.date': visit_dates,
+        'visits.status': statuses,
+        'visits.visit_type': types,
+        'visits.slot': slots,
+        'visits.check_in': check_in,
+        'visits.check_out': check_out,
+    }
+
+def write_snapshot(path):
+    """Build a snapshot and save it as a compressed .npz; returns the arrays"""
+    arrays = build_snapshot()
+    np.savez_compressed(path, **arrays)
+    return arrays
+
+def load_snapshot(path):
+    """Load a snapshot written by write_snapshot into a plain dict of arrays"""
+    with np.load(path, allow_pickle=False) as data:
+        arrays = {name: data[name] for name in data.files}
+    if int(arrays['version']) != SNAPSHOT_VERSION:
+        raise ValueError(f"Unsupported snapshot version {int(arrays['version'])}")
+    return arrays
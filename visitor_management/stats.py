@@ -0,0 +1,181 @@
+# visitor_management/stats.py
+
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+
+from .models import DailyVisitStats, Visit
+
+STATUS_COUNTERS = {
+    'PENDING': 'pending',
+    'APPROVED': 'approved',
+    'REJECTED': 'rejected',
+    'COMPLETED': 'completed',
+    'CANCELLED': 'cancelled',
+    'EXPIRED': 'expired',
+    'NO_SHOW': 'no_show',
+}
+COUNTERS = [
+    'total', *STATUS_COUNTERS.values(), 'emergency', 'checked_in', 'checked_out',
+    'awaiting_check_in', 'seconds_inside',
+]
+
+# Fields a transition changes besides status, and their value beforehand
+PREVIOUS_STATE = {
+    'CHECKED_IN': {'check_in_time': None},
+    'CHECKED_OUT': {'check_out_time': None},
+}
+
+def contribution(status, visit_type, check_in_time, check_out_time):
+    """The counters one visit adds to its (jail, date, slot) row"""
+    values = dict.fromkeys(COUNTERS, 0)
+    values['total'] = 1
+    if status in STATUS_COUNTERS:
+        values[STATUS_COUNTERS[status]] = 1
+    values['emergency'] = int(visit_type == 'EMERGENCY')
+    values['checked_in'] = int(check_in_time is not None)
+    values['awaiting_check_in'] = int(status == 'APPROVED' and check_in_time is None)
+    if check_in_time is not None and check_out_time is not None:
+        values['checked_out'] = 1
+        values['seconds_inside'] = max(int((check_out_time - check_in_time).total_seconds()), 0)
+    return values
+
+def _state(visit, **overrides):
+    state = {
+        'status': visit.status,
+        'visit_type': visit.visit_type,
+        'check_in_time': visit.check_in_time,
+        'check_out_time': visit.check_out_time,
+    }
+    state.update(overrides)
+    return state
+
+def apply_visit_transition(visit, event_type, from_status=''):
+    """
+    Move a visit's contribution in the rollup from its state before
+    `event_type` to its current state. Call inside the transaction that saved it.
+    """
+    after = contribution(**_state(visit))
+    if event_type == 'REQUESTED':
+        delta = after
+    else:
+        before = contribution(**_state(visit, status=from_status or visit.status, **PREVIOUS_STATE.get(event_type, {})))
+        delta = {name: after[name] - before[name] for name in COUNTERS}
+    visit_date = Visit._meta.get_field('visit_date').to_python(visit.visit_date)
+    _apply_deltas({(visit.prisoner.jail_id, visit_date, visit.visit_time_slot): delta})
+
+def apply_status_changes(visits, to_status):
+    """
+    Bulk form of apply_visit_transition for visits whose status alone changed.
+    `visits` are dicts with prisoner__jail_id, visit_date, visit_time_slot,
+    status (before), visit_type, check_in_time and check_out_time; one UPDATE
+    is issued per affected rollup row.
+    """
+    deltas = defaultdict(lambda: dict.fromkeys(COUNTERS, 0))
+    for visit in visits:
+        state = {name: visit[name] for name in ('status', 'visit_type', 'check_in_time', 'check_out_time')}
+        before = contribution(**state)
+        after = contribution(**{**state, 'status': to_status})
+        delta = deltas[(visit['prisoner__jail_id'], visit['visit_date'], visit['visit_time_slot'])]
+        for name in COUNTERS:
+            delta[name] += after[name] - before[name]
+    _apply_deltas(deltas)
+
+def _apply_deltas(deltas):
+    """Add {(jail_id, date, time_slot): {counter: change}} to the rollup rows"""
+    with transaction.atomic():
+        for (jail_id, visit_date, time_slot), delta in deltas.items():
+            delta = {name: value for name, value in delta.items() if value}
+            if not delta:
+                continue
+            row, _ = DailyVisitStats.objects.get_or_create(jail_id=jail_id, date=visit_date, time_slot=time_slot)
+            DailyVisitStats.objects.filter(pk=row.pk).update(
+                **{name: F(name) + value for name, value in delta.items()}
+            )
+
+def aggregate_visits(visits, jail_field='prisoner__jail_id'):
+    """
+    Grouped aggregation of a Visit (or ArchivedVisit, with jail_field='jail_id')
+    queryset into DailyVisitStats rows (unsaved)
+    """
+    rows = (
+        visits.values(jail_field, 'visit_date', 'visit_time_slot')
+        .order_by()
+        .annotate(
+            total=Count('id'),
+            **{counter: Count('id', filter=Q(status=status)) for status, counter in STATUS_COUNTERS.items()},
+            emergency=Count('id', filter=Q(visit_type='EMERGENCY')),
+            checked_in=Count('id', filter=Q(check_in_time__isnull=False)),
+            checked_out=Count('id', filter=Q(check_in_time__isnull=False, check_out_time__isnull=False)),
+            awaiting_check_in=Count('id', filter=Q(status='APPROVED', check_in_time__isnull=True)),
+            time_inside=Sum(
+                F('check_out_time') - F('check_in_time'),
+                filter=Q(check_in_time__isnull=False, check_out_time__isnull=False),
+            ),
+        )
+    )
+    for row in rows:
+        time_inside = row.pop('time_inside')
+        yield DailyVisitStats(
+            jail_id=row.pop(jail_field),
+            date=row.pop('visit_date'),
+            time_slot=row.pop('visit_time_slot'),
+            seconds_inside=max(int(time_inside.total_seconds()), 0) if time_inside else 0,
+            **row,
+        )
+
+def merge_stats(*row_sets):
+    """Sum DailyVisitStats rows from several aggregations that share a (jail, date, slot)"""
+    merged = {}
+    for rows in row_sets:
+        for row in rows:
+            key = (row.jail_id, row.date, row.time_slot)
+            if key not in merged:
+                merged[key] = row
+            else:
+                for name in COUNTERS:
+                    setattr(merged[key], name, getattr(merged[key], name) + getattr(row, name))
+    return list(merged.values())
+
+def jail_trends(jail, days=30):
+    """
+    Per-day, per-slot and overall figures for a jail's last `days` visit
+    dates (including today), read from the rollup only.
+    """
+    today = timezone.now().date()
+    start = today - timedelta(days=days - 1)
+    rows = DailyVisitStats.objects.filter(jail=jail, date__range=(start, today))
+
+    by_day = {start + timedelta(days=offset): dict.fromkeys(COUNTERS, 0) for offset in range(days)}
+    by_slot = defaultdict(lambda: dict.fromkeys(COUNTERS, 0))
+    totals = dict.fromkeys(COUNTERS, 0)
+    past_no_shows = past_approved = 0
+    for row in rows.values('date', 'time_slot', *COUNTERS):
+        for name in COUNTERS:
+            by_day[row['date']][name] += row[name]
+            by_slot[row['time_slot']][name] += row[name]
+            totals[name] += row[name]
+        if row['date'] < today:
+            past_no_shows += row['awaiting_check_in'] + row['no_show']
+            past_approved += row['awaiting_check_in'] + row['no_show'] + row['checked_in']
+
+    peak_day = max([day['total'] for day in by_day.values()] + [1])
+    peak_slot = max([slot['total'] for slot in by_slot.values()] + [1])
+    return {
+        'days': [
+            {'date': date, **values, 'percent': round(100 * values['total'] / peak_day)}
+            for date, values in by_day.items()
+        ],
+        'slots': [
+            {'time_slot': slot, **values, 'percent': round(100 * values['total'] / peak_slot)}
+            for slot, values in sorted(by_slot.items())
+        ],
+        'totals': totals,
+        'no_show_rate': round(100 * past_no_shows / past_approved, 1) if past_approved else None,
+        'average_minutes_inside': (
+            round(totals['seconds_inside'] / totals['checked_out'] / 60) if totals['checked_out'] else None
+        ),
+    }
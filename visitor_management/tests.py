@@ -1,3 +1,620 @@
-from django.test import TestCase
+import csv
+import io
+import os
+import random
+import tempfile
+import zipfile
+from datetime import date, datetime, time, timedelta
 
-# Create your tests here.
+import numpy as np
+from django.core import mail
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import User
+from prison_core.models import Jail, Prisoner
+from .alerts import (
+    ALERT_COALESCE_SECONDS, ALERT_UPDATE_SECONDS, report_emergency, send_alert_update, send_due_alert_updates,
+    set_alert_active,
+)
+from .archive import archive_visits
+from .emergency import DEFAULT_EMERGENCY_TAXONOMY, GENERAL_EMERGENCY, EmergencyClassifier
+from .events import STATUS_CHANGE_FIELDS, VISIT_EVENT_SEQUENCE, next_sequence, record_status_changes, record_visit_event
+from .expiry import expire_stale_visits
+from .exports import EXPORT_COLUMNS, export_all_rows
+from .forecast import HORIZON_WEEKS, fit_forecasts, upcoming_forecast
+from .models import (
+    ArchivedVisit, DailyVisitStats, EmergencyAlert, EmergencyAlertReport, EventSequence, GateForecast, Visit,
+    VisitEvent, VisitQuotaCounter,
+)
+from .quotas import aggregate_quota_counters, quota_error
+from .reports import monthly_metrics
+from .snapshot import SNAPSHOT_VERSION, load_snapshot, write_snapshot
+from .stats import COUNTERS, aggregate_visits, merge_stats
+
+SLOT = '10:00 AM - 11:00 AM'
+
+def make_jail(name='District Jail', **quotas):
+    return Jail.objects.create(name=name, location='Thiruvananthapuram', **quotas)
+
+def make_prisoner(jail, prisoner_id):
+    return Prisoner.objects.create(
+        jail=jail, prisoner_id=prisoner_id, first_name='Prisoner', last_name=prisoner_id, date_of_birth=date(1990, 1, 1)
+    )
+
+def make_user(username, role='visitor', jail=None):
+    return User.objects.create(username=username, role=role, jail=jail)
+
+def request_visit(visitor, prisoner, visit_date, visit_type='REGULAR'):
+    """Create a PENDING visit the way book_visit does"""
+    with transaction.atomic():
+        visit = Visit.objects.create(
+            visitor=visitor, prisoner=prisoner, visit_date=visit_date, visit_time_slot=SLOT, visit_type=visit_type
+        )
+        record_visit_event(visit, 'REQUESTED', actor=visitor)
+    return visit
+
+def move_visit(visit, status, event_type=None, **fields):
+    """Save a status change together with its event, as the views do"""
+    with transaction.atomic():
+        previous_status = visit.status
+        visit.status = status
+        for name, value in fields.items():
+            setattr(visit, name, value)
+        visit.save()
+        record_visit_event(visit, event_type or status, from_status=previous_status)
+    return visit
+
+class VisitEventSequenceTests(TestCase):
+    def setUp(self):
+        self.jail = make_jail()
+        self.prisoner = make_prisoner(self.jail, 'P1')
+        self.visitor = make_user('visitor1')
+
+    def test_single_and_bulk_events_share_one_gapless_sequence(self):
+        visits = [request_visit(self.visitor, self.prisoner, date(2030, 1, day)) for day in (1, 2, 3)]
+        move_visit(visits[0], 'APPROVED')
+        with transaction.atomic():
+            rows = list(Visit.objects.filter(id__in=[visits[1].id, visits[2].id]).order_by('id').values(*STATUS_CHANGE_FIELDS))
+            Visit.objects.filter(id__in=[row['id'] for row in rows]).update(status='CANCELLED')
+            record_status_changes(rows, 'CANCELLED', 'CANCELLED')
+
+        events = list(VisitEvent.objects.order_by('sequence').values_list('sequence', 'visit_id', 'event_type'))
+        self.assertEqual([sequence for sequence, _, _ in events], [1, 2, 3, 4, 5, 6])
+        self.assertEqual(events[3], (4, visits[0].id, 'APPROVED'))
+        self.assertEqual([row[1:] for row in events[4:]], [(visits[1].id, 'CANCELLED'), (visits[2].id, 'CANCELLED')])
+        self.assertEqual(EventSequence.objects.get(name=VISIT_EVENT_SEQUENCE).value, 6)
+
+    def test_event_records_transition(self):
+        visit = request_visit(self.visitor, self.prisoner, date(2030, 1, 1))
+        move_visit(visit, 'APPROVED')
+        event = VisitEvent.objects.latest('sequence')
+        self.assertEqual((event.from_status, event.to_status), ('PENDING', 'APPROVED'))
+        self.assertEqual((event.visitor_id, event.jail_id), (self.visitor.id, self.jail.id))
+
+    def test_rolled_back_numbers_are_handed_out_again(self):
+        self.assertEqual(next_sequence('test'), 1)
+        try:
+            with transaction.atomic():
+                self.assertEqual(next_sequence('test', 5), 6)
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        self.assertEqual(next_sequence('test'), 2)
+
+    def test_event_feed_resumes_after_cursor(self):
+        visit = request_visit(self.visitor, self.prisoner, date(2030, 1, 1))
+        self.client.force_login(self.visitor)
+        first = self.client.get(reverse('api_visit_events')).json()
+        self.assertEqual([row['type'] for row in first['results']], ['REQUESTED'])
+
+        move_visit(visit, 'CANCELLED')
+        second = self.client.get(reverse('api_visit_events'), {'cursor': first['cursor']}).json()
+        self.assertEqual([(row['type'], row['from_status']) for row in second['results']], [('CANCELLED', 'PENDING')])
+
+class MyVisitsJsonTests(TestCase):
+    def setUp(self):
+        self.jail = make_jail()
+        self.prisoner = make_prisoner(self.jail, 'P1')
+        self.visitor = make_user('visitor1')
+        self.client.force_login(self.visitor)
+
+    def get(self, **params):
+        response = self.client.get(reverse('my_visits_json'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_history_pages_are_stable_across_equal_dates(self):
+        visits = [request_visit(self.visitor, self.prisoner, date(2030, 1, 1 + index // 3)) for index in range(7)]
+        request_visit(make_user('visitor2'), self.prisoner, date(2030, 1, 1))
+        seen, data = [], self.get(limit=2)
+        while True:
+            seen.extend(row['id'] for row in data['results'])
+            if not data['next_cursor']:
+                break
+            data = self.get(limit=2, cursor=data['next_cursor'])
+        expected = sorted(visits, key=lambda visit: (visit.visit_date, visit.id), reverse=True)
+        self.assertEqual(seen, [visit.id for visit in expected])
+
+    def test_since_returns_each_change_once(self):
+        visits = [request_visit(self.visitor, self.prisoner, date(2030, 1, day)) for day in (1, 2, 3)]
+        since = self.get()['since']
+        self.assertEqual(self.get(since=since)['results'], [])
+
+        move_visit(visits[0], 'APPROVED')
+        move_visit(visits[1], 'CANCELLED')
+        move_visit(request_visit(make_user('visitor2'), self.prisoner, date(2030, 1, 1)), 'APPROVED')
+        move_visit(visits[2], 'APPROVED')
+        move_visit(visits[0], 'APPROVED', 'CHECKED_IN', check_in_time=timezone.now())
+
+        pages = []
+        while True:
+            data = self.get(since=since, limit=2)
+            pages.append([(row['id'], row['status']) for row in data['results']])
+            since = data['since']
+            if not data['has_more']:
+                break
+        self.assertEqual(pages, [
+            [(visits[0].id, 'APPROVED'), (visits[1].id, 'CANCELLED')],
+            [(visits[2].id, 'APPROVED'), (visits[0].id, 'APPROVED')],
+        ])
+        self.assertEqual(self.get(since=since)['results'], [])
+
+    def test_bad_since_is_rejected(self):
+        self.assertEqual(self.client.get(reverse('my_visits_json'), {'since': 'garbage'}).status_code, 400)
+
+def counter_values():
+    return {
+        (row.scope, row.subject_id, row.jail_id, row.period_start): row.visits
+        for row in VisitQuotaCounter.objects.filter(visits__gt=0)
+    }
+
+class VisitQuotaTests(TestCase):
+    def setUp(self):
+        self.jail = make_jail(weekly_visits_per_prisoner=1, monthly_visits_per_visitor=3)
+        self.prisoner = make_prisoner(self.jail, 'P1')
+        self.visitor = make_user('visitor1')
+        self.admin = make_user('admin1', role='admin', jail=self.jail)
+        # 2030-01-07 is a Monday
+        self.monday = date(2030, 1, 7)
+
+    def test_counters_follow_transitions(self):
+        visit = request_visit(self.visitor, self.prisoner, self.monday)
+        self.assertEqual(counter_values(), {})
+        move_visit(visit, 'APPROVED')
+        self.assertEqual(counter_values(), {
+            (VisitQuotaCounter.PRISONER_WEEK, self.prisoner.id, self.jail.id, self.monday): 1,
+            (VisitQuotaCounter.VISITOR_MONTH, self.visitor.id, self.jail.id, date(2030, 1, 1)): 1,
+        })
+        move_visit(visit, 'NO_SHOW')
+        self.assertEqual(sum(counter_values().values()), 2)
+        move_visit(visit, 'CANCELLED')
+        self.assertEqual(counter_values(), {})
+
+    def test_counters_match_rebuild(self):
+        visits = [request_visit(self.visitor, self.prisoner, self.monday + timedelta(days=offset)) for offset in (0, 3, 8, 30)]
+        move_visit(visits[0], 'APPROVED')
+        move_visit(visits[1], 'REJECTED')
+        move_visit(visits[2], 'APPROVED')
+        move_visit(visits[2], 'COMPLETED')
+        move_visit(visits[3], 'APPROVED')
+        rebuilt = {
+            (row.scope, row.subject_id, row.jail_id, row.period_start): row.visits
+            for row in aggregate_quota_counters(Visit.objects.all())
+        }
+        self.assertEqual(counter_values(), rebuilt)
+
+    def test_quota_error(self):
+        move_visit(request_visit(self.visitor, self.prisoner, self.monday), 'APPROVED')
+        same_week = request_visit(make_user('visitor2'), self.prisoner, self.monday + timedelta(days=6))
+        next_week = request_visit(make_user('visitor3'), self.prisoner, self.monday + timedelta(days=7))
+        emergency = request_visit(make_user('visitor4'), self.prisoner, self.monday + timedelta(days=1), 'EMERGENCY')
+
+        self.assertIn('weekly limit', quota_error(same_week))
+        self.assertIsNone(quota_error(next_week))
+        self.assertIsNone(quota_error(emergency))
+        with transaction.atomic():
+            self.assertIn('weekly limit', quota_error(same_week, lock=True))
+
+    def test_decide_visit_checks_quota_and_only_decides_pending(self):
+        first = request_visit(self.visitor, self.prisoner, self.monday)
+        second = request_visit(make_user('visitor2'), self.prisoner, self.monday + timedelta(days=2))
+        self.client.force_login(self.admin)
+
+        self.client.get(reverse('decide_visit', args=[first.id, 'approve']))
+        self.client.get(reverse('decide_visit', args=[second.id, 'approve']))
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual((first.status, second.status), ('APPROVED', 'PENDING'))
+
+        # A visit that is no longer pending cannot be decided again
+        self.client.get(reverse('decide_visit', args=[first.id, 'reject']))
+        first.refresh_from_db()
+        self.assertEqual(first.status, 'APPROVED')
+        self.assertEqual(sum(counter_values().values()), 2)
+
+def stats_values(rows):
+    return {
+        (row.jail_id, row.date, row.time_slot): tuple(getattr(row, name) for name in COUNTERS)
+        for row in rows
+    }
+
+class VisitExpiryTests(TestCase):
+    def setUp(self):
+        self.jail = make_jail()
+        self.prisoner = make_prisoner(self.jail, 'P1')
+        self.visitor = make_user('visitor1')
+        self.today = date(2030, 3, 10)
+        past = self.today - timedelta(days=1)
+        self.pending = request_visit(self.visitor, self.prisoner, past)
+        self.approved = move_visit(request_visit(self.visitor, self.prisoner, past), 'APPROVED')
+        self.checked_in = move_visit(request_visit(self.visitor, self.prisoner, past), 'APPROVED')
+        move_visit(self.checked_in, 'APPROVED', 'CHECKED_IN', check_in_time=timezone.now())
+        self.upcoming = request_visit(self.visitor, self.prisoner, self.today)
+
+    def statuses(self):
+        return {
+            name: Visit.objects.get(pk=getattr(self, name).pk).status
+            for name in ('pending', 'approved', 'checked_in', 'upcoming')
+        }
+
+    def test_dry_run_changes_nothing(self):
+        before = self.statuses()
+        self.assertEqual(expire_stale_visits(self.today, dry_run=True), {'EXPIRED': 1, 'NO_SHOW': 1})
+        self.assertEqual(self.statuses(), before)
+
+    def test_expires_pending_and_marks_no_shows(self):
+        self.assertEqual(expire_stale_visits(self.today, batch_size=1), {'EXPIRED': 1, 'NO_SHOW': 1})
+        self.assertEqual(self.statuses(), {
+            'pending': 'EXPIRED', 'approved': 'NO_SHOW', 'checked_in': 'APPROVED', 'upcoming': 'PENDING',
+        })
+        self.assertEqual(expire_stale_visits(self.today), {'EXPIRED': 0, 'NO_SHOW': 0})
+
+    def test_bookkeeping_matches_rebuild(self):
+        expire_stale_visits(self.today)
+        events = VisitEvent.objects.filter(event_type__in=['EXPIRED', 'NO_SHOW']).order_by('sequence')
+        self.assertEqual(
+            [(event.visit_id, event.from_status, event.to_status, event.data) for event in events],
+            [
+                (self.pending.id, 'PENDING', 'EXPIRED', {'expired_on': '2030-03-10'}),
+                (self.approved.id, 'APPROVED', 'NO_SHOW', {'expired_on': '2030-03-10'}),
+            ],
+        )
+        self.assertEqual(stats_values(DailyVisitStats.objects.all()), stats_values(aggregate_visits(Visit.objects.all())))
+        self.assertEqual(counter_values(), {
+            (row.scope, row.subject_id, row.jail_id, row.period_start): row.visits
+            for row in aggregate_quota_counters(Visit.objects.all())
+        })
+
+class VisitArchiveTests(TestCase):
+    def setUp(self):
+        self.jail = make_jail()
+        self.prisoner = make_prisoner(self.jail, 'P1')
+        self.visitor = make_user('visitor1')
+        old = timezone.localdate() - timedelta(days=400)
+        self.finished = move_visit(request_visit(self.visitor, self.prisoner, old), 'REJECTED')
+        self.live = move_visit(request_visit(self.visitor, self.prisoner, old), 'APPROVED')
+        self.recent = move_visit(request_visit(self.visitor, self.prisoner, timezone.localdate()), 'CANCELLED')
+
+    def test_moves_only_old_finished_visits(self):
+        self.assertEqual(archive_visits(days=365), 1)
+        archived = ArchivedVisit.objects.get()
+        self.assertEqual((archived.id, archived.status, archived.jail_id), (self.finished.id, 'REJECTED', self.jail.id))
+        self.assertEqual(set(Visit.objects.values_list('id', flat=True)), {self.live.id, self.recent.id})
+        self.assertEqual(archive_visits(days=365), 0)
+
+    def test_events_and_stats_are_kept(self):
+        events = VisitEvent.objects.count()
+        stats = stats_values(DailyVisitStats.objects.all())
+        archive_visits(days=365)
+        self.assertEqual(VisitEvent.objects.count(), events)
+        self.assertEqual(stats_values(DailyVisitStats.objects.all()), stats)
+        rebuilt = merge_stats(
+            aggregate_visits(Visit.objects.all()),
+            aggregate_visits(ArchivedVisit.objects.all(), jail_field='jail_id'),
+        )
+        self.assertEqual(stats_values(rebuilt), stats)
+
+    def test_export_merges_archive_in_id_order_and_keeps_orphans(self):
+        archive_visits(days=365)
+        other = make_user('visitor2')
+        later = move_visit(request_visit(other, self.prisoner, timezone.localdate()), 'REJECTED')
+        ArchivedVisit.objects.filter(pk=self.finished.pk).update(visitor_id=later.visitor_id)
+        other.delete()  # cascades to the live visit, leaves the archived one dangling
+
+        rows = list(export_all_rows(Visit.objects.all(), ArchivedVisit.objects.all()))
+        self.assertEqual([row[0] for row in rows], [self.finished.id, self.live.id, self.recent.id])
+        username = [path for _, path in EXPORT_COLUMNS].index('visitor__username')
+        self.assertIsNone(rows[0][username])
+        self.assertEqual(rows[1][username], 'visitor1')
+
+class VisitExportTests(TestCase):
+    def setUp(self):
+        self.jails = [make_jail('District Jail'), make_jail('Central Prison')]
+        prisoners = [make_prisoner(jail, f'P{index}') for index, jail in enumerate(self.jails)]
+        visitor = make_user('visitor1')
+        old = timezone.localdate() - timedelta(days=400)
+        self.archived = move_visit(request_visit(visitor, prisoners[0], old), 'REJECTED')
+        archive_visits(days=365)
+        self.visits = [request_visit(visitor, prisoner, date(2030, 1, 1)) for prisoner in prisoners]
+        self.admin = make_user('admin1', role='admin', jail=self.jails[0])
+
+    def export(self, **params):
+        response = self.client.get(reverse('export_visits'), {'format': 'csv', **params})
+        self.assertEqual(response.status_code, 200)
+        rows = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(rows[0], [header for header, _ in EXPORT_COLUMNS])
+        return response['Content-Disposition'], [int(row[0]) for row in rows[1:]]
+
+    def test_admin_exports_only_their_jail(self):
+        self.client.force_login(self.admin)
+        disposition, ids = self.export(jail=self.jails[1].id)
+        self.assertEqual(ids, [self.visits[0].id])
+        self.assertIn(f'visits_jail{self.jails[0].id}.csv', disposition)
+        self.assertEqual(self.export(archived='1')[1], [self.archived.id, self.visits[0].id])
+
+    def test_superuser_chooses_the_jail(self):
+        self.admin.is_superuser = True
+        self.admin.save()
+        self.client.force_login(self.admin)
+        self.assertEqual(self.export(jail=self.jails[1].id)[1], [self.visits[1].id])
+        self.assertEqual(self.export(archived='1')[1], [self.archived.id] + [visit.id for visit in self.visits])
+
+    def test_filters_and_bad_input(self):
+        self.client.force_login(self.admin)
+        self.assertEqual(self.export(**{'from': '2030-01-02'})[1], [])
+        for params in ({'from': '2024-02-30'}, {'to': 'soon'}, {'status': 'LOST'}, {'format': 'pdf'}):
+            response = self.client.get(reverse('export_visits'), {'format': 'csv', **params})
+            self.assertEqual(response.status_code, 400, params)
+
+    def test_xlsx_is_a_readable_workbook(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('export_visits'), {'format': 'xlsx'})
+        with zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content))) as workbook:
+            sheet = workbook.read('xl/worksheets/sheet1.xml').decode()
+        self.assertEqual(sheet.count('<row>'), 2)
+        self.assertIn('District Jail', sheet)
+        self.assertNotIn('Central Prison', sheet)
+
+def classify_in_order(taxonomy, reason, default=GENERAL_EMERGENCY):
+    """Reference classifier: check each type's keywords in order, as before compilation"""
+    reason = reason.lower()
+    for emergency_type, keywords in taxonomy:
+        if any(keyword in reason for keyword in keywords):
+            return emergency_type
+    return default
+
+class EmergencyClassifierTests(TestCase):
+    def random_reasons(self, taxonomy, count, seed):
+        rng = random.Random(seed)
+        keywords = [keyword for _, words in taxonomy for keyword in words]
+        fragments = keywords + [keyword[:rng.randint(1, len(keyword))] for keyword in keywords] + ['', ' ', 'a', 'guard', 'cell']
+        reasons = []
+        for _ in range(count):
+            parts = rng.choices(fragments, k=rng.randint(0, 5))
+            joiner = rng.choice(['', ' ', '-'])
+            reason = joiner.join(parts)
+            reasons.append(reason.upper() if rng.random() < 0.2 else reason)
+        return reasons
+
+    def test_matches_ordered_keyword_checks(self):
+        classifier = EmergencyClassifier(DEFAULT_EMERGENCY_TAXONOMY)
+        for reason in self.random_reasons(DEFAULT_EMERGENCY_TAXONOMY, 30000, seed=47):
+            self.assertEqual(classifier.classify(reason), classify_in_order(DEFAULT_EMERGENCY_TAXONOMY, reason), reason)
+
+    def test_prefix_keywords_keep_priority(self):
+        # 'fire' contains the higher-priority 'fir'; 'firearm' must not hide it
+        taxonomy = [('FIRST', ['fir']), ('SECOND', ['fire', 'firearm']), ('THIRD', ['arm'])]
+        classifier = EmergencyClassifier(taxonomy)
+        for reason in ['firearm', 'fire', 'armfire', 'arm', 'fi', ''] + self.random_reasons(taxonomy, 2000, seed=1):
+            self.assertEqual(classifier.classify(reason), classify_in_order(taxonomy, reason), reason)
+
+    def test_empty_taxonomy_and_reason(self):
+        self.assertEqual(EmergencyClassifier([]).classify('fire'), GENERAL_EMERGENCY)
+        classifier = EmergencyClassifier(DEFAULT_EMERGENCY_TAXONOMY)
+        self.assertEqual(classifier.classify(''), GENERAL_EMERGENCY)
+        self.assertEqual(classifier.classify(None), GENERAL_EMERGENCY)
+        self.assertEqual(classifier.classify('Inmate fled, SMOKE in block C'), 'FIRE EMERGENCY')
+
+class AlertCoalescingTests(TestCase):
+    def setUp(self):
+        self.jail = make_jail()
+        self.other_jail = make_jail('Central Prison')
+        self.guard = make_user('guard1', role='security', jail=self.jail)
+        self.guard.email = 'guard1@example.com'
+        self.guard.save()
+
+    def report(self, emergency_type='FIRE EMERGENCY', facility_id=None, **fields):
+        facility_id = self.jail.id if facility_id is None else facility_id
+        return report_emergency(facility_id, emergency_type, self.guard.id, message='Emergency', **fields)
+
+    def test_repeated_triggers_join_the_open_alert(self):
+        alert, created = self.report(reason='smoke in kitchen')
+        same, joined = self.report(reason='flames spreading', location='Kitchen')
+        self.assertEqual((created, joined, same.pk), (True, False, alert.pk))
+        alert.refresh_from_db()
+        self.assertEqual(alert.report_count, 2)
+        self.assertEqual(list(alert.reports.values_list('reason', 'location')), [('flames spreading', 'Kitchen')])
+        self.assertEqual(EmergencyAlert.objects.count(), 1)
+
+    def test_other_type_jail_or_stale_alert_raises_new_alert(self):
+        alert, _ = self.report()
+        self.assertTrue(self.report('MEDICAL EMERGENCY')[1])
+        self.assertTrue(self.report(facility_id=self.other_jail.id)[1])
+
+        EmergencyAlert.objects.filter(pk=alert.pk).update(
+            last_reported_at=timezone.now() - timedelta(seconds=ALERT_COALESCE_SECONDS + 1)
+        )
+        stale_replacement, created = self.report()
+        self.assertTrue(created)
+
+        set_alert_active(stale_replacement, False)
+        self.assertTrue(self.report()[1])
+        self.assertEqual(EmergencyAlert.objects.count(), 5)
+
+    def test_update_sends_each_report_once(self):
+        alert, _ = self.report()
+        self.report(reason='second')
+        self.report(reason='third')
+
+        self.assertEqual(send_alert_update(alert.pk), 1)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn('2 further reports', mail.outbox[0].subject)
+        self.assertEqual(mail.outbox[0].to, ['guard1@example.com'])
+        self.assertEqual(send_alert_update(alert.pk), 0)
+
+        self.report(reason='fourth')
+        send_alert_update(alert.pk)
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertIn('fourth', mail.outbox[1].body)
+        self.assertNotIn('second', mail.outbox[1].body)
+
+    def test_lost_updates_are_sent_once_due(self):
+        alert, _ = self.report()
+        self.report(reason='second')
+        self.assertEqual(send_due_alert_updates(), 0)
+
+        EmergencyAlertReport.objects.filter(alert=alert).update(
+            reported_at=timezone.now() - timedelta(seconds=ALERT_UPDATE_SECONDS + 1)
+        )
+        self.assertEqual(send_due_alert_updates(), 1)
+        self.assertEqual(send_due_alert_updates(), 0)
+        self.assertEqual(len(mail.outbox), 1)
+
+class SnapshotReportTests(TestCase):
+    def setUp(self):
+        self.jails = [make_jail('District Jail'), make_jail('Central Prison')]
+        self.prisoners = [make_prisoner(jail, f'P{index}') for index, jail in enumerate(self.jails)]
+        self.visitors = [make_user('visitor1'), make_user('visitor2')]
+        district, central = self.prisoners
+        self.visit(district, date(2020, 1, 10), 'COMPLETED', minutes=90)
+        self.visit(district, date(2020, 1, 10), 'APPROVED', visitor=1)
+        self.visit(district, date(2020, 1, 11), 'REJECTED')
+        self.visit(district, date(2020, 2, 5), 'NO_SHOW')
+        self.visit(central, date(2020, 1, 20), 'COMPLETED', visitor=1, minutes=30)
+
+    def visit(self, prisoner, visit_date, status, visitor=0, minutes=None):
+        check_in = check_out = None
+        if minutes is not None:
+            check_in = timezone.make_aware(datetime.combine(visit_date, time(10)))
+            check_out = check_in + timedelta(minutes=minutes)
+        return Visit.objects.create(
+            visitor=self.visitors[visitor], prisoner=prisoner, visit_date=visit_date, visit_time_slot=SLOT,
+            status=status, check_in_time=check_in, check_out_time=check_out,
+        )
+
+    def report(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'visits.npz')
+            write_snapshot(path)
+            snapshot = load_snapshot(path)
+        return snapshot, {(row['month'], row['jail']): row for row in monthly_metrics(snapshot)}
+
+    def test_monthly_metrics(self):
+        snapshot, report = self.report()
+        self.assertEqual(list(report), [
+            ('2020-01', 'Central Prison'), ('2020-01', 'District Jail'), ('2020-02', 'District Jail'),
+        ])
+        district = report[('2020-01', 'District Jail')]
+        self.assertEqual(
+            {name: district[name] for name in ('visits', 'completed', 'approved', 'rejected', 'unique_visitors', 'no_shows')},
+            {'visits': 3, 'completed': 1, 'approved': 1, 'rejected': 1, 'unique_visitors': 2, 'no_shows': 1},
+        )
+        self.assertEqual((district['no_show_rate'], district['average_minutes_inside']), (50.0, 90.0))
+        self.assertEqual(report[('2020-01', 'Central Prison')]['average_minutes_inside'], 30.0)
+        self.assertEqual(report[('2020-02', 'District Jail')]['no_show_rate'], 100.0)
+        self.assertEqual(monthly_metrics(snapshot, jail='Central Prison'), [report[('2020-01', 'Central Prison')]])
+        with self.assertRaises(ValueError):
+            monthly_metrics(snapshot, jail='Nowhere')
+
+    def test_archived_visits_are_included_unless_orphaned(self):
+        _, before = self.report()
+        self.assertEqual(archive_visits(days=365), 4)
+        _, after = self.report()
+        self.assertEqual(after, before)
+
+        orphan = self.visit(make_prisoner(self.jails[0], 'P9'), date(2020, 3, 1), 'REJECTED')
+        archive_visits(days=365)
+        Prisoner.objects.filter(prisoner_id='P9').delete()
+        snapshot, report = self.report()
+        self.assertNotIn(orphan.id, snapshot['visits.id'])
+        self.assertEqual(report, before)
+
+    def test_no_personal_details(self):
+        snapshot, _ = self.report()
+        self.assertEqual(sorted(name for name in snapshot if name.startswith('users.')), [
+            'users.has_related_prisoner', 'users.is_blacklisted', 'users.is_family_member', 'users.joined',
+            'users.relationship', 'users.role',
+        ])
+        strings = [str(value) for array in snapshot.values() if array.dtype.kind == 'U' for value in array.ravel()]
+        self.assertFalse(set(strings) & set(User.objects.values_list('username', flat=True)))
+
+    def test_version_is_checked(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'visits.npz')
+            np.savez_compressed(path, version=np.array(SNAPSHOT_VERSION + 1))
+            with self.assertRaises(ValueError):
+                load_snapshot(path)
+
+@override_settings(VISIT_HOLIDAYS=[], VISIT_HOLIDAY_FACTOR=1.0)
+class GateForecastTests(TestCase):
+    def setUp(self):
+        self.jails = [make_jail('District Jail'), make_jail('Central Prison')]
+        self.prisoner = make_prisoner(self.jails[0], 'P1')
+        self.visitor = make_user('visitor1')
+        self.today = timezone.localdate()
+        # Four attended visits on today's weekday, one approved visit nobody came to
+        for weeks in (1, 2, 3, 4):
+            self.visit(self.today - timedelta(weeks=weeks), 'COMPLETED', attended=True)
+        self.visit(self.today - timedelta(weeks=2), 'APPROVED')
+        for status in ('APPROVED', 'APPROVED', 'APPROVED', 'PENDING', 'PENDING', 'REJECTED'):
+            self.visit(self.today + timedelta(weeks=1), status)
+
+    def visit(self, visit_date, status, attended=False):
+        check_in = check_out = None
+        if attended:
+            check_in = timezone.make_aware(datetime.combine(visit_date, time(10)))
+            check_out = check_in + timedelta(hours=1)
+        Visit.objects.create(
+            visitor=self.visitor, prisoner=self.prisoner, visit_date=visit_date, visit_time_slot=SLOT,
+            status=status, check_in_time=check_in, check_out_time=check_out,
+        )
+
+    def forecast(self, jail, days):
+        return GateForecast.objects.get(jail=jail, date=self.today + timedelta(days=days))
+
+    def test_baseline_and_bookings(self):
+        self.assertEqual(fit_forecasts(), 2 * HORIZON_WEEKS * 7)
+        # Same weekday, nothing booked: 4 arrivals over the 12 weeks of history
+        today = self.forecast(self.jails[0], 0)
+        self.assertEqual((today.expected_arrivals, today.booked, today.peak_hour), (0.33, 0, 10))
+        self.assertEqual(today.slots, {SLOT: {'expected': 0.33, 'booked': 0}})
+        # Five booked visits at a 4-in-5 show-up rate beat the baseline
+        next_week = self.forecast(self.jails[0], 7)
+        self.assertEqual((next_week.expected_arrivals, next_week.booked), (4.0, 5))
+        self.assertEqual((next_week.peak_occupancy, next_week.peak_hour), (4.0, 10))
+        self.assertEqual(self.forecast(self.jails[0], 1).slots, {})
+        self.assertEqual(self.forecast(self.jails[1], 7).expected_arrivals, 0)
+
+        rows = upcoming_forecast(self.jails[0])
+        self.assertEqual(len(rows), HORIZON_WEEKS * 7)
+        self.assertEqual((rows[7].busiest_slot, rows[1].busiest_slot), (SLOT, None))
+
+    def test_refit_replaces_rows_from_today(self):
+        GateForecast.objects.create(
+            jail=self.jails[0], date=self.today - timedelta(days=1), expected_arrivals=1, peak_occupancy=1,
+            fitted_at=timezone.now(),
+        )
+        fit_forecasts()
+        fit_forecasts()
+        self.assertEqual(GateForecast.objects.filter(date__gte=self.today).count(), 2 * HORIZON_WEEKS * 7)
+        self.assertTrue(GateForecast.objects.filter(date__lt=self.today).exists())
+
+    def test_holidays_scale_the_baseline(self):
+        with override_settings(VISIT_HOLIDAYS=[self.today.isoformat()], VISIT_HOLIDAY_FACTOR=0.5):
+            fit_forecasts()
+        today = self.forecast(self.jails[0], 0)
+        self.assertEqual((today.is_holiday, today.expected_arrivals), (True, 0.17))
+        self.assertFalse(self.forecast(self.jails[0], 7).is_holiday)
@@ -7,9 +7,13 @@ urlpatterns = [
     # Visitor URLs
     path('request/', views.request_visit, name='request_visit'),
     path('my-visits/', views.my_visits, name='my_visits'),
+    path('api/my-visits/', views.my_visits_json, name='my_visits_json'),
+    path('pass/<int:visit_id>.<str:fmt>', views.visit_pass, name='visit_pass'),
 
     # Admin URLs for Visit Management
     path('review/', views.review_visits, name='review_visits'),
+    path('export/', views.export_visits, name='export_visits'),
+    path('forecast/refit/', views.refit_gate_forecast, name='refit_gate_forecast'),
     path('review/<int:visit_id>/', views.visit_detail_review, name='visit_detail_review'),
     path('decide/<int:visit_id>/<str:decision>/', views.decide_visit, name='decide_visit'),
     
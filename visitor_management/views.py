@@ -1,27 +1,36 @@
 from django.shortcuts import render, redirect, get_object_or_404
-from django.http import HttpResponse, JsonResponse
+from django.urls import reverse
+from django.http import HttpResponse, HttpResponseNotModified, JsonResponse, Http404, StreamingHttpResponse
+from django.utils.dateparse import parse_date
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
 from django.utils import timezone
 from django.views.decorators.http import require_POST
 from django.core.mail import send_mail, EmailMultiAlternatives
 from django.conf import settings
-from django.db.models import Q
+from django.db import transaction
+from django.db.models import Count, Q
 from datetime import timedelta, datetime
+import ipaddress
 import json
 import logging
 
 # Local App Imports
-from .models import Visit, EmergencyAlert
+from .models import ArchivedEmergencyAlert, ArchivedVisit, Visit, EmergencyAlert, VisitEvent
+from .events import record_visit_event
+from .exports import EXPORT_FORMATS, export_all_rows
+from .alerts import alert_log_stats, alert_recipients, issue_alert, report_emergency, set_alert_active, user_active_alert, visible_to
+from .emergency import PANIC_ALARM, classify_emergency_type, emergency_classifier
+from .forecast import fit_forecasts
+from .quotas import quota_error
+from .search import search_alerts
+from .passes import PASS_FORMATS, pass_cache, pass_etag, pass_payload, pass_version
 from prison_core.models import Prisoner, Jail
+from prison_core.images import rendition_url
+from prison_core.pagination import InvalidCursor, KeysetPaginator, encode_cursor, paginate
 from accounts.models import Blacklist, User
 from accounts.decorators import visitor_required, security_required, admin_required
 
-# Third-party Imports
-import qrcode
-from io import BytesIO
-from django.core.files import File
-
 # Set up logging
 logger = logging.getLogger(__name__)
 
@@ -30,7 +39,7 @@ logger = logging.getLogger(__name__)
 @login_required
 @visitor_required
 def request_visit(request):
-    if Blacklist.objects.filter(user=request.user).exists():
+    if request.user.is_blacklisted:
         messages.error(request, "Your account has been suspended from making visit requests.")
         return redirect('dashboard')
 
@@ -105,7 +114,7 @@ def request_visit(request):
         print(f"  - visit_type: '{visit_type}'")
         
         try:
-            prisoner = get_object_or_404(Prisoner, id=prisoner_id)
+            prisoner = get_object_or_404(Prisoner.objects.select_related('jail'), id=prisoner_id)
             
             # 🔧 ENHANCED Validation - check if this specific prisoner relationship
             if visit_type == 'EMERGENCY':
@@ -140,16 +149,30 @@ def request_visit(request):
             if existing_visit:
                 messages.warning(request, f"You already have a {existing_visit.status.lower()} visit request for this date and time.")
                 return redirect('my_visits')
-            
-            # 🔧 CRITICAL: Create visit request with proper visit_type
-            visit = Visit.objects.create(
-                visitor=request.user,
+
+            # Refuse up front when the jail's visit quota for that week or month is already used up
+            error = quota_error(Visit(
+                visitor_id=request.user.id,
                 prisoner=prisoner,
                 visit_date=visit_date,
                 visit_time_slot=time_slot,
-                status='PENDING',
-                visit_type=visit_type  # 🚨 This should save correctly now
-            )
+                visit_type=visit_type,
+            ))
+            if error:
+                messages.error(request, error)
+                return redirect('request_visit')
+            
+            # 🔧 CRITICAL: Create visit request with proper visit_type
+            with transaction.atomic():
+                visit = Visit.objects.create(
+                    visitor=request.user,
+                    prisoner=prisoner,
+                    visit_date=visit_date,
+                    visit_time_slot=time_slot,
+                    status='PENDING',
+                    visit_type=visit_type  # 🚨 This should save correctly now
+                )
+                record_visit_event(visit, 'REQUESTED', actor=request.user, visit_type=visit_type)
             
             # 🔍 DEBUG: Verify what was actually saved
             print(f"✅ VISIT CREATED:")
@@ -178,8 +201,129 @@ def request_visit(request):
 @login_required
 @visitor_required
 def my_visits(request):
-    visits = Visit.objects.filter(visitor=request.user).order_by('-visit_date')
-    return render(request, 'visitor_management/my_visits.html', {'visits': visits})
+    # ?archived=1 pages through visits moved to the archive by archive_history
+    archived = request.GET.get('archived') == '1'
+    source = ArchivedVisit if archived else Visit
+    visits = paginate(
+        request,
+        source.objects.filter(visitor=request.user).select_related('visitor', 'prisoner__jail'),
+        ('-visit_date', '-id'),
+    )
+    for visit in visits:
+        if visit.status == 'APPROVED':
+            # Versioned pass URL: changes whenever the payload does, so it can be cached forever
+            visit.pass_version = pass_version(pass_payload(visit))
+    return render(request, 'visitor_management/my_visits.html', {'visits': visits, 'archived': archived})
+
+MY_VISITS_LIMIT = 50
+MY_VISITS_MAX_LIMIT = 200
+
+def _my_visit_json(visit):
+    data = {
+        'id': visit.id,
+        'visit_date': visit.visit_date,
+        'time_slot': visit.visit_time_slot,
+        'status': visit.status,
+        'visit_type': visit.visit_type,
+        'prisoner': {
+            'prisoner_id': visit.prisoner.prisoner_id,
+            'name': f"{visit.prisoner.first_name} {visit.prisoner.last_name}",
+        },
+        'jail': visit.prisoner.jail.name,
+        'check_in_time': visit.check_in_time,
+        'check_out_time': visit.check_out_time,
+        'updated_at': visit.updated_at,
+        'pass': None,
+    }
+    if visit.status == 'APPROVED':
+        version = pass_version(pass_payload(visit))
+        data['pass'] = {
+            fmt: f"{reverse('visit_pass', args=[visit.id, fmt])}?v={version}"
+            for fmt in PASS_FORMATS
+        }
+    return data
+
+@login_required
+@visitor_required
+def my_visits_json(request):
+    """
+    The visitor's visits as JSON.
+
+    Without ?since= this is one page of history, newest first (follow
+    "next_cursor" with ?cursor=). Every response carries a "since" token, the
+    last VisitEvent sequence seen; passing it back as ?since= returns only
+    visits with newer events (requests, approvals, check-ins), oldest change
+    first. Sequences become visible in commit order, so no change is skipped.
+    """
+    visits = Visit.objects.filter(visitor=request.user).select_related('visitor', 'prisoner__jail')
+    events = VisitEvent.objects.filter(visitor_id=request.user.id)
+    try:
+        limit = min(max(int(request.GET.get('limit', MY_VISITS_LIMIT)), 1), MY_VISITS_MAX_LIMIT)
+    except ValueError:
+        return JsonResponse({'error': "limit must be a number"}, status=400)
+
+    since = request.GET.get('since')
+    try:
+        if since:
+            page = KeysetPaginator(events.values('sequence', 'visit_id'), ('sequence',), limit).page(since)
+            latest = page.object_list[-1]['sequence'] if page.object_list else None
+            # Each changed visit once, placed by its last event on this page
+            changed = {}
+            for event in page:
+                changed.pop(event['visit_id'], None)
+                changed[event['visit_id']] = True
+            found = visits.in_bulk(list(changed))
+            results = [found[visit_id] for visit_id in changed if visit_id in found]  # archived visits drop out
+        else:
+            page = KeysetPaginator(visits, ('-visit_date', '-id'), limit).page(request.GET.get('cursor'))
+            latest = events.order_by('-sequence').values_list('sequence', flat=True).first() or 0
+            results = page
+    except InvalidCursor as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    response = JsonResponse({
+        'results': [_my_visit_json(visit) for visit in results],
+        'next_cursor': None if since else page.next_cursor,
+        'since': encode_cursor([latest]) if latest is not None else since,
+        'has_more': page.has_next,
+    })
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+@login_required
+def visit_pass(request, visit_id, fmt):
+    """
+    Render an approved visit's QR pass on demand (SVG or PNG).
+    Bytes come from an in-process LRU; responses carry a strong ETag and,
+    when requested with the current ?v= version, are cached as immutable.
+    """
+    if fmt not in PASS_FORMATS:
+        raise Http404("Unknown pass format")
+    visit = get_object_or_404(
+        Visit.objects.select_related('visitor', 'prisoner__jail'),
+        id=visit_id, status='APPROVED'
+    )
+    user = request.user
+    is_jail_staff = user.role in ('admin', 'security') and user.jail_id == visit.prisoner.jail_id
+    if visit.visitor_id != user.id and not is_jail_staff:
+        raise Http404("Visit pass not found")
+
+    payload = pass_payload(visit)
+    etag = f'"{pass_etag(payload, fmt)}"'
+    if request.GET.get('v') == pass_version(payload):
+        cache_control = 'private, max-age=31536000, immutable'
+    else:
+        cache_control = 'private, no-cache'
+
+    if etag in [tag.strip() for tag in request.headers.get('If-None-Match', '').split(',')]:
+        response = HttpResponseNotModified()
+    else:
+        _, data = pass_cache.get(payload, fmt)
+        response = HttpResponse(data, content_type=PASS_FORMATS[fmt])
+        response['Content-Disposition'] = f'inline; filename="visit_pass_{visit.id}.{fmt}"'
+    response['ETag'] = etag
+    response['Cache-Control'] = cache_control
+    return response
 
 # --- Admin Views ---
 
@@ -189,8 +333,112 @@ def review_visits(request):
     if not request.user.jail:
         messages.error(request, "You must be assigned to a jail to review visits.")
         return redirect('dashboard')
-    pending_visits = Visit.objects.filter(prisoner__jail=request.user.jail, status='PENDING').order_by('visit_date')
-    return render(request, 'visitor_management/review_visits.html', {'visits': pending_visits})
+    pending = Visit.objects.filter(prisoner__jail=request.user.jail, status='PENDING')
+    pending_visits = paginate(request, pending.select_related('visitor', 'prisoner'), ('visit_date', 'id'))
+    counts = pending.aggregate(
+        total=Count('id'),
+        emergency=Count('id', filter=Q(visit_type='EMERGENCY')),
+    )
+    counts['regular'] = counts['total'] - counts['emergency']
+    return render(request, 'visitor_management/review_visits.html', {'visits': pending_visits, 'counts': counts})
+
+@login_required
+@admin_required
+def export_visits(request):
+    """
+    Visit history as a streamed CSV or XLSX download for auditors.
+    Rows are read with a chunked iterator and written out as they arrive,
+    so memory use does not grow with the size of the export.
+    """
+    is_superuser = request.user.is_superuser
+    if not request.user.jail and not is_superuser:
+        messages.error(request, "You must be assigned to a jail to export visits.")
+        return redirect('dashboard')
+
+    context = {
+        'jails': Jail.objects.order_by('name') if is_superuser else None,
+        'statuses': Visit.STATUS_CHOICES,
+        'visit_types': Visit.VISIT_TYPE_CHOICES,
+        'formats': EXPORT_FORMATS,
+        # Start superusers on their own facility rather than every jail
+        'values': request.GET or {'jail': str(request.user.jail_id or '')},
+    }
+    export_format = request.GET.get('format')
+    if export_format is None:
+        return render(request, 'visitor_management/export_visits.html', context)
+
+    errors = []
+    visits = Visit.objects.all()
+    # Archived visits have the same field names, so every filter applies to both
+    archived = ArchivedVisit.objects.all() if request.GET.get('archived') == '1' else ArchivedVisit.objects.none()
+    if is_superuser:
+        jail_id = request.GET.get('jail')
+        if jail_id:
+            if not jail_id.isdigit():
+                errors.append("Invalid facility selected.")
+            else:
+                visits = visits.filter(prisoner__jail_id=int(jail_id))
+                archived = archived.filter(jail_id=int(jail_id))
+    else:
+        jail_id = request.user.jail_id
+        visits = visits.filter(prisoner__jail_id=jail_id)
+        archived = archived.filter(jail_id=jail_id)
+
+    statuses = request.GET.getlist('status')
+    if statuses:
+        if not set(statuses) <= {value for value, _ in Visit.STATUS_CHOICES}:
+            errors.append("Unknown visit status.")
+        visits = visits.filter(status__in=statuses)
+        archived = archived.filter(status__in=statuses)
+    visit_type = request.GET.get('visit_type')
+    if visit_type:
+        if visit_type not in {value for value, _ in Visit.VISIT_TYPE_CHOICES}:
+            errors.append("Unknown visit type.")
+        visits = visits.filter(visit_type=visit_type)
+        archived = archived.filter(visit_type=visit_type)
+
+    dates = {}
+    for param, lookup in (('from', 'visit_date__gte'), ('to', 'visit_date__lte')):
+        if request.GET.get(param):
+            try:
+                dates[param] = parse_date(request.GET[param])
+            except ValueError:
+                # Well formed but impossible, e.g. 2024-02-30
+                dates[param] = None
+            if dates[param] is None:
+                errors.append(f"'{param}' must be a date (YYYY-MM-DD).")
+            else:
+                visits = visits.filter(**{lookup: dates[param]})
+                archived = archived.filter(**{lookup: dates[param]})
+    if export_format not in EXPORT_FORMATS:
+        errors.append("Choose CSV or XLSX.")
+
+    if errors:
+        for error in errors:
+            messages.error(request, error)
+        return render(request, 'visitor_management/export_visits.html', context, status=400)
+
+    content_type, stream = EXPORT_FORMATS[export_format]
+    filename = '_'.join(
+        ['visits', f"jail{jail_id}" if jail_id else 'all'] +
+        [str(dates[param]) for param in ('from', 'to') if dates.get(param)]
+    )
+    rows = export_all_rows(visits, archived)
+    response = StreamingHttpResponse(stream(rows), content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{export_format}"'
+    logger.info(f"VISIT EXPORT: {request.user.username} exported {filename}.{export_format}")
+    return response
+
+@login_required
+@admin_required
+@require_POST
+def refit_gate_forecast(request):
+    """Refit the gate demand forecast for all jails and return to staff management"""
+    started = timezone.now()
+    rows = fit_forecasts()
+    elapsed = (timezone.now() - started).total_seconds()
+    messages.success(request, f"Gate forecast refitted ({rows} facility-days) in {elapsed:.1f}s.")
+    return redirect('manage_security_staff')
 
 @login_required
 @admin_required
@@ -202,29 +450,40 @@ def visit_detail_review(request, visit_id):
 @admin_required
 def decide_visit(request, visit_id, decision):
     """
-    Enhanced QR code generation with additional security data
+    Approve or reject a pending visit. The QR pass is rendered on demand by
+    visit_pass, so approval no longer writes an image file.
     """
-    visit = get_object_or_404(Visit, id=visit_id, prisoner__jail=request.user.jail)
+    if decision not in ('approve', 'reject'):
+        return redirect('review_visits')
+
+    with transaction.atomic():
+        # Locked so a concurrent decision or expiry waits for this one
+        visit = get_object_or_404(
+            Visit.objects.select_for_update(of=('self',)).select_related('prisoner__jail'),
+            id=visit_id, prisoner__jail=request.user.jail,
+        )
+        previous_status = visit.status
+        if previous_status != 'PENDING':
+            messages.error(request, f"Visit ID {visit.id} is {visit.get_status_display().lower()} and can no longer be decided.")
+            return redirect('review_visits')
+        if decision == 'approve':
+            # Checked under lock on the quota counters the approval will bump
+            error = quota_error(visit, lock=True)
+            if error:
+                messages.error(request, f"Visit ID {visit.id} cannot be approved: {error}")
+                return redirect('review_visits')
+            visit.status = event_type = 'APPROVED'
+        else:
+            visit.status = event_type = 'REJECTED'
+
+        visit.save()
+        record_visit_event(visit, event_type, actor=request.user, from_status=previous_status)
+
     if decision == 'approve':
-        visit.status = 'APPROVED'
-        
-        # Enhanced QR data with facility and date information for better security
-        qr_data = f"Visit ID: {visit.id}\nVisitor: {visit.visitor.username}\nPrisoner: {visit.prisoner.prisoner_id}\nDate: {visit.visit_date}\nFacility: {visit.prisoner.jail.name}"
-        
-        qr_image = qrcode.make(qr_data)
-        buffer = BytesIO()
-        qr_image.save(buffer, format='PNG')
-        file_name = f'visit_qr_{visit.id}.png'
-        visit.qr_code.save(file_name, File(buffer), save=False)
-        
-        messages.success(request, f"Visit approved and secure QR code generated for Visit ID: {visit.id}")
-        print(f"QR CODE GENERATED: Visit ID {visit.id}, Visitor: {visit.visitor.username}")
-        
-    elif decision == 'reject':
-        visit.status = 'REJECTED'
+        messages.success(request, f"Visit approved and secure QR pass issued for Visit ID: {visit.id}")
+        print(f"QR PASS ISSUED: Visit ID {visit.id}, Visitor ID: {visit.visitor_id}")
+    else:
         messages.warning(request, "Visit has been rejected.")
-    
-    visit.save()
     return redirect('review_visits')
 
 # --- Security Staff Views ---
@@ -256,9 +515,10 @@ def security_dashboard(request):
         check_in_time__isnull=True
     ).select_related('visitor', 'prisoner').order_by('visit_time_slot')
     
-    # Get recent emergency alerts
-    recent_alerts = EmergencyAlert.objects.filter(is_active=True).order_by('-issued_at')[:5]
-    active_alert_count = EmergencyAlert.objects.filter(is_active=True).count()
+    # Get recent emergency alerts for this jail (and state-wide broadcasts)
+    jail_alerts = EmergencyAlert.objects.filter(visible_to(request.user.jail_id), is_active=True)
+    recent_alerts = jail_alerts.order_by('-issued_at')[:5]
+    active_alert_count = jail_alerts.count()
     
     # Enhanced logging for security monitoring
     print(f"SECURITY DASHBOARD - {request.user.jail.name if request.user.jail else 'Unknown'}")
@@ -295,8 +555,10 @@ def check_in_visitor(request):
             if visit.check_in_time:
                 messages.warning(request, f"Visitor {visit.visitor.full_name or visit.visitor.username} has already been checked in at {visit.check_in_time.strftime('%I:%M %p')}.")
             else:
-                visit.check_in_time = timezone.now()
-                visit.save()
+                with transaction.atomic():
+                    visit.check_in_time = timezone.now()
+                    visit.save()
+                    record_visit_event(visit, 'CHECKED_IN', actor=request.user, from_status=visit.status)
                 
                 visitor_name = visit.visitor.full_name or visit.visitor.username
                 messages.success(request, f"✓ Visitor {visitor_name} checked in successfully at {timezone.now().strftime('%I:%M %p')}.")
@@ -316,7 +578,7 @@ def check_out_visitor(request, visit_id):
     """
     Enhanced check-out with validation and logging
     """
-    visit = get_object_or_404(Visit, id=visit_id, prisoner__jail=request.user.jail)
+    visit = get_object_or_404(Visit.objects.select_related('visitor', 'prisoner'), id=visit_id, prisoner__jail=request.user.jail)
     
     # Validation: ensure visitor was checked in
     if not visit.check_in_time:
@@ -327,9 +589,12 @@ def check_out_visitor(request, visit_id):
         visitor_name = visit.visitor.full_name or visit.visitor.username
         messages.warning(request, f"Visitor {visitor_name} was already checked out at {visit.check_out_time.strftime('%I:%M %p')}.")
     else:
-        visit.check_out_time = timezone.now()
-        visit.status = 'COMPLETED'
-        visit.save()
+        previous_status = visit.status
+        with transaction.atomic():
+            visit.check_out_time = timezone.now()
+            visit.status = 'COMPLETED'
+            visit.save()
+            record_visit_event(visit, 'CHECKED_OUT', actor=request.user, from_status=previous_status)
         
         visitor_name = visit.visitor.full_name or visit.visitor.username
         messages.success(request, f"✓ Visitor {visitor_name} has been checked out successfully at {timezone.now().strftime('%I:%M %p')}.")
@@ -389,15 +654,14 @@ def get_visit_details_json(request, visit_id):
                 'error': f'Visitor already checked in at {visit.check_in_time.strftime("%I:%M %p")}. Duplicate check-ins are not allowed.'
             }, status=409)
 
-        # Build complete visitor data with image
+        # Gate-card renditions (a few tens of KB) instead of the full uploads
         visitor_photo_url = None
         if visit.visitor.profile_photo:
-            visitor_photo_url = request.build_absolute_uri(visit.visitor.profile_photo.url)
+            visitor_photo_url = request.build_absolute_uri(rendition_url(visit.visitor.profile_photo, 'gate'))
 
-        # Build complete prisoner data with image
         prisoner_photo_url = None
         if visit.prisoner.photo:
-            prisoner_photo_url = request.build_absolute_uri(visit.prisoner.photo.url)
+            prisoner_photo_url = request.build_absolute_uri(rendition_url(visit.prisoner.photo, 'gate'))
 
         # Return comprehensive visitor and prisoner details
         data = {
@@ -602,36 +866,9 @@ def is_security_staff(user):
     """Check if user is security staff"""
     return user.is_authenticated and (user.is_staff or hasattr(user, 'jail'))
 
-def classify_emergency_type(reason):
-    """Classify emergency type based on reason keywords"""
-    reason_lower = reason.lower()
-    
-    if any(keyword in reason_lower for keyword in ['fight', 'violence', 'attack', 'assault', 'riot']):
-        return 'VIOLENCE/FIGHT'
-    elif any(keyword in reason_lower for keyword in ['medical', 'injury', 'hurt', 'sick', 'health', 'ambulance']):
-        return 'MEDICAL EMERGENCY'
-    elif any(keyword in reason_lower for keyword in ['fire', 'smoke', 'burn', 'flames']):
-        return 'FIRE EMERGENCY'
-    elif any(keyword in reason_lower for keyword in ['escape', 'missing', 'fled', 'breakout']):
-        return 'ESCAPE ATTEMPT'
-    elif any(keyword in reason_lower for keyword in ['breach', 'unauthorized', 'security', 'intruder']):
-        return 'SECURITY BREACH'
-    elif any(keyword in reason_lower for keyword in ['lockdown', 'lock down', 'secure', 'containment']):
-        return 'LOCKDOWN REQUIRED'
-    elif any(keyword in reason_lower for keyword in ['weapon', 'knife', 'gun', 'contraband']):
-        return 'WEAPON/CONTRABAND'
-    else:
-        return 'GENERAL EMERGENCY'
-
 def send_emergency_notifications(emergency_alert, emergency_reason, location, request):
-    """Send emergency notifications to all relevant personnel"""
+    """Send emergency notifications to the alert jail's staff (everyone for a broadcast)"""
     try:
-        # Get all staff users (administrators, security staff, etc.)
-        staff_users = User.objects.filter(
-            Q(is_staff=True) | 
-            Q(is_superuser=True)
-        ).distinct()
-        
         # Prepare email content
         subject = f"🚨 EMERGENCY ALERT #{emergency_alert.id} - IMMEDIATE RESPONSE REQUIRED"
         
@@ -642,7 +879,7 @@ def send_emergency_notifications(emergency_alert, emergency_reason, location, re
             <div style="background-color: rgba(255,255,255,0.1); padding: 15px; border-radius: 6px; margin-bottom: 20px;">
                 <h3 style="margin: 0 0 10px 0; color: #fff;">Alert Details</h3>
                 <p><strong>Alert ID:</strong> #{emergency_alert.id}</p>
-                <p><strong>Emergency Type:</strong> {classify_emergency_type(emergency_reason)}</p>
+                <p><strong>Emergency Type:</strong> {emergency_alert.emergency_type}</p>
                 <p><strong>Location:</strong> {location}</p>
                 <p><strong>Reported By:</strong> {request.user.get_full_name() or request.user.username}</p>
                 <p><strong>Time:</strong> {emergency_alert.issued_at.strftime('%Y-%m-%d %H:%M:%S')}</p>
@@ -658,7 +895,7 @@ def send_emergency_notifications(emergency_alert, emergency_reason, location, re
                 <ul style="margin: 0; padding-left: 20px;">
                     <li>Respond to emergency situation immediately</li>
                     <li>Contact facility if you are off-site</li>
-                    <li>Follow emergency protocols for {classify_emergency_type(emergency_reason)}</li>
+                    <li>Follow emergency protocols for {emergency_alert.emergency_type}</li>
                     <li>Report to command center for coordination</li>
                 </ul>
             </div>
@@ -673,7 +910,7 @@ def send_emergency_notifications(emergency_alert, emergency_reason, location, re
 🚨 FACILITY EMERGENCY ALERT 🚨
 
 Alert ID: #{emergency_alert.id}
-Emergency Type: {classify_emergency_type(emergency_reason)}
+Emergency Type: {emergency_alert.emergency_type}
 Location: {location}
 Reported By: {request.user.get_full_name() or request.user.username}
 Time: {emergency_alert.issued_at.strftime('%Y-%m-%d %H:%M:%S')}
@@ -684,17 +921,14 @@ EMERGENCY DESCRIPTION:
 ⚠️ IMMEDIATE ACTION REQUIRED:
 - Respond to emergency situation immediately
 - Contact facility if you are off-site  
-- Follow emergency protocols for {classify_emergency_type(emergency_reason)}
+- Follow emergency protocols for {emergency_alert.emergency_type}
 - Report to command center for coordination
 
 E-Prison Management System - Emergency Alert #{emergency_alert.id}
         """
         
-        # Send emails to all staff
-        email_recipients = []
-        for staff in staff_users:
-            if staff.email and staff.email.strip():
-                email_recipients.append(staff.email)
+        # One email to every recipient in the alert's scope
+        email_recipients = alert_recipients(emergency_alert)
         
         notifications_sent = 0
         if email_recipients:
@@ -733,13 +967,16 @@ E-Prison Management System - Emergency Alert #{emergency_alert.id}
         }
 
 def get_client_ip(request):
-    """Get client IP address from request"""
+    """Get client IP address from request (None if it is not a valid address)"""
     x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
     if x_forwarded_for:
         ip = x_forwarded_for.split(',')[0]
     else:
         ip = request.META.get('REMOTE_ADDR')
-    return ip
+    try:
+        return str(ipaddress.ip_address((ip or '').strip()))
+    except ValueError:
+        return None
 
 @login_required
 @user_passes_test(is_security_staff)
@@ -769,11 +1006,15 @@ def trigger_emergency_alert(request):
                 messages.error(request, error_msg)
                 return redirect('security_dashboard')
         
+        # Classify once; the type, location, facility and IP are also stored as columns
+        emergency_type = classify_emergency_type(emergency_reason)
+        client_ip = get_client_ip(request)
+
         # Create comprehensive emergency message
         emergency_message = f"""
 🚨 FACILITY EMERGENCY ALERT 🚨
 
-Emergency Type: {classify_emergency_type(emergency_reason)}
+Emergency Type: {emergency_type}
 Location: {location}
 Reported By: {request.user.get_full_name() or request.user.username}
 Timestamp: {timezone.now().strftime('%Y-%m-%d %H:%M:%S')}
@@ -788,41 +1029,48 @@ IMMEDIATE ACTION REQUIRED:
 
 Facility: {getattr(request.user, 'jail', 'Unknown Facility')}
 Security User: {security_user}
-User IP: {get_client_ip(request)}
+User IP: {client_ip}
         """.strip()
         
-        # Create emergency alert record using your existing model
-        emergency_alert = EmergencyAlert.objects.create(
+        # Raise an alert for the reporter's jail, or join the open one of the same type
+        emergency_alert, created = report_emergency(
+            request.user.jail_id,
+            emergency_type,
+            request.user.id,
+            reason=emergency_reason,
+            location=location[:200],
+            source_ip=client_ip,
             message=emergency_message,
-            issued_by=request.user,
-            is_active=True
         )
         
-        # Send notifications
-        try:
-            notification_result = send_emergency_notifications(emergency_alert, emergency_reason, location, request)
-        except Exception as e:
-            logger.error(f"Failed to send emergency notifications: {e}")
-            notification_result = {'success': False, 'count': 0}
+        # Notify once per incident; follow-up reports go out in batched updates
+        if created:
+            try:
+                notification_result = send_emergency_notifications(emergency_alert, emergency_reason, location, request)
+            except Exception as e:
+                logger.error(f"Failed to send emergency notifications: {e}")
+                notification_result = {'success': False, 'count': 0}
+        else:
+            notification_result = {'success': True, 'count': 0}
         
         # Log the emergency
         logger.critical(
-            f"🚨 EMERGENCY ALERT ACTIVATED 🚨\n"
-            f"Alert ID: {emergency_alert.id}\n"
+            f"🚨 EMERGENCY ALERT {'ACTIVATED' if created else 'REPORTED AGAIN'} 🚨\n"
+            f"Alert ID: {emergency_alert.id} (report {emergency_alert.report_count})\n"
             f"User: {request.user.username}\n"
             f"Reason: {emergency_reason}\n"
             f"Location: {location}\n"
             f"Timestamp: {timezone.now()}\n"
-            f"IP: {get_client_ip(request)}"
+            f"IP: {client_ip}"
         )
         
         # Print to console for immediate visibility
         print(f"\n{'='*60}")
         print(f"🚨 EMERGENCY ALERT ACTIVATED 🚨")
         print(f"{'='*60}")
-        print(f"Alert ID: {emergency_alert.id}")
+        print(f"Alert ID: {emergency_alert.id} (report {emergency_alert.report_count})")
         print(f"Security User: {request.user.username} ({request.user.get_full_name() or 'No full name'})")
-        print(f"Emergency Type: {classify_emergency_type(emergency_reason)}")
+        print(f"Emergency Type: {emergency_type}")
         print(f"Reason: {emergency_reason}")
         print(f"Location: {location}")
         print(f"Timestamp: {timezone.now().strftime('%Y-%m-%d %H:%M:%S')}")
@@ -830,7 +1078,13 @@ User IP: {get_client_ip(request)}
         print(f"{'='*60}\n")
         
         # Return success response
-        success_msg = f'Emergency alert #{emergency_alert.id} activated. All security personnel have been notified.'
+        if created:
+            success_msg = f'Emergency alert #{emergency_alert.id} activated. Facility security personnel have been notified.'
+        else:
+            success_msg = (
+                f'Your report was added to emergency alert #{emergency_alert.id} '
+                f'({emergency_alert.report_count} reports). Responders will receive it in the next update.'
+            )
         
         if request.content_type == 'application/json':
             return JsonResponse({
@@ -838,7 +1092,9 @@ User IP: {get_client_ip(request)}
                 'message': success_msg,
                 'alert_id': emergency_alert.id,
                 'timestamp': emergency_alert.issued_at.isoformat(),
-                'emergency_type': classify_emergency_type(emergency_reason),
+                'emergency_type': emergency_type,
+                'coalesced': not created,
+                'report_count': emergency_alert.report_count,
                 'notifications_sent': notification_result.get('count', 0)
             })
         else:
@@ -868,41 +1124,52 @@ User IP: {get_client_ip(request)}
 @user_passes_test(is_security_staff)
 def emergency_log_view(request):
     """View emergency alert logs"""
-    # Get all emergency alerts, ordered by most recent first
-    alerts = EmergencyAlert.objects.all().order_by('-issued_at')
+    # Superusers see every jail's alerts; other staff their own jail's and broadcasts
+    scope = Q() if request.user.is_superuser else visible_to(request.user.jail_id)
+    scoped = EmergencyAlert.objects.filter(scope)
+    alerts = scoped.select_related('issued_by', 'facility')
     
-    # Filter by active/resolved status
+    # Filter by active/resolved status; archived alerts are read from the archive table
     status_filter = request.GET.get('status')
-    if status_filter == 'active':
+    if status_filter == 'archived':
+        alerts = ArchivedEmergencyAlert.objects.filter(scope).select_related('issued_by', 'facility')
+    elif status_filter == 'active':
         alerts = alerts.filter(is_active=True)
     elif status_filter == 'resolved':
         alerts = alerts.filter(is_active=False)
+
+    # Structured filters on indexed columns
+    type_filter = request.GET.get('type', '')
+    if type_filter:
+        alerts = alerts.filter(emergency_type=type_filter)
+    facility_filter = request.GET.get('facility', '')
+    if facility_filter.isdigit():
+        alerts = alerts.filter(facility_id=int(facility_filter))
+    location_filter = request.GET.get('location', '')
+    if location_filter:
+        alerts = alerts.filter(location=location_filter)
     
     # Filter by date range
     date_from = request.GET.get('date_from')
     date_to = request.GET.get('date_to')
     
+    # Ranges on issued_at itself (not issued_at__date) so the indexes apply
     if date_from:
         try:
-            alerts = alerts.filter(issued_at__gte=datetime.strptime(date_from, '%Y-%m-%d'))
+            alerts = alerts.filter(issued_at__gte=timezone.make_aware(datetime.strptime(date_from, '%Y-%m-%d')))
         except ValueError:
             pass
     
     if date_to:
         try:
-            alerts = alerts.filter(issued_at__lte=datetime.strptime(date_to, '%Y-%m-%d') + timedelta(days=1))
+            alerts = alerts.filter(issued_at__lt=timezone.make_aware(datetime.strptime(date_to, '%Y-%m-%d') + timedelta(days=1)))
         except ValueError:
             pass
     
-    # Search functionality
+    # Full-text search over alert text and reporter names
     search_query = request.GET.get('search')
     if search_query:
-        alerts = alerts.filter(
-            Q(message__icontains=search_query) |
-            Q(issued_by__username__icontains=search_query) |
-            Q(issued_by__first_name__icontains=search_query) |
-            Q(issued_by__last_name__icontains=search_query)
-        )
+        alerts = search_alerts(alerts, search_query)
     
     # Handle resolve/reactivate actions
     if request.method == 'POST':
@@ -910,40 +1177,33 @@ def emergency_log_view(request):
         action = request.POST.get('action')
         
         try:
-            alert = EmergencyAlert.objects.get(id=alert_id)
+            alert = scoped.get(id=alert_id)
             if action == 'resolve':
-                alert.is_active = False
-                alert.save()
+                set_alert_active(alert, False)
                 messages.success(request, f'Emergency Alert #{alert.id} has been resolved.')
             elif action == 'reactivate':
-                alert.is_active = True
-                alert.save()
+                set_alert_active(alert, True)
                 messages.success(request, f'Emergency Alert #{alert.id} has been reactivated.')
-        except EmergencyAlert.DoesNotExist:
+        except (EmergencyAlert.DoesNotExist, ValueError):
             messages.error(request, 'Alert not found.')
         
         return redirect('emergency_log')
     
-    # Paginate results
-    from django.core.paginator import Paginator
-    paginator = Paginator(alerts, 20)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Keyset pagination: no COUNT(*) or deep OFFSET scans on a growing log
+    page_obj = paginate(request, alerts, ('-issued_at', '-id'), per_page=20)
     
-    # Get statistics
-    stats = {
-        'total_alerts': EmergencyAlert.objects.count(),
-        'active_alerts': EmergencyAlert.objects.filter(is_active=True).count(),
-        'resolved_alerts': EmergencyAlert.objects.filter(is_active=False).count(),
-        'alerts_today': EmergencyAlert.objects.filter(
-            issued_at__date=timezone.now().date()
-        ).count(),
-    }
+    # Get statistics (one query, cached for a minute per scope)
+    stats = alert_log_stats(scoped, 'all' if request.user.is_superuser else request.user.jail_id)
     
     context = {
         'alerts': page_obj,
         'stats': stats,
         'status_filter': status_filter,
+        'type_filter': type_filter,
+        'facility_filter': facility_filter,
+        'location_filter': location_filter,
+        'emergency_types': emergency_classifier.choices,
+        'facilities': Jail.objects.order_by('name'),
         'date_from': date_from,
         'date_to': date_to,
         'search_query': search_query,
@@ -961,17 +1221,34 @@ def manage_alerts(request):
     """
     if request.method == 'POST':
         message = request.POST.get('message')
+        # Only superusers may alert every jail at once
+        broadcast = request.POST.get('broadcast') == '1' and request.user.is_superuser
         if message:
-            EmergencyAlert.objects.filter(is_active=True).update(is_active=False)
-            EmergencyAlert.objects.create(message=message, issued_by=request.user)
-            messages.success(request, "Emergency alert has been broadcast to all users.")
+            issue_alert(
+                facility_id=request.user.jail_id,
+                broadcast=broadcast,
+                replace=True,
+                message=message,
+                issued_by_id=request.user.id,
+                emergency_type=classify_emergency_type(message),
+                reason=message,
+                source_ip=get_client_ip(request),
+            )
+            if broadcast or not request.user.jail_id:
+                messages.success(request, "Emergency alert has been broadcast to all facilities.")
+            else:
+                messages.success(request, f"Emergency alert has been issued to {request.user.jail.name}.")
         else:
             messages.error(request, "Alert message cannot be empty.")
         return redirect('manage_alerts')
     
-    active_alert = EmergencyAlert.objects.filter(is_active=True).first()
-    alert_history = EmergencyAlert.objects.order_by('-issued_at')[:10]  # Limit for performance
-    context = {'active_alert': active_alert, 'alert_history': alert_history}
+    scope = Q() if request.user.is_superuser else visible_to(request.user.jail_id)
+    alert_history = EmergencyAlert.objects.filter(scope).select_related('facility').order_by('-issued_at')[:10]  # Limit for performance
+    context = {
+        'active_alert': user_active_alert(request.user),
+        'alert_history': alert_history,
+        'can_broadcast': request.user.is_superuser,
+    }
     return render(request, 'visitor_management/manage_alerts.html', context)
 
 @login_required
@@ -980,9 +1257,9 @@ def deactivate_alert(request, pk):
     """
     Deactivate emergency alert
     """
-    alert = get_object_or_404(EmergencyAlert, pk=pk)
-    alert.is_active = False
-    alert.save()
+    scope = Q() if request.user.is_superuser else Q(facility_id=request.user.jail_id, is_broadcast=False)
+    alert = get_object_or_404(EmergencyAlert.objects.filter(scope), pk=pk)
+    set_alert_active(alert, False)
     messages.info(request, "The emergency alert has been deactivated.")
     return redirect('manage_alerts')
 
@@ -994,20 +1271,25 @@ def trigger_emergency_alarm(request):
     """
     if request.method == 'POST':
         try:
-            # Deactivate any existing alerts to ensure this is the only active one
-            EmergencyAlert.objects.filter(is_active=True).update(is_active=False)
-            
-            # Create facility-specific emergency alert
+            # Create facility-specific emergency alert, replacing only this jail's active alerts;
+            # presses while the jail's panic alarm is still open are added to it as reports
             facility_name = request.user.jail.name if request.user.jail else 'Unknown Location'
             alert_message = f"🚨 PANIC ALARM TRIGGERED AT GATE: {facility_name} 🚨"
             
-            emergency_alert = EmergencyAlert.objects.create(
-                message=alert_message, 
-                issued_by=request.user,
-                is_active=True
+            emergency_alert, created = report_emergency(
+                request.user.jail_id,
+                PANIC_ALARM,
+                request.user.id,
+                location='Gate',
+                source_ip=get_client_ip(request),
+                replace=True,
+                message=alert_message,
             )
             
-            messages.error(request, "🚨 EMERGENCY ALARM ACTIVATED! All administrators have been notified immediately.")
+            if created:
+                messages.error(request, "🚨 EMERGENCY ALARM ACTIVATED! All administrators have been notified immediately.")
+            else:
+                messages.error(request, f"🚨 Emergency alarm #{emergency_alert.id} is already active. Your alarm was added ({emergency_alert.report_count} reports).")
             
             # Comprehensive security logging
             print(f"🚨 EMERGENCY ALERT TRIGGERED 🚨")
@@ -1050,7 +1332,7 @@ def update_all_pending_visits_to_today():
     updated_visits = Visit.objects.filter(
         status__in=['PENDING', 'APPROVED'],
         visit_date__lt=today
-    ).update(visit_date=today)
+    ).update(visit_date=today, updated_at=timezone.now())
     
     print(f"✅ Updated {updated_visits} visits to today's date: {today}")
     return updated_visits
@@ -1059,17 +1341,17 @@ def update_all_pending_visits_to_today():
 
 @login_required
 def check_alert_api(request):
-    """API endpoint to check if there's an active emergency alert"""
+    """API endpoint to check if there's an active emergency alert for the user's jail"""
     try:
-        active_alert = EmergencyAlert.objects.filter(is_active=True).first()
+        alert = user_active_alert(request.user)
         
-        if active_alert:
+        if alert:
             return JsonResponse({
                 'active': True,
-                'alert_id': active_alert.id,
-                'message': active_alert.message,
-                'issued_by': active_alert.issued_by.username,
-                'issued_at': active_alert.issued_at.isoformat(),
+                'alert_id': alert.id,
+                'message': alert.message,
+                'issued_by': alert.issued_by.username,
+                'issued_at': alert.issued_at.isoformat(),
                 'timestamp': timezone.now().isoformat()
             })
         else: